@@ -3,18 +3,30 @@ BUILD NEW UI COMMAND:
 pyside2-uic mainwindow.ui > ui_mainwindow.py
 PYINSTALLER BUILD COMMAND:
 pyinstaller --name="3DGraphicsApp" --windowed --onefile 3DApp.py
+HEADLESS TURNTABLE RENDER (no display needed):
+python 3DApp.py --headless --shape Torus --frames 120 --output frames
+NO OPENGL (NumPy software rasterizer, also picked automatically without PyOpenGL):
+python 3DApp.py --raster
 """
+import argparse
+import multiprocessing
+import os
 import sys
-from PySide2.QtWidgets import QApplication, QMainWindow, QSlider
+from PySide2.QtWidgets import QApplication, QMainWindow, QSlider, QFileDialog, QLabel, QActionGroup
+from PySide2.QtCore import QTimer
 
 #importing UI class files from QT Creator with pyside2-uic
 from ui_mainwindow import Ui_MainWindow
 
 #custom classes
-from customGL import GLWidget
+try:
+    from customGL import GLWidget
+except ImportError: # no PyOpenGL -> we draw with the NumPy software renderer instead of showing an error
+    GLWidget = None
+from meshImport import MESH_FILE_FILTER
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, software=False):
         super(MainWindow, self).__init__()
         """
         Basic Configurations
@@ -28,8 +40,12 @@ class MainWindow(QMainWindow):
         """
         UI Bindings 
         """
-        # Load our custom Open GL Widget
-        self.glWidget = GLWidget(self)
+        # Load our custom Open GL Widget -> or the software rasterizer when OpenGL is missing/unwanted, it has the same slots
+        if software or GLWidget is None:
+            from softwareWidget import SoftwareWidget
+            self.glWidget = SoftwareWidget(self)
+        else:
+            self.glWidget = GLWidget(self)
 
         """
         Basic Labels
@@ -152,6 +168,47 @@ class MainWindow(QMainWindow):
         
         # toggle animation -> calls the onToggleAnimationPushButtonToggled() function
         self.toggleAnimationPushButton.clicked.connect(self.onToggleAnimationPushButtonToggled)
+
+        # textures -> "Upload Texture" menu, the image is decoded in the background and the status bar says when it is on
+        self.ui.actionFrom_this_pc.triggered.connect(self.onUploadTextureTriggered)
+        self.ui.actionRemove_texture.triggered.connect(self.glWidget.clearTexture)
+        self.glWidget.statusMessage.connect(self.statusBar().showMessage)
+
+        # imported meshes -> "Import Mesh" menu, each one becomes a new entry of the shape combo box once it is parsed
+        self.ui.actionImport_mesh.triggered.connect(self.onImportMeshTriggered)
+        self.glWidget.meshAdded.connect(self.onMeshAdded)
+
+        # lighting -> "Shading" menu, one of unlit/flat/smooth at a time
+        self.shadingGroup = QActionGroup(self) # exclusive -> checking one unchecks the others
+        for action, mode in ((self.ui.actionUnlit, "unlit"), (self.ui.actionFlat_shading, "flat"), (self.ui.actionSmooth_shading, "smooth")):
+            self.shadingGroup.addAction(action)
+            action.triggered.connect(lambda checked=False, mode=mode: self.glWidget.setShadingMode(mode))
+
+        # transparency -> also in the "Shading" menu, how faces are drawn while the surface alpha slider is below max
+        self.transparencyGroup = QActionGroup(self)
+        for action, mode in ((self.ui.actionSorted_transparency, "sorted"), (self.ui.actionWeighted_transparency, "weighted")):
+            self.transparencyGroup.addAction(action)
+            action.triggered.connect(lambda checked=False, mode=mode: self.glWidget.setTransparencyMode(mode))
+
+        # edges -> also in the "Shading" menu, GL_LINES or painted onto the faces by the wireframe shader
+        self.wireframeGroup = QActionGroup(self)
+        for action, mode in ((self.ui.actionLine_edges, "lines"), (self.ui.actionBarycentric_edges, "barycentric")):
+            self.wireframeGroup.addAction(action)
+            action.triggered.connect(lambda checked=False, mode=mode: self.glWidget.setWireframeMode(mode))
+
+        # frame timing -> "Performance" menu (F3 overlay, F4 CSV dump) and a readout on the right of the status bar
+        self.ui.actionShow_overlay.triggered.connect(self.glWidget.toggleProfilerOverlay)
+        self.ui.actionGpu_timer_queries.toggled.connect(self.glWidget.setGpuTiming)
+        self.ui.actionSave_frame_timings.triggered.connect(self.onSaveFrameTimingsTriggered)
+        self.performanceLabel = QLabel("idle")
+        self.lastProfiledFrame = 0
+        self.statusBar().addPermanentWidget(self.performanceLabel)
+        # armed by drawn frames only (see onFrameSwapped) -> no wakeups at all while nothing is drawn
+        self.performanceTimer = QTimer(self)
+        self.performanceTimer.setSingleShot(True)
+        self.performanceTimer.setInterval(500) # twice a second is plenty for something people read
+        self.performanceTimer.timeout.connect(self.updatePerformanceLabel)
+        self.glWidget.frameSwapped.connect(self.onFrameSwapped)
         
     def setupSlider(self, slider, changedSignal, setterSlot):
         """Configure a slider for the UI (range, step, etc.) and signals/slots"""
@@ -185,79 +242,131 @@ class MainWindow(QMainWindow):
         """Called when the toggle animation pushbutton is toggled"""
         self.glWidget.toggleAnimation() # toggle animation playback on our GL Widget
 
+    def onUploadTextureTriggered(self):
+        """Asks for an image file and applies it to the shapes as a texture"""
+        path, _ = QFileDialog.getOpenFileName(self, "Upload Texture", "", "Images (*.png *.jpg *.jpeg *.bmp *.gif *.tga *.tif *.tiff)")
+        if path:
+            self.glWidget.loadTexture(path)
+
+    def onImportMeshTriggered(self):
+        """Asks for a mesh file and imports it in the background"""
+        path, _ = QFileDialog.getOpenFileName(self, "Import Mesh", "", MESH_FILE_FILTER)
+        if path:
+            self.glWidget.importMesh(path)
+
+    def onMeshAdded(self, index, name):
+        """A new shape exists -> list it in the shape combo box and show it"""
+        self.shapeComboBox.addItem(name)
+        self.shapeComboBox.setCurrentIndex(index) # same order as glWidget.meshes, so this also draws it
+
+    def onSaveFrameTimingsTriggered(self):
+        """Asks where to write the recorded frame timings and saves them as CSV"""
+        path, _ = QFileDialog.getSaveFileName(self, "Save Frame Timings", "frame_timings.csv", "CSV files (*.csv)")
+        if path:
+            frames = self.glWidget.profiler.writeCsv(path)
+            self.statusBar().showMessage("Saved %d frames of timings to %s" % (frames, path))
+
+    def onFrameSwapped(self):
+        """A frame was drawn -> the readout refreshes within 500ms (frames in between share that one refresh)"""
+        if not self.performanceTimer.isActive():
+            self.performanceTimer.start()
+
+    def updatePerformanceLabel(self):
+        """Refreshes the FPS/frame time readout in the status bar"""
+        profiler = self.glWidget.profiler
+        summary = profiler.summary()
+        if summary is None or not self.glWidget.needsFrames() and profiler.count == self.lastProfiledFrame:
+            self.performanceLabel.setText("idle") # nothing drawn since the last refresh, old numbers would mislead
+        else:
+            self.performanceLabel.setText("%.1f FPS | p50 %.1f p95 %.1f p99 %.1f ms | %d draws" %
+                                          (summary["fps"], summary["p50"], summary["p95"], summary["p99"], round(summary["drawCalls"])))
+            self.performanceTimer.start() # one more refresh even if no frame follows, it turns the readout to "idle"
+        self.lastProfiledFrame = profiler.count
+
     """
     Surface Color Sliders
     """
-    def onRedSliderValueChanged(self):
+    def onRedSliderValueChanged(self, value):
         """Called when the red surface color slider changes"""
-        self.glWidget.setSurfaceColor(self.getSurfaceColor()) # update the surface color of the OpenGL widget
+        self.glWidget.setSurfaceChannel(0, value / 255.0) # only this channel, applied once per frame by the widget
     
-    def onGreenSliderValueChanged(self):
+    def onGreenSliderValueChanged(self, value):
         """Called when the green surface color slider changes"""
-        self.glWidget.setSurfaceColor(self.getSurfaceColor()) # update the surface color of the OpenGL widget
+        self.glWidget.setSurfaceChannel(1, value / 255.0) # only this channel, applied once per frame by the widget
     
-    def onBlueSliderValueChanged(self):
+    def onBlueSliderValueChanged(self, value):
         """Called when the blue surface color slider changes"""
-        self.glWidget.setSurfaceColor(self.getSurfaceColor()) # update the surface color of the OpenGL widget
+        self.glWidget.setSurfaceChannel(2, value / 255.0) # only this channel, applied once per frame by the widget
     
-    def onAlphaSliderValueChanged(self):
+    def onAlphaSliderValueChanged(self, value):
         """Called when the alpha surface slider changes"""
-        self.glWidget.setSurfaceColor(self.getSurfaceColor()) # update the surface color of the OpenGL widget
+        self.glWidget.setSurfaceChannel(3, value / 255.0) # only this channel, applied once per frame by the widget
 
     """
     Edge Color Sliders
     """
-    def onRedEdgeSliderValueChanged(self):
+    def onRedEdgeSliderValueChanged(self, value):
         """Called when the red edge color slider changes"""
-        self.glWidget.setEdgeColor(self.getEdgeColor()) # update the edge color of the OpenGL widget
+        self.glWidget.setEdgeChannel(0, value / 255.0) # only this channel, applied once per frame by the widget
     
-    def onGreenEdgeSliderValueChanged(self):
+    def onGreenEdgeSliderValueChanged(self, value):
         """Called when the green edge color slider changes"""
-        self.glWidget.setEdgeColor(self.getEdgeColor()) # update the edge color of the OpenGL widget
+        self.glWidget.setEdgeChannel(1, value / 255.0) # only this channel, applied once per frame by the widget
     
-    def onBlueEdgeSliderValueChanged(self):
+    def onBlueEdgeSliderValueChanged(self, value):
         """Called when the blue edge color slider changes"""
-        self.glWidget.setEdgeColor(self.getEdgeColor()) # update the edge color of the OpenGL widget
+        self.glWidget.setEdgeChannel(2, value / 255.0) # only this channel, applied once per frame by the widget
     
-    def onAlphaEdgeSliderValueChanged(self):
+    def onAlphaEdgeSliderValueChanged(self, value):
         """Called when the alpha edge slider changes"""
-        self.glWidget.setEdgeColor(self.getEdgeColor()) # update the edge color of the OpenGL widget
-
-    def getSurfaceColor(self) -> tuple:
-        """Gets the current surface color from the UI and returns RGBA with each val between 0-1"""
-        # get the current slider values
-        r = self.redSlider.value()
-        g = self.greenSlider.value()
-        b = self.blueSlider.value()
-        a = self.alphaSlider.value()
-
-        # convert these to between 0 - 1 (i.e. divide by 255)
-        r = r / 255.0 
-        g = g / 255.0 
-        b = b / 255.0 
-        a = a / 255.0 
-
-        return (r, g, b, a)
-
-    def getEdgeColor(self) -> tuple:
-        """Gets the current edge color from the UI and returns RGBA with each val between 0-1"""
-        # get the current slider values
-        r = self.redEdgeSlider.value()
-        g = self.greenEdgeSlider.value()
-        b = self.blueEdgeSlider.value()
-        a = self.alphaEdgeSlider.value()
-
-        # convert these to between 0 - 1 (i.e. divide by 255)
-        r = r / 255.0 
-        g = g / 255.0 
-        b = b / 255.0 
-        a = a / 255.0 
-
-        return (r, g, b, a)
+        self.glWidget.setEdgeChannel(3, value / 255.0) # only this channel, applied once per frame by the widget
+
+def parseArguments(argv):
+    """Command line options, anything we do not know (e.g. Qt's own -style) is left for QApplication"""
+    parser = argparse.ArgumentParser(description="3D Graphics Tool")
+    parser.add_argument("--software", action="store_true", help="use Mesa's software OpenGL, for machines without a GPU")
+    parser.add_argument("--raster", action="store_true", help="draw with the NumPy rasterizer, no OpenGL at all (automatic without PyOpenGL)")
+
+    headless = parser.add_argument_group("headless rendering", "render a turntable image sequence to PNG files without a window")
+    headless.add_argument("--headless", action="store_true", help="render frames instead of opening the window")
+    headless.add_argument("--shape", default="Cube", help="shape name or combo box index (default: Cube)")
+    headless.add_argument("--mesh", help="an OBJ/STL/PLY file to render instead of a built-in shape")
+    headless.add_argument("--frames", type=int, default=60, help="frames in one full turn (default: 60)")
+    headless.add_argument("--width", type=int, default=800)
+    headless.add_argument("--height", type=int, default=800)
+    headless.add_argument("--output", default="frames", help="folder the frame_NNNN.png files go to (default: frames)")
+    headless.add_argument("--axis", choices=("x", "y", "z"), default="y", help="turntable axis (default: y)")
+    headless.add_argument("--tilt", type=float, default=20.0, help="degrees the shape leans towards the camera (default: 20)")
+    headless.add_argument("--samples", type=int, default=4, help="multisampling, 0 to turn it off (default: 4)")
+    headless.add_argument("--backend", choices=("immediate", "buffered"), default="buffered", help="OpenGL render path (default: buffered)")
+    headless.add_argument("--shading", choices=("unlit", "flat", "smooth"), default="unlit", help="lighting (default: unlit)")
+    headless.add_argument("--alpha", type=float, default=1.0, help="surface alpha, below 1 draws see-through faces (default: 1)")
+    headless.add_argument("--transparency", choices=("sorted", "weighted"), default="sorted", help="how see-through faces are drawn (default: sorted)")
+    headless.add_argument("--edges", choices=("lines", "barycentric"), default="lines", help="how edges are drawn (default: lines)")
+    headless.add_argument("--rainbow", action="store_true", help="draw in rainbow mode")
+    headless.add_argument("--seed", type=int, help="seed for the rainbow colors")
+    headless.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="PNG encoder threads (default: CPU count)")
+    headless.add_argument("--compress-level", type=int, default=6, choices=range(10), metavar="0-9", help="PNG compression (default: 6)")
+    arguments, qtArguments = parser.parse_known_args(argv)
+    if arguments.frames < 1 or arguments.width < 1 or arguments.height < 1:
+        parser.error("--frames, --width and --height must be at least 1")
+    return arguments, qtArguments
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    mainWin = MainWindow()
+    multiprocessing.freeze_support() # the LOD worker processes of a frozen (pyinstaller) build start here too
+    arguments, qtArguments = parseArguments(sys.argv[1:])
+    if arguments.software:
+        os.environ["LIBGL_ALWAYS_SOFTWARE"] = "1" # read by Mesa when the first context is created
+    if arguments.headless:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen") # no display server needed
+        app = QApplication(sys.argv[:1] + qtArguments)
+        from headless import runHeadless
+        sys.exit(runHeadless(arguments))
+
+    app = QApplication(sys.argv[:1] + qtArguments)
+    mainWin = MainWindow(software=arguments.raster)
+    if GLWidget is None:
+        mainWin.statusBar().showMessage("PyOpenGL is not installed, drawing with the software renderer (pip install PyOpenGL)")
     mainWin.show()
     res = app.exec_()
     mainWin.glWidget.freeResources() #NOTE: don't forget to free those resources :)
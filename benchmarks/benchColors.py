@@ -0,0 +1,89 @@
+"""
+Cost of dragging a color slider: every frame gets a new surface color, as while a color slider is dragged.
+For the color program (colors are uniforms) and the baked-in colors it measures the median frame time and how many
+display lists were recompiled during the drag, on the immediate backend (offscreen, software GL unless --hardware,
+like suite.py). Exits with 1 if the color program path recompiled anything, and with NOT_MEASURED (3) if that could
+not be checked (no PyOpenGL/Qt, or no color program on this driver) -> the output says NOT MEASURED and
+benchmarks/suite.py reports it as such, --require-frames makes it a failure (1) instead.
+Run from the repo root: python benchmarks/benchColors.py [--frames N] [--hardware] [--require-frames]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+if "--hardware" not in sys.argv:
+    os.environ.setdefault("LIBGL_ALWAYS_SOFTWARE", "1")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # so the repo modules import
+
+try:
+    from PySide2.QtWidgets import QApplication
+    from OpenGL.GL import *
+
+    from customGL import GLWidget
+    from headless import OffscreenRenderer
+    missing = None
+except ImportError as error: # no Qt/GL -> nothing to measure, main says so
+    missing = str(error)
+from mesh import SPHERE
+
+NOT_MEASURED = 3 # exit status when the drag could not be measured, see benchmarks/suite.py
+
+def dragFrames(renderer, frames, warmup):
+    """(median frame ms, lists compiled) with a new surface color every frame"""
+    widget = renderer.widget
+    misses = widget.shapeCache.misses
+    times = []
+    for frame, red in enumerate(np.linspace(0.0, 1.0, warmup + frames)):
+        start = time.perf_counter()
+        widget.setSurfaceColor((red, 1.0 - red, 0.0, 1.0)) # what the slider's signal does
+        renderer.draw()
+        glFinish() # wait for the (software) rasterizer, otherwise we only time the command submission
+        if frame >= warmup:
+            times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000, widget.shapeCache.misses - misses
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--resolution", type=int, default=64, help="sphere resolution, compile time grows with it")
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--height", type=int, default=800)
+    parser.add_argument("--samples", type=int, default=0)
+    parser.add_argument("--hardware", action="store_true", help="use the real GPU driver instead of software GL")
+    parser.add_argument("--require-frames", action="store_true", help="fail (exit 1) when the drag cannot be measured")
+    arguments = parser.parse_args(argv)
+    notMeasured = 1 if arguments.require_frames else NOT_MEASURED
+    if missing is not None:
+        print("uniforms NOT MEASURED (%s) -> whether color changes recompile was not checked" % missing)
+        return notMeasured
+
+    application = QApplication(sys.argv[:1])
+    widget = GLWidget()
+    widget.setCurrentShape(widget.meshes.index(SPHERE))
+    widget.setDetailOverride(arguments.resolution)
+    renderer = OffscreenRenderer(widget, arguments.width, arguments.height, arguments.samples)
+    failed = skipped = False
+    try:
+        for shaderColors in (True, False):
+            widget.shaderColors = shaderColors
+            milliseconds, compiles = dragFrames(renderer, arguments.frames, arguments.warmup)
+            label = "uniforms" if shaderColors else "baked"
+            if shaderColors and widget.shaderCache.programs.get("color") is None:
+                print("%-8s NOT MEASURED (no color program on this driver: %s)" % (label, widget.shaderCache.errors.get("color")))
+                skipped = True
+                continue
+            failed |= shaderColors and compiles > 1 # the first frame may still compile the geometry-only list
+            print("%-8s %8.2f ms/frame  %d lists compiled over %d frames" % (label, milliseconds, compiles,
+                                                                           arguments.frames + arguments.warmup))
+    finally:
+        renderer.close()
+    return 1 if failed else notMeasured if skipped else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
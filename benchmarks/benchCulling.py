@@ -0,0 +1,72 @@
+"""
+Times view-frustum culling of a large scene, the SceneBVH in bvh.py against testing every object.
+Also checks both give the same objects, before and after moving some of them (refit instead of rebuild), for
+GLWidget's camera and a turned one (planes not along the axes), and exits with 1 if they ever differ
+(benchmarks/suite.py runs it).
+Run from the repo root: python benchmarks/benchCulling.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # so the repo modules import
+
+from bvh import SceneBVH, bruteForceVisible
+from transforms import frustumMatrix, translationMatrix, frustumPlanes, modelMatrix, quatFromAxisAngle
+
+REPEATS = 20
+
+def timed(function, *args):
+    """Best time of REPEATS calls in ms, plus the last result"""
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+def mismatch(bvh, planes, centers, radii, what):
+    """Compares the BVH query with testing every object, returns 1 (and says so) when they differ, else 0"""
+    visible, expected = bvh.query(planes, centers, radii), bruteForceVisible(planes, centers, radii)
+    if np.array_equal(visible, expected):
+        return 0
+    print("MISMATCH %s: %d objects only in the BVH result, %d only in the brute force one" %
+          (what, len(np.setdiff1d(visible, expected)), len(np.setdiff1d(expected, visible))))
+    return 1
+
+def main():
+    rng = np.random.default_rng(0)
+    camera = frustumMatrix(-1.2, 1.2, -1.2, 1.2, 6.0, 70.0) @ translationMatrix(0.0, 0.0, -30.0) # GLWidget's camera
+    planes = frustumPlanes(camera)
+    turned = frustumPlanes(camera @ modelMatrix((0, 0, 0), quatFromAxisAngle((1, 2, 3), 0.9))) # looks along no axis
+    failures = 0
+
+    print("%8s %8s %10s %10s %10s %10s" % ("objects", "visible", "build ms", "bvh ms", "brute ms", "refit ms"))
+    for count in (1000, 10000, 100000, 1000000):
+        centers = rng.uniform(-60, 60, size=(count, 3))
+        radii = rng.uniform(0.2, 1.0, size=count)
+
+        start = time.perf_counter()
+        bvh = SceneBVH(centers, radii)
+        buildTime = (time.perf_counter() - start) * 1000
+        bvhTime, visible = timed(bvh.query, planes, centers, radii)
+        bruteTime, expected = timed(bruteForceVisible, planes, centers, radii)
+        failures += mismatch(bvh, planes, centers, radii, "%d objects, built" % count)
+        failures += mismatch(bvh, turned, centers, radii, "%d objects, built, turned camera" % count)
+
+        # move 1% of the objects, only their leaves and the nodes above them are refit
+        moved = rng.choice(count, count // 100, replace=False)
+        centers[moved] += rng.normal(0, 5, size=(len(moved), 3))
+        start = time.perf_counter()
+        bvh.refit(centers, radii, moved)
+        refitTime = (time.perf_counter() - start) * 1000
+        failures += mismatch(bvh, planes, centers, radii, "%d objects, refit" % count)
+        failures += mismatch(bvh, turned, centers, radii, "%d objects, refit, turned camera" % count)
+
+        print("%8d %8d %10.2f %10.2f %10.2f %10.2f" % (count, len(visible), buildTime, bvhTime, bruteTime, refitTime))
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
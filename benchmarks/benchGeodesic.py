@@ -0,0 +1,37 @@
+"""
+Times the geodesic subdivision engine in mesh.py for levels 0-7.
+Each level is built from the memoized level below, so the time shown is the cost of that one subdivision.
+Run from the repo root: python benchmarks/benchGeodesic.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # so the repo modules import
+
+from mesh import geodesicMesh, MAX_GEODESIC_LEVEL
+
+def main():
+    # first pass -> timing only, tracemalloc would slow the Python side of the subdivision down a lot
+    geodesicMesh.cache_clear() # start cold so every level is really built
+    times = []
+    for level in range(MAX_GEODESIC_LEVEL + 1):
+        start = time.perf_counter()
+        mesh = geodesicMesh(level)
+        times.append(time.perf_counter() - start)
+        assert geodesicMesh(level) is mesh # asking again must come straight from the memo
+
+    # second pass -> peak memory of each subdivision (the level below is memoized by the previous iteration)
+    geodesicMesh.cache_clear()
+    print("%5s %10s %10s %10s %12s %12s" % ("level", "vertices", "triangles", "time ms", "mesh MiB", "peak MiB"))
+    for level in range(MAX_GEODESIC_LEVEL + 1):
+        tracemalloc.start()
+        mesh = geodesicMesh(level)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print("%5d %10d %10d %10.2f %12.2f %12.2f" % (level, mesh.vertexCount, mesh.triangleCount,
+                                                      times[level] * 1000, mesh.nbytes / 2**20, peak / 2**20))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+What the geometry stage (geometry.py) does to every procedural shape and any mesh files given: the post-transform
+vertex cache ACMR (average vertex shader runs per triangle, FIFO cache of geometry.VERTEX_CACHE_SIZE) of the
+generated/file order and of the optimized order, and how long triangulating + optimizing took. Runs anywhere (NumPy only).
+Run from the repo root: python benchmarks/benchGeometry.py [mesh files...] [--resolutions 16 64 256]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # so the repo modules import
+
+from mesh import SPHERE, TORUS, geodesicMesh, geodesicLevel
+from meshImport import loadMesh
+
+def printReport(mesh, seconds=None):
+    report = mesh.geometryReport
+    if report is None:
+        print("%-28s %9d triangles  not optimized (built directly, e.g. the base icosahedron)" % (mesh.name, mesh.triangleCount))
+        return
+    print("%-28s %9d triangles  ACMR %.3f -> %.3f  %8.1f ms" % (mesh.name, report.triangles, report.acmrBefore, report.acmrAfter,
+                                                                (report.seconds if seconds is None else seconds) * 1000))
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("files", nargs="*", help="OBJ/STL/PLY files to import and report too")
+    parser.add_argument("--resolutions", type=int, nargs="+", default=(16, 64, 256))
+    arguments = parser.parse_args(argv)
+
+    for resolution in arguments.resolutions:
+        for mesh in (SPHERE.mesh(resolution), TORUS.mesh(resolution), geodesicMesh(geodesicLevel(resolution))):
+            printReport(mesh) # optimizing only, the generators are cached so generation time would be noise
+
+    for path in arguments.files:
+        start = time.perf_counter()
+        mesh = loadMesh(path)
+        printReport(mesh, time.perf_counter() - start) # the whole import, parsing and welding included
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
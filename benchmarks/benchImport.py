@@ -0,0 +1,92 @@
+"""
+Times the mesh importer in meshImport.py and compares its peak memory with the size of the Mesh it returns.
+The last column is a reload through the memory mapped cache of meshCache.py.
+Test files (binary/ASCII STL, OBJ, binary/ASCII PLY) are written to a temporary directory from a geodesic sphere
+copied side by side until it has about the requested number of triangles.
+Run from the repo root: python benchmarks/benchImport.py [triangles]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # so the repo modules import
+
+from mesh import geodesicMesh
+from meshImport import loadMesh, STL_RECORD
+from meshCache import loadCachedMesh
+
+def testMesh(triangles):
+    """A geodesic sphere repeated along x until it has at least triangles triangles -> (vertices, triangles)"""
+    sphere = geodesicMesh(7)
+    copies = max(1, -(-triangles // sphere.triangleCount))
+    vertices = np.concatenate([sphere.vertices + (4.0 * k, 0, 0) for k in range(copies)])
+    faces = np.concatenate([sphere.triangles.astype(np.int64) + k * sphere.vertexCount for k in range(copies)])
+    return vertices, faces
+
+def writeFiles(directory, vertices, faces):
+    """Writes the mesh in every supported format, returns the paths"""
+    paths = {name: os.path.join(directory, name) for name in ("mesh.stl", "ascii.stl", "mesh.obj", "mesh.ply", "ascii.ply")}
+
+    records = np.zeros(len(faces), dtype=STL_RECORD)
+    records["corners"] = vertices[faces]
+    with open(paths["mesh.stl"], "wb") as file:
+        file.write(bytes(80) + np.uint32(len(faces)).tobytes() + records.tobytes())
+    with open(paths["ascii.stl"], "w") as file:
+        file.write("solid test\n")
+        corners = vertices[faces].reshape(-1, 9)
+        np.savetxt(file, corners, fmt="facet normal 0 0 0\nouter loop\nvertex %.6f %.6f %.6f\nvertex %.6f %.6f %.6f\n"
+                                      "vertex %.6f %.6f %.6f\nendloop\nendfacet")
+        file.write("endsolid test\n")
+
+    with open(paths["mesh.obj"], "w") as file:
+        np.savetxt(file, vertices, fmt="v %.6f %.6f %.6f")
+        np.savetxt(file, faces + 1, fmt="f %d %d %d")
+
+    header = ("ply\nformat %%s 1.0\nelement vertex %d\nproperty float x\nproperty float y\nproperty float z\n"
+              "element face %d\nproperty list uchar int vertex_indices\nend_header\n" % (len(vertices), len(faces)))
+    with open(paths["mesh.ply"], "wb") as file:
+        file.write((header % "binary_little_endian").encode())
+        file.write(vertices.astype("<f4").tobytes())
+        packed = np.zeros(len(faces), dtype=[("count", "u1"), ("indices", "<i4", (3,))])
+        packed["count"], packed["indices"] = 3, faces
+        file.write(packed.tobytes())
+    with open(paths["ascii.ply"], "w") as file:
+        file.write(header % "ascii")
+        np.savetxt(file, vertices, fmt="%.6f %.6f %.6f")
+        np.savetxt(file, faces, fmt="3 %d %d %d")
+    return paths
+
+def main():
+    triangles = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    vertices, faces = testMesh(triangles)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = writeFiles(directory, vertices, faces)
+        print("%10s %10s %10s %10s %10s %12s %12s %10s" % ("file", "MiB", "vertices", "triangles", "time s", "mesh MiB", "peak MiB", "cached ms"))
+        for name, path in paths.items():
+            # timing and memory in separate runs, tracemalloc slows the Python side down
+            start = time.perf_counter()
+            mesh = loadMesh(path)
+            elapsed = time.perf_counter() - start
+            assert mesh.vertexCount == len(vertices) and mesh.triangleCount == len(faces) # every duplicate welded back
+
+            tracemalloc.start()
+            mesh = loadMesh(path)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            loadCachedMesh(path) # writes the cache
+            start = time.perf_counter()
+            cached = loadCachedMesh(path)
+            cachedTime = time.perf_counter() - start
+            assert np.array_equal(cached.triangles, mesh.triangles)
+            print("%10s %10.1f %10d %10d %10.2f %12.1f %12.1f %10.2f" % (name, os.path.getsize(path) / 2**20, mesh.vertexCount,
+                                                                          mesh.triangleCount, elapsed, mesh.nbytes / 2**20,
+                                                                          peak / 2**20, cachedTime * 1000))
+            del cached # drop the mapping before the directory is removed
+
+if __name__ == '__main__':
+    main()
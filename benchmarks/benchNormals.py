@@ -0,0 +1,48 @@
+"""
+Times face and area-weighted vertex normal generation (mesh.Mesh.faceNormals/vertexNormals) on growing meshes,
+to check it scales linearly, and an incremental updateVertices edit against recomputing everything.
+Run from the repo root: python benchmarks/benchNormals.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # so the repo modules import
+
+from mesh import Mesh, geodesicMesh, sphereMesh, torusMesh
+
+EDITED_VERTICES = 100
+
+def fresh(mesh):
+    """A copy of mesh without anything cached (the generators share their meshes through lru_cache)"""
+    return Mesh(mesh.vertices.copy(), mesh.edges, mesh.triangles, name=mesh.name)
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    meshes = [sphereMesh(128, 256), torusMesh(256, 256), geodesicMesh(6), sphereMesh(512, 1024), geodesicMesh(8)]
+    rng = np.random.default_rng(0)
+    print("%-22s %10s %10s %10s %12s %12s %10s" % ("mesh", "triangles", "face ms", "vertex ms", "ms / 1M tri", "update ms", "max error"))
+    for generated in meshes:
+        mesh = fresh(generated)
+        face = timed(mesh.faceNormals)
+        vertex = timed(mesh.vertexNormals)
+
+        # move a few vertices, then check the incremental update against a mesh computed from scratch
+        indices = rng.choice(mesh.vertexCount, EDITED_VERTICES, replace=False)
+        positions = mesh.vertices[indices] * rng.uniform(0.9, 1.1, (EDITED_VERTICES, 1)).astype(np.float32)
+        mesh.vertexFaces() # the adjacency is built once, not per edit
+        update = timed(lambda: mesh.updateVertices(indices, positions))
+        reference = fresh(mesh)
+        error = max(np.abs(reference.vertexNormals() - mesh.vertexNormals()).max(), np.abs(reference.faceNormals() - mesh.faceNormals()).max())
+
+        print("%-22s %10d %10.1f %10.1f %12.1f %12.2f %10.1e" % (mesh.name[:22], mesh.triangleCount, face, vertex,
+              (face + vertex) / mesh.triangleCount * 1e6, update, error))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Times mouse picking (picking.pickMesh -> TriangleBVH ray casts) on the built-in shapes and a big geodesic sphere,
+against testing every triangle, and checks both find the same face at the same distance.
+Rays go through random pixels of the viewport the widget uses, at a random orientation, like clicks would.
+Exits with 1 when a pick disagrees with testing every triangle, or picks on the million triangle mesh are over budget.
+Run from the repo root: python benchmarks/benchPicking.py [rays]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # so the repo modules import
+
+from bvh import bruteForceIntersect
+from mesh import SHAPES, Mesh, ProceduralShape, geodesicMesh
+from picking import meshBVH, pickMesh
+from transforms import frustumMatrix, translationMatrix, modelMatrix, quatNormalize, unprojectRay
+
+SIDE = 800 # viewport pixels
+HALF_SIZE, NEAR, FAR, DISTANCE = 1.2, 6.0, 70.0, 30.0 # the camera of customGL.GLWidget
+BRUTE_FORCE_RAYS = 20 # on meshes over a million triangles testing them all is slow, fewer rays are compared there
+PICK_MEDIAN_MS, PICK_MAX_MS = 1.0, 5.0 # budget of a pick on a million triangles -> the median, and every single one
+PICK_TRIES = 3 # each pick is timed as the best of these -> one preempted by another process does not count as slow
+
+def bigMesh(copies=4):
+    """copies of the level 7 geodesic sphere side by side in one mesh (1.3M triangles for 4)"""
+    sphere = geodesicMesh(7)
+    offsets = np.linspace(-0.6, 0.6, copies)
+    vertices = np.concatenate([sphere.vertices * 0.4 + (x, 0, 0) for x in offsets])
+    triangles = np.concatenate([sphere.triangles + k * sphere.vertexCount for k in range(copies)])
+    edges = np.concatenate([sphere.edges + k * sphere.vertexCount for k in range(copies)])
+    return Mesh(vertices, edges, triangles, name="%d geodesic spheres" % copies)
+
+def rays(count, rng):
+    """count (origin, direction) pairs in model space through random pixels of the viewport"""
+    projection = frustumMatrix(-HALF_SIZE, HALF_SIZE, -HALF_SIZE, HALF_SIZE, NEAR, FAR)
+    clip = projection @ translationMatrix(0, 0, -DISTANCE) @ modelMatrix((0, 0, 0), quatNormalize(rng.normal(size=4)))
+    pixels = rng.uniform(SIDE * 0.42, SIDE * 0.58, (count, 2)) # around the middle, where the shapes are
+    return [unprojectRay(x, y, (0, 0, SIDE, SIDE), clip) for x, y in pixels]
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rng = np.random.default_rng(0)
+    meshes = [shape.mesh(shape.maxResolution) if isinstance(shape, ProceduralShape) else shape for shape in SHAPES] + [bigMesh()]
+
+    print("%-22s %10s %10s %10s %10s %10s %8s" % ("shape", "triangles", "build ms", "pick p50", "pick max", "brute p50", "hits"))
+    failures = 0
+    for mesh in meshes:
+        start = time.perf_counter()
+        meshBVH(mesh)
+        build = (time.perf_counter() - start) * 1000
+
+        picks, brutes, hits, mismatches = [], [], 0, 0
+        for index, (origin, direction) in enumerate(rays(count, rng)):
+            best = float("inf")
+            for _ in range(PICK_TRIES):
+                start = time.perf_counter()
+                hit = pickMesh(mesh, origin, direction)
+                best = min(best, (time.perf_counter() - start) * 1000)
+            picks.append(best)
+            hits += hit is not None
+            if mesh.triangleCount > 10**6 and index >= BRUTE_FORCE_RAYS:
+                continue
+            start = time.perf_counter()
+            reference = bruteForceIntersect(mesh.vertices, mesh.triangles, origin, direction)
+            brutes.append((time.perf_counter() - start) * 1000)
+            # same face, or a different face at the same distance (a ray through a shared edge)
+            if (hit is None) != (reference is None) or (hit is not None and hit.face != reference[0] and
+                                                        not np.isclose(hit.distance, reference[1] * np.linalg.norm(direction))):
+                mismatches += 1
+
+        slow = mesh.triangleCount > 10**6 and (np.median(picks) > PICK_MEDIAN_MS or max(picks) > PICK_MAX_MS)
+        print("%-22s %10d %10.1f %10.3f %10.3f %10.3f %8d%s%s" % (mesh.name[:22], mesh.triangleCount, build, np.median(picks), max(picks),
+              np.median(brutes), hits, "  MISMATCH x%d" % mismatches if mismatches else "",
+              "  OVER BUDGET (p50 %.1f / max %.1f ms)" % (PICK_MEDIAN_MS, PICK_MAX_MS) if slow else ""))
+        failures += bool(mismatches) + slow
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
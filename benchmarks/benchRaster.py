@@ -0,0 +1,119 @@
+"""
+Times the NumPy software rasterizer in softRaster.py on the built-in shapes, with 1 worker and with one per core.
+Also checks that every tile size / worker count gives exactly the same pixels, which is what makes it usable as a
+reference renderer, and that the faces of every shape (at a low resolution) match a scalar reference that tests one
+pixel against one triangle at a time in plain Python. Exits with 1 on any mismatch (benchmarks/suite.py runs it).
+Run from the repo root: python benchmarks/benchRaster.py [size]
+"""
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # so the repo modules import
+
+from mesh import Mesh, SHAPES, ProceduralShape
+from softRaster import SoftwareRasterizer, diffPixels, toRGBA8
+from transforms import modelMatrix, quatFromAxisAngle, quatMultiply
+
+REPEATS = 5
+SCALAR_SIZE = 64 # frame side of the scalar reference check, it is a Python loop over pixels and triangles
+SCALAR_RESOLUTION = 8 # of the procedural shapes in that check
+SCALAR_TOLERANCE = 1 # per channel, for the rounding of colors -> coverage and depth must match exactly
+
+def timed(rasterizer, *args):
+    """Best time of REPEATS renders in ms, plus the last frame"""
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        frame = rasterizer.render(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, frame
+
+def scalarFrame(rasterizer, mesh, model, color):
+    """
+    The faces of mesh in color drawn one triangle and one pixel at a time, with the same projection, edge functions,
+    fill rule (top-left) and depth test (GL_LESS in drawing order) as SoftwareRasterizer -> its pixels must match.
+    """
+    width, height = rasterizer.width, rasterizer.height
+    screen, w = rasterizer.project(mesh.vertices, np.asarray(model, dtype=np.float64))
+    screen, w = screen.tolist(), w.tolist()
+    depthBuffer = [[1.0] * width for _ in range(height)]
+    frame = np.zeros((height, width, 4))
+    frame[..., 3] = 1.0 # the default background
+    for triangle in mesh.triangles.tolist():
+        if min(w[corner] for corner in triangle) <= 0:
+            continue
+        x = [screen[corner][0] for corner in triangle]
+        y = [screen[corner][1] for corner in triangle]
+        z = [screen[corner][2] for corner in triangle]
+        area = (x[1] - x[0]) * (y[2] - y[0]) - (x[2] - x[0]) * (y[1] - y[0])
+        if area == 0:
+            continue
+        sign = 1.0 if area > 0 else -1.0
+        edges = []
+        for following, opposite in ((1, 2), (2, 0), (0, 1)): # edge i runs between the two other corners
+            a = (y[following] - y[opposite]) * sign
+            b = (x[opposite] - x[following]) * sign
+            c = (x[following] * y[opposite] - x[opposite] * y[following]) * sign
+            edges.append((a, b, c, a > 0 or (a == 0 and b > 0)))
+        for py in range(max(0, math.ceil(min(y) - 0.5)), min(height - 1, math.floor(max(y) - 0.5)) + 1):
+            for px in range(max(0, math.ceil(min(x) - 0.5)), min(width - 1, math.floor(max(x) - 0.5)) + 1):
+                values = [a * (px + 0.5) + b * (py + 0.5) + c for a, b, c, topLeft in edges]
+                if not all(value > 0 or (value == 0 and topLeft) for value, (a, b, c, topLeft) in zip(values, edges)):
+                    continue
+                depth = sum(value / abs(area) * corner for value, corner in zip(values, z))
+                if 0 <= depth <= 1 and depth < depthBuffer[py][px]:
+                    depthBuffer[py][px] = depth
+                    frame[py, px] = color
+    return toRGBA8(frame[::-1])
+
+def scalarMismatches(model):
+    """(shape name, mismatched pixels) of every shape whose faces differ from scalarFrame"""
+    mismatches = []
+    for workers, tileSize in ((1, SCALAR_SIZE), (3, 16)):
+        rasterizer = SoftwareRasterizer(SCALAR_SIZE, SCALAR_SIZE, tileSize=tileSize, workers=workers)
+        for shape in SHAPES:
+            mesh = shape.mesh(SCALAR_RESOLUTION) if isinstance(shape, ProceduralShape) else shape
+            faces = Mesh(mesh.vertices, np.zeros((0, 2), dtype=np.uint32), mesh.triangles, name=mesh.name) # no edges
+            frame = rasterizer.render(faces, model, (1.0, 1.0, 0.0, 1.0), (0.0, 0.0, 1.0, 1.0))
+            mismatched = diffPixels(scalarFrame(rasterizer, faces, model, (1.0, 1.0, 0.0, 1.0)), frame, SCALAR_TOLERANCE)
+            if mismatched:
+                mismatches.append(("%s (%d workers, %d px tiles)" % (mesh.name, workers, tileSize), mismatched))
+        rasterizer.close()
+    return mismatches
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 800
+    model = modelMatrix((0, 0, 0), quatMultiply(quatFromAxisAngle((1, 0, 0), 0.4), quatFromAxisAngle((0, 1, 0), 0.7)))
+    single = SoftwareRasterizer(size, size, workers=1)
+    parallel = SoftwareRasterizer(size, size)
+    odd = SoftwareRasterizer(size, size, tileSize=48, workers=3)
+
+    failures = 0
+    print("%-22s %10s %10s %10s %10s" % ("shape", "triangles", "1 worker", "%d workers" % (os.cpu_count() or 1), "rainbow"))
+    for shape in SHAPES:
+        mesh = shape.mesh(shape.maxResolution) if isinstance(shape, ProceduralShape) else shape
+        colors = np.random.default_rng(0).random((mesh.vertexCount, 4)).astype(np.float32)
+        singleTime, reference = timed(single, mesh, model, (1.0, 1.0, 0.0, 1.0), (0.0, 0.0, 1.0, 1.0))
+        parallelTime, frame = timed(parallel, mesh, model, (1.0, 1.0, 0.0, 1.0), (0.0, 0.0, 1.0, 1.0))
+        rainbowTime, _ = timed(parallel, mesh, model, (1.0, 1.0, 0.0, 1.0), (0.0, 0.0, 1.0, 1.0), colors)
+        mismatched = diffPixels(reference, frame) + diffPixels(reference, odd.render(mesh, model, (1.0, 1.0, 0.0, 1.0), (0.0, 0.0, 1.0, 1.0)))
+        print("%-22s %10d %10.1f %10.1f %10.1f%s" % (mesh.name, mesh.triangleCount, singleTime, parallelTime, rainbowTime,
+                                                    "  MISMATCH: %d pixels" % mismatched if mismatched else ""))
+        failures += bool(mismatched)
+    for rasterizer in (single, parallel, odd):
+        rasterizer.close()
+
+    mismatches = scalarMismatches(model)
+    for name, mismatched in mismatches:
+        print("scalar reference MISMATCH: %s, %d pixels" % (name, mismatched))
+    if not mismatches:
+        print("scalar reference: all %d shapes match (%dx%d)" % (len(SHAPES), SCALAR_SIZE, SCALAR_SIZE))
+    failures += len(mismatches)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Cost and quality of the LOD chains of simplify.py: for a sphere, a torus and any mesh files given it times
+simplify.lodChain (what the worker process runs) and prints the triangles of each level, its largest distance from the
+full mesh (sampled at the level's vertices, relative to the bounding radius) and how many of its triangles face
+against the full mesh.
+Runs anywhere (NumPy only).
+Run from the repo root: python benchmarks/benchSimplify.py [mesh files...] [--resolution 128]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # so the repo modules import
+
+from mesh import SPHERE, TORUS
+from meshImport import loadMesh
+from picking import pickMesh
+from simplify import lodChain
+
+def deviation(mesh, level, samples=500):
+    """
+    Largest distance of (a sample of) level's vertices from mesh's surface, / bounding radius. Measured along the
+    level's normals with rays starting a tenth of the radius off the vertex, so bigger deviations count as that much.
+    """
+    rng = np.random.default_rng(0)
+    reach = 0.1 * mesh.boundingRadius
+    worst = 0.0
+    for vertex in rng.choice(level.vertexCount, min(samples, level.vertexCount), replace=False).tolist():
+        point, normal = level.vertices[vertex], level.vertexNormals()[vertex]
+        hits = [pickMesh(mesh, point + normal * reach, -normal), pickMesh(mesh, point - normal * reach, normal)]
+        worst = max(worst, min([abs(hit.distance - reach) for hit in hits if hit is not None] or [reach]))
+    return worst / mesh.boundingRadius
+
+def flippedFaces(mesh, level, samples=500):
+    """How many of (a sample of) level's triangles face against the triangle of mesh right beneath them"""
+    rng = np.random.default_rng(0)
+    reach = 0.1 * mesh.boundingRadius
+    flipped = 0
+    for face in rng.choice(level.triangleCount, min(samples, level.triangleCount), replace=False).tolist():
+        center, normal = level.vertices[level.triangles[face]].mean(axis=0), level.faceNormals()[face]
+        hit = pickMesh(mesh, center + normal * reach, -normal)
+        flipped += hit is not None and float(np.dot(mesh.faceNormals()[hit.face], normal)) < 0
+    return flipped
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("files", nargs="*", help="OBJ/STL/PLY files to simplify too")
+    parser.add_argument("--resolution", type=int, default=128, help="of the procedural shapes")
+    arguments = parser.parse_args(argv)
+
+    meshes = [SPHERE.mesh(arguments.resolution), TORUS.mesh(arguments.resolution)] + [loadMesh(path) for path in arguments.files]
+    for mesh in meshes:
+        start = time.perf_counter()
+        levels = lodChain(mesh.vertices, mesh.triangles, mesh.edges, mesh.colors, mesh.name)
+        print("%-28s %9d triangles  chain built in %.2f s" % (mesh.name, mesh.triangleCount, time.perf_counter() - start))
+        for level in levels:
+            error, flipped = deviation(mesh, level), flippedFaces(mesh, level)
+            print("    %9d triangles  max deviation %.4f  %d sampled faces flipped" % (level.triangleCount, error, flipped))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,109 @@
+"""
+Cost of transparency at about a million triangles.
+  sort   -> CPU time of the back-to-front sort (transparency.DepthSorter) as the view turns past RESORT_DEGREES every
+            frame (the worst case, every frame sorts), runs anywhere
+  frames -> with PyOpenGL and Qt: frame time of the opaque shape, the depth sorted one and the weighted blended OIT one
+            (offscreen, software GL unless --hardware, like suite.py), and their ratio to the opaque frame
+Exits with 1 if a transparency mode costs more than MAX_RATIO times the opaque frame, and with NOT_MEASURED (3) if
+that could not be checked (no PyOpenGL/Qt, or a mode the driver does not support) -> the output says NOT MEASURED and
+benchmarks/suite.py reports it as such, --require-frames makes it a failure (1) instead.
+Run from the repo root: python benchmarks/benchTransparency.py [--frames N] [--hardware] [--require-frames]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+if "--hardware" not in sys.argv:
+    os.environ.setdefault("LIBGL_ALWAYS_SOFTWARE", "1")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # so the repo modules import
+
+from mesh import sphereMesh
+from transparency import DepthSorter
+
+MAX_RATIO = 2.0 # transparent frame time / opaque frame time
+NOT_MEASURED = 3 # exit status when the frame comparison could not run, see benchmarks/suite.py
+SURFACE_ALPHA = 0.5
+
+def benchSort(mesh, frames):
+    """Median and max ms of DepthSorter.sort with a view axis that turns 1.15 degrees every frame -> every call sorts"""
+    sorter = DepthSorter(mesh)
+    times = []
+    for frame in range(frames):
+        angle = 0.02 * frame
+        start = time.perf_counter()
+        sorter.sort((np.sin(angle), 0.3, np.cos(angle)))
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times)), max(times)
+
+def benchFrames(mesh, arguments):
+    """{mode: median frame ms} for opaque, sorted and weighted, or the reason they cannot be measured (no PyOpenGL/Qt)"""
+    try:
+        from PySide2.QtWidgets import QApplication
+        from customGL import GLWidget
+        from headless import OffscreenRenderer
+        from suite import timeFrames
+    except ImportError as error:
+        return str(error)
+
+    application = QApplication(sys.argv[:1])
+    widget = GLWidget()
+    widget.addMesh(mesh)
+    widget.setCurrentShape(len(widget.meshes) - 1)
+    widget.setRenderBackend("buffered")
+    widget.setYRotSpeed(10) # 0.5 degrees a frame -> a steady spin re-sorts every 3rd frame (RESORT_DEGREES)
+    renderer = OffscreenRenderer(widget, arguments.width, arguments.height, arguments.samples)
+    results = {}
+    try:
+        for mode in ("opaque", "sorted", "weighted"):
+            opaque = mode == "opaque"
+            widget.setSurfaceColor(tuple(widget.surfaceColor[:3]) + (1.0 if opaque else SURFACE_ALPHA,))
+            if not opaque:
+                widget.setTransparencyMode(mode)
+            results[mode] = float(np.median(timeFrames(renderer, arguments.frames, arguments.warmup))) * 1000
+            if not opaque and widget.transparencyMode != mode:
+                results[mode] = None # fell back to sorting, not supported by this driver
+    finally:
+        renderer.close()
+    return results
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--height", type=int, default=800)
+    parser.add_argument("--samples", type=int, default=0)
+    parser.add_argument("--hardware", action="store_true", help="use the real GPU driver instead of software GL")
+    parser.add_argument("--require-frames", action="store_true", help="fail (exit 1) when the frames cannot be measured")
+    arguments = parser.parse_args(argv)
+    if arguments.frames < 1 or arguments.width < 1 or arguments.height < 1 or arguments.warmup < 0:
+        parser.error("--frames, --width and --height must be at least 1, --warmup at least 0")
+    notMeasured = 1 if arguments.require_frames else NOT_MEASURED
+
+    mesh = sphereMesh(512, 1024)
+    median, worst = benchSort(mesh, arguments.frames)
+    print("%s: %d triangles" % (mesh.name, mesh.triangleCount))
+    print("sort     %8.2f ms median  %8.2f ms max" % (median, worst))
+
+    frames = benchFrames(mesh, arguments)
+    if isinstance(frames, str):
+        print("frames   NOT MEASURED (%s) -> the %.1fx frame time limit was not checked" % (frames, MAX_RATIO))
+        return notMeasured
+    failed = skipped = False
+    for mode, milliseconds in frames.items():
+        if milliseconds is None:
+            print("%-8s NOT MEASURED (not supported by this driver)" % mode)
+            skipped = True
+            continue
+        ratio = milliseconds / frames["opaque"]
+        failed |= ratio > MAX_RATIO
+        print("%-8s %8.2f ms  x%.2f%s" % (mode, milliseconds, ratio, "  OVER %.1fx" % MAX_RATIO if ratio > MAX_RATIO else ""))
+    return 1 if failed else notMeasured if skipped else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
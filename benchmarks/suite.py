@@ -0,0 +1,333 @@
+"""
+Reproducible rendering benchmark suite for GLWidget, runs headless (offscreen Qt, software GL by default) so it
+gives comparable numbers on a CPU-only Linux box. For every shape (procedural ones at several resolutions) it measures
+  build     -> the make* call that compiles the shape's display list
+  frame     -> frame time of each render backend (draw + glFinish, no readback)
+  rainbow   -> frame time when every frame gets a new set of rainbow colors
+and then soaks thousands of frames (cycling shapes, backends and rainbow ticks) while watching the process memory
+and the number of live GL display lists/buffers/textures, which must not grow.
+Before that it runs the CHECKS, benchmarks that verify their own results: any of them failing fails the run, one that
+could not measure what it checks is listed as NOT MEASURED.
+Results are written as JSON. With a baseline every metric is compared and the run exits with 1 if any got worse
+than its tolerance allows, --save-baseline stores the current run as the new baseline instead.
+Run from the repo root: python benchmarks/suite.py [--quick] [--baseline benchmarks/baseline.json] [--save-baseline]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# software GL and no display unless asked otherwise -> has to be set before Qt and PyOpenGL are imported below
+if "--hardware" not in sys.argv:
+    os.environ.setdefault("LIBGL_ALWAYS_SOFTWARE", "1")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # so the repo modules import
+
+from PySide2.QtWidgets import QApplication
+from OpenGL.GL import *
+
+from customGL import GLWidget
+from headless import OffscreenRenderer
+from mesh import ProceduralShape, sphereMesh, torusMesh, geodesicMesh, geodesicLevel
+from transforms import IDENTITY_QUATERNION
+
+SUITE_VERSION = 1 # bump when metrics change meaning, baselines of another version are not compared
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# make* method of each built-in shape, same order as mesh.SHAPES
+MAKERS = ("makeCube", "makePyramid", "makeTetrahedron", "makeOctahedron", "makeSphere", "makeTorus",
+          "makeIcosahedron", "makeDodecahedron", "makeGeodesicSphere")
+
+# how much worse than the baseline a metric may get -> new > old * (1 + tolerance) + slack fails
+TIME_TOLERANCE = 0.25 # relative, software GL timings are steady to a few percent once warmed up
+TIME_SLACK_MS = 0.05 # absolute, so sub-millisecond frames do not fail on timer noise
+MEMORY_SLACK_MIB = 8.0 # growth over the soak, allocator noise stays well below this
+PROBE_NAMES = 4096 # GL names probed with glIs* when counting live objects
+
+# (script, arguments) next to this file -> they exit with 1 when a result is wrong (not just slow)
+# and with NOT_MEASURED when they could not measure it (e.g. a GL feature the driver lacks)
+CHECKS = (("benchRaster.py", "128"), # software rasterizer against a scalar reference and across tiles/workers
+          ("benchCulling.py",), # SceneBVH frustum culling against testing every object
+          ("benchTransparency.py", "--frames", "10", "--warmup", "2"), # sorted/OIT frames within 2x the opaque one
+          ("benchColors.py", "--frames", "20"), # a color drag recompiles no display list
+          ("benchPicking.py", "50")) # BVH picks against testing every triangle, and within budget on a million
+NOT_MEASURED = 3
+CHECK_OUTCOMES = {0: "passed", NOT_MEASURED: "not measured"} # any other exit status -> "failed"
+
+def runChecks():
+    """Runs every CHECKS script in its own process, returns {script: "passed", "failed" or "not measured"}"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    outcomes = {}
+    for script, *args in CHECKS:
+        print("check: %s %s" % (script, " ".join(args)), flush=True)
+        status = subprocess.call([sys.executable, os.path.join(here, script)] + list(args))
+        outcomes[script] = CHECK_OUTCOMES.get(status, "failed")
+    return outcomes
+
+def metric(value, unit, tolerance=TIME_TOLERANCE, slack=TIME_SLACK_MS):
+    """One result entry, lower is always better"""
+    return {"value": round(float(value), 4), "unit": unit, "tolerance": tolerance, "slack": slack}
+
+def residentMiB():
+    """Resident set size of this process in MiB (Linux)"""
+    with open("/proc/self/statm") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+def liveGLObjects():
+    """Counts the display lists, buffers and textures the driver holds, independent of the widget's own bookkeeping"""
+    return {"lists": sum(1 for name in range(1, PROBE_NAMES) if glIsList(name)),
+            "buffers": sum(1 for name in range(1, PROBE_NAMES) if glIsBuffer(name)),
+            "textures": sum(1 for name in range(1, PROBE_NAMES) if glIsTexture(name))}
+
+def clearGeneratedMeshes():
+    """Empties the procedural mesh caches so the next make* pays for generating the mesh too"""
+    for generator in (sphereMesh, torusMesh, geodesicMesh):
+        generator.cache_clear()
+
+def shapeConfigs(widget, sizes):
+    """(label, shape index, resolution) for every built-in shape, procedural ones once per size"""
+    configs = []
+    for index, shape in enumerate(widget.meshes):
+        if isinstance(shape, ProceduralShape):
+            configs.extend(("%s@%d" % (shape.name, size), index, size) for size in sizes)
+        else:
+            configs.append((shape.name, index, None))
+    return configs
+
+def makeShape(widget, index, resolution):
+    """Calls the make* method of the shape at index, returns its display list"""
+    maker = getattr(widget, MAKERS[index])
+    if resolution is None:
+        return maker()
+    if MAKERS[index] == "makeGeodesicSphere":
+        return maker(geodesicLevel(resolution))
+    return maker(resolution)
+
+def percentile(times, q):
+    return float(np.percentile(np.asarray(times) * 1000, q))
+
+def resetWidget(widget, index, resolution, backend, rainbow):
+    """Puts the widget in the same state before every measurement, so runs only differ by what they measure"""
+    widget.setRainbowSeed(0)
+    if widget.rainbowMode != rainbow:
+        widget.toggleRainbowMode()
+    widget.setCurrentShape(index)
+    widget.setDetailOverride(resolution)
+    widget.setRenderBackend(backend)
+    widget.orientation = IDENTITY_QUATERNION.copy()
+    widget.previousOrientation = IDENTITY_QUATERNION.copy()
+    widget.accumulator = 0.0
+
+def timeFrames(renderer, frames, warmup, rainbow=False):
+    """Per-frame seconds of frames frames (after warmup untimed ones), the shape spins one fixed step per frame"""
+    widget = renderer.widget
+    times = []
+    for frame in range(warmup + frames):
+        start = time.perf_counter()
+        widget.advance(widget.FIXED_TIMESTEP)
+        if rainbow:
+            widget.regenerateRainbowColors() # what step() does on a rainbow tick
+        renderer.draw()
+        glFinish() # wait for the (software) rasterizer, otherwise we only time the command submission
+        if frame >= warmup:
+            times.append(time.perf_counter() - start)
+    return times
+
+def benchBuild(widget, configs, repeats):
+    """build/<shape> -> median ms of a cold make* (procedural meshes regenerated too)"""
+    results = {}
+    for label, index, resolution in configs:
+        times = []
+        for _ in range(repeats):
+            clearGeneratedMeshes()
+            start = time.perf_counter()
+            shape = makeShape(widget, index, resolution)
+            glFinish()
+            times.append(time.perf_counter() - start)
+            glDeleteLists(shape, 1)
+        results["build/%s" % label] = metric(np.median(times) * 1000, "ms")
+    return results
+
+def benchFrames(renderer, configs, frames, rainbowFrames, warmup):
+    """frame/<backend>/<shape>/p50|p95 and rainbow/<backend>/<shape>/p50|p95 in ms"""
+    results = {}
+    for backend in GLWidget.RENDER_BACKENDS:
+        for label, index, resolution in configs:
+            for kind, count, rainbow in (("frame", frames, False), ("rainbow", rainbowFrames, True)):
+                resetWidget(renderer.widget, index, resolution, backend, rainbow)
+                times = timeFrames(renderer, count, warmup, rainbow)
+                for q in (50, 95):
+                    results["%s/%s/%s/p%d" % (kind, backend, label, q)] = metric(percentile(times, q), "ms")
+    resetWidget(renderer.widget, 0, None, "immediate", False)
+    return results
+
+def benchSoak(renderer, configs, frames):
+    """
+    soak/* -> memory and live GL object growth over frames frames, plus the frame time spread.
+    One pass over every shape and backend happens before the first sample so all caches are filled,
+    after that the counts must stay flat however long we keep going.
+    """
+    widget = renderer.widget
+    plan = [(index, resolution, backend) for backend in GLWidget.RENDER_BACKENDS for label, index, resolution in configs]
+    framesPerShape = max(1, frames // len(plan))
+
+    def runPlan(steps):
+        times = []
+        for step in range(steps):
+            index, resolution, backend = plan[(step // framesPerShape) % len(plan)]
+            if (index, resolution, backend) != (widget.shapeIndex, widget.lodOverride, widget.renderBackend):
+                widget.setCurrentShape(index)
+                widget.setDetailOverride(resolution)
+                widget.setRenderBackend(backend)
+            widget.advance(widget.FIXED_TIMESTEP)
+            if step % 5 == 0:
+                widget.regenerateRainbowColors()
+            start = time.perf_counter()
+            renderer.draw()
+            glFinish()
+            times.append(time.perf_counter() - start)
+        return times
+
+    resetWidget(widget, 0, None, "immediate", True)
+    runPlan(len(plan) * framesPerShape) # warm up -> every list, buffer and mesh exists once
+    tracemalloc.start()
+    rssBefore, heapBefore, objectsBefore = residentMiB(), tracemalloc.get_traced_memory()[0], liveGLObjects()
+    times = runPlan(frames)
+    rssAfter, heapAfter, objectsAfter = residentMiB(), tracemalloc.get_traced_memory()[0], liveGLObjects()
+    tracemalloc.stop()
+    resetWidget(widget, 0, None, "immediate", False)
+
+    results = {"soak/rssGrowth": metric(max(0.0, rssAfter - rssBefore), "MiB", 0.0, MEMORY_SLACK_MIB),
+               "soak/heapGrowth": metric(max(0.0, (heapAfter - heapBefore) / 2**20), "MiB", 0.0, MEMORY_SLACK_MIB),
+               "soak/frame/p50": metric(percentile(times, 50), "ms"),
+               "soak/frame/p99": metric(percentile(times, 99), "ms")}
+    for kind in objectsAfter:
+        # any growth means something is not deleted, and the steady count itself should not creep up between versions
+        results["soak/gl/%sGrowth" % kind] = metric(max(0, objectsAfter[kind] - objectsBefore[kind]), "objects", 0.0, 0.0)
+        results["soak/gl/%s" % kind] = metric(objectsAfter[kind], "objects", 0.0, 0.0)
+    return results
+
+def environment(arguments):
+    """What the numbers depend on, a baseline from a different setup is still compared but with a warning"""
+    return {"suiteVersion": SUITE_VERSION,
+            "renderer": glGetString(GL_RENDERER).decode("ascii", "replace"),
+            "glVersion": glGetString(GL_VERSION).decode("ascii", "replace"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpus": os.cpu_count(),
+            "size": [arguments.width, arguments.height],
+            "samples": arguments.samples,
+            "sizes": arguments.sizes,
+            "frames": arguments.frames,
+            "soakFrames": arguments.soak_frames}
+
+def compare(results, baseline):
+    """Prints every metric next to its baseline, returns the names of the ones that regressed"""
+    if baseline["meta"].get("suiteVersion") != SUITE_VERSION:
+        print("baseline was written by suite version %s, this is %d -> not compared" % (baseline["meta"].get("suiteVersion"), SUITE_VERSION))
+        return []
+    for key in ("renderer", "size", "samples", "sizes", "frames", "soakFrames"):
+        if baseline["meta"].get(key) != results["meta"][key]:
+            print("warning: %s differs from the baseline (%r, baseline %r), timings may not be comparable" %
+                  (key, results["meta"][key], baseline["meta"].get(key)))
+
+    regressions = []
+    print("%-48s %12s %12s %8s" % ("metric", "baseline", "now", "ratio"))
+    for name, old in sorted(baseline["metrics"].items()):
+        new = results["metrics"].get(name)
+        if new is None:
+            print("%-48s %12.3f %12s %8s" % (name, old["value"], "missing", ""))
+            continue
+        limit = old["value"] * (1 + new["tolerance"]) + new["slack"]
+        ratio = new["value"] / old["value"] if old["value"] else float("inf") if new["value"] else 1.0
+        failed = new["value"] > limit
+        print("%-48s %12.3f %12.3f %7.2fx%s" % (name, old["value"], new["value"], ratio, "  <-- REGRESSION" if failed else ""))
+        if failed:
+            regressions.append(name)
+    return regressions
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(description="Headless rendering benchmarks for GLWidget")
+    parser.add_argument("--output", default="benchmark-results.json", help="where to write this run's results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline instead of comparing")
+    parser.add_argument("--hardware", action="store_true", help="use the GPU driver instead of forcing software GL")
+    parser.add_argument("--skip-checks", action="store_true", help="do not run the CHECKS scripts")
+    parser.add_argument("--quick", action="store_true", help="fewer sizes and frames, for a smoke test (not comparable)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 32, 128], help="resolutions of the procedural shapes")
+    parser.add_argument("--frames", type=int, default=120, help="timed frames per shape and backend")
+    parser.add_argument("--rainbow-frames", type=int, default=30, help="timed rainbow frames per shape and backend")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed frames before each measurement")
+    parser.add_argument("--repeats", type=int, default=5, help="make* calls per shape, the median is kept")
+    parser.add_argument("--soak-frames", type=int, default=3000, help="frames of the memory/GL object soak")
+    parser.add_argument("--width", type=int, default=512)
+    parser.add_argument("--height", type=int, default=512)
+    parser.add_argument("--samples", type=int, default=0, help="MSAA samples (0 keeps software GL timings steady)")
+    arguments = parser.parse_args(argv)
+    if arguments.quick:
+        arguments.sizes, arguments.frames, arguments.rainbow_frames = [8, 32], 20, 5
+        arguments.warmup, arguments.repeats, arguments.soak_frames = 3, 2, 300
+    return arguments
+
+def main(argv):
+    arguments = parseArguments(argv)
+    checks = {} if arguments.skip_checks else runChecks()
+    application = QApplication(sys.argv[:1])
+    widget = GLWidget(rainbowSeed=0)
+    widget.setYRotSpeed(10) # spin so every frame really has a new model matrix
+    widget.setXRotSpeed(3)
+    renderer = OffscreenRenderer(widget, arguments.width, arguments.height, arguments.samples)
+    try:
+        configs = shapeConfigs(widget, arguments.sizes)
+        results = {"meta": environment(arguments), "metrics": {}}
+        results["meta"]["checks"] = checks
+        print("renderer: %s, %d shape configurations" % (results["meta"]["renderer"], len(configs)))
+
+        start = time.perf_counter()
+        results["metrics"].update(benchBuild(widget, configs, arguments.repeats))
+        results["metrics"].update(benchFrames(renderer, configs, arguments.frames, arguments.rainbow_frames, arguments.warmup))
+        results["metrics"].update(benchSoak(renderer, configs, arguments.soak_frames))
+        results["meta"]["seconds"] = round(time.perf_counter() - start, 1)
+    finally:
+        renderer.close()
+
+    with open(arguments.output, "w") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+    print("wrote %d metrics to %s in %.1f s" % (len(results["metrics"]), arguments.output, results["meta"]["seconds"]))
+
+    for script, outcome in sorted(checks.items()):
+        print("check %-24s %s" % (script, outcome.upper() if outcome != "passed" else outcome))
+    failedChecks = sorted(script for script, outcome in checks.items() if outcome == "failed")
+    if failedChecks:
+        print("\n%d CHECK(S) FAILED, wrong results (not saved as a baseline):\n  %s" % (len(failedChecks), "\n  ".join(failedChecks)),
+              file=sys.stderr)
+        return 1
+
+    if arguments.save_baseline:
+        with open(arguments.baseline, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+        print("saved as the baseline %s" % arguments.baseline)
+        return 0
+    if not os.path.exists(arguments.baseline):
+        print("no baseline at %s, run with --save-baseline to create one" % arguments.baseline)
+        return 0
+    with open(arguments.baseline) as file:
+        regressions = compare(results, json.load(file))
+    if regressions:
+        print("\n%d REGRESSION(S) against %s:\n  %s" % (len(regressions), arguments.baseline, "\n  ".join(regressions)),
+              file=sys.stderr)
+        return 1
+    print("no regressions against %s" % arguments.baseline)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
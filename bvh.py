@@ -0,0 +1,260 @@
+"""
+Bounding volume hierarchies, built and queried with NumPy.
+SceneBVH -> over the objects of a scene, for view-frustum culling.
+TriangleBVH -> over the triangles of a mesh, for ray casts (mouse picking).
+"""
+import numpy as np
+
+def spreadBits(values):
+    """Spreads the low 10 bits of each value 3 apart (helper for 30-bit Morton codes)"""
+    v = values.astype(np.uint32) & 0x3FF
+    v = (v | (v << 16)) & 0x030000FF
+    v = (v | (v << 8)) & 0x0300F00F
+    v = (v | (v << 4)) & 0x030C30C3
+    v = (v | (v << 2)) & 0x09249249
+    return v
+
+def mortonCodes(points):
+    """Morton (z-order) codes of points, nearby points get nearby codes so sorting by them groups them spatially"""
+    lo, hi = points.min(axis=0), points.max(axis=0)
+    cells = (points - lo) / np.where(hi > lo, hi - lo, 1.0) * 1023
+    return (spreadBits(cells[:, 0]) << 2) | (spreadBits(cells[:, 1]) << 1) | spreadBits(cells[:, 2])
+
+class SceneBVH:
+    """
+    A BVH over bounding spheres (center, radius), stored as an implicit complete binary tree:
+    node i has children 2i+1 and 2i+2, the leaves are the last leafCount nodes and each holds up to LEAF_SIZE objects.
+    Objects are put into leaves in Morton order, so the whole build is a sort plus array reductions.
+    Moving objects only needs a refit (recompute the boxes above them), not a rebuild.
+    """
+    LEAF_SIZE = 8
+
+    def __init__(self, centers, radii):
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+        self.count = len(centers)
+        self.leafCount = 1 << max(0, int(np.ceil(np.log2(max(1, -(-self.count // self.LEAF_SIZE)))))) # a power of two
+        self.depth = int(np.log2(self.leafCount)) # levels below the root
+        self.firstLeaf = self.leafCount - 1 # node index of the first leaf
+
+        # slot -> object in Morton order, padded with -1 to fill every leaf
+        self.slots = np.full(self.leafCount * self.LEAF_SIZE, -1, dtype=np.int64)
+        if self.count:
+            self.slots[:self.count] = np.argsort(mortonCodes(centers), kind="stable")
+        self.slotOf = np.empty(self.count, dtype=np.int64) # object -> slot
+        self.slotOf[self.slots[:self.count]] = np.arange(self.count)
+
+        nodeCount = 2 * self.leafCount - 1
+        self.mins = np.full((nodeCount, 3), np.inf)
+        self.maxs = np.full((nodeCount, 3), -np.inf)
+        self.refit(centers, radii)
+
+    def leafBoxes(self, centers, radii, leaves):
+        """Boxes of the given leaves from the object spheres, empty slots contribute nothing"""
+        slots = self.slots.reshape(self.leafCount, self.LEAF_SIZE)[leaves]
+        used = slots >= 0
+        objects = np.where(used, slots, 0)
+        extent = np.asarray(radii, dtype=np.float64)[objects][..., None]
+        lo = np.where(used[..., None], centers[objects] - extent, np.inf)
+        hi = np.where(used[..., None], centers[objects] + extent, -np.inf)
+        return lo.min(axis=1), hi.max(axis=1)
+
+    def refit(self, centers, radii, moved=None):
+        """
+        Recomputes the boxes after objects moved. With moved (object indices) only their leaves and the nodes
+        above them are touched, otherwise the whole tree is refit. Either way it is one array pass per level.
+        """
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+        radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), (self.count,))
+        if not self.count:
+            return # nothing to bound, every box stays empty
+        if moved is None:
+            leaves = np.arange(self.leafCount)
+        else:
+            leaves = np.unique(self.slotOf[np.asarray(moved, dtype=np.int64)] // self.LEAF_SIZE)
+        nodes = self.firstLeaf + leaves
+        self.mins[nodes], self.maxs[nodes] = self.leafBoxes(centers, radii, leaves)
+
+        # walk up a level at a time, each parent is the union of its 2 children
+        for level in range(self.depth):
+            nodes = np.unique((nodes - 1) // 2)
+            left, right = 2 * nodes + 1, 2 * nodes + 2
+            self.mins[nodes] = np.minimum(self.mins[left], self.mins[right])
+            self.maxs[nodes] = np.maximum(self.maxs[left], self.maxs[right])
+
+    def query(self, planes, centers=None, radii=None):
+        """
+        Indices of the objects whose box is not completely outside the planes (as from transforms.frustumPlanes).
+        Nodes fully inside every plane accept their whole subtree without more tests. When centers/radii are given
+        the objects of partially visible leaves are also tested one by one against their spheres.
+        """
+        planes = np.asarray(planes, dtype=np.float64)
+        normals, offsets = planes[:, :3], planes[:, 3]
+        positive = normals >= 0
+
+        def classify(nodes):
+            # p-vertex (furthest along the normal) decides "outside", n-vertex (nearest) decides "fully inside"
+            lo, hi = self.mins[nodes][:, None, :], self.maxs[nodes][:, None, :]
+            with np.errstate(invalid="ignore"): # empty nodes have infinite boxes, they are dropped below anyway
+                far = (np.where(positive, hi, lo) * normals).sum(-1) + offsets
+                near = (np.where(positive, lo, hi) * normals).sum(-1) + offsets
+            empty = self.mins[nodes, 0] > self.maxs[nodes, 0]
+            return (far >= 0).all(axis=1) & ~empty, (near >= 0).all(axis=1)
+
+        inside = [] # nodes accepted whole
+        nodes = np.zeros(1, dtype=np.int64)
+        for level in range(self.depth + 1):
+            visible, contained = classify(nodes)
+            inside.append(nodes[visible & contained])
+            nodes = nodes[visible & ~contained]
+            if level < self.depth:
+                nodes = np.stack((2 * nodes + 1, 2 * nodes + 2), axis=-1).ravel()
+
+        # partially visible leaves -> optionally test each object sphere
+        slots = self.slots.reshape(self.leafCount, self.LEAF_SIZE)
+        partial = slots[nodes - self.firstLeaf].ravel()
+        partial = partial[partial >= 0]
+        if centers is not None and len(partial):
+            distances = np.asarray(centers, dtype=np.float64)[partial] @ normals.T + offsets
+            extent = np.broadcast_to(np.asarray(radii, dtype=np.float64), (self.count,))[partial]
+            partial = partial[(distances >= -extent[:, None]).all(axis=1)]
+
+        # every leaf under a fully inside node -> a node at depth d covers a contiguous range of leaves
+        accepted = [partial]
+        for nodes in inside:
+            if not len(nodes):
+                continue
+            nodeDepth = np.floor(np.log2(nodes + 1)).astype(np.int64)
+            span = 1 << (self.depth - nodeDepth) # leaves under each node
+            firstLeaf = (nodes + 1) * span - 1 - self.firstLeaf
+            leaves = (firstLeaf[:, None] + np.arange(span.max())[None, :])
+            leaves = leaves[np.arange(span.max())[None, :] < span[:, None]]
+            objects = slots[leaves].ravel()
+            accepted.append(objects[objects >= 0])
+        return np.sort(np.concatenate(accepted))
+
+def bruteForceVisible(planes, centers, radii):
+    """Reference for SceneBVH.query -> tests every sphere against every plane"""
+    planes = np.asarray(planes, dtype=np.float64)
+    distances = np.asarray(centers, dtype=np.float64) @ planes[:, :3].T + planes[:, 3]
+    return np.flatnonzero((distances >= -np.asarray(radii, dtype=np.float64).reshape(-1, 1)).all(axis=1))
+
+class TriangleBVH:
+    """
+    A BVH over the triangles of one mesh for ray casts (picking), stored level by level as an implicit 16-ary tree:
+    node i of a level has children 16i..16i+15 on the next one, so a million triangles need only 4 levels and a
+    query only a few dozen array operations, which is what keeps it under a millisecond from Python.
+    Triangles are put into the leaves in Morton order of their centroids, the whole build is a sort plus reductions.
+    A ray walks the tree a level at a time (every node of the level it passes through in one array operation),
+    then tests the triangles of the leaves it reaches front to back, a few leaves at a time, and stops once a hit is
+    nearer than the next leaf -> a ray tests the first few leaves it crosses, not all of them.
+    """
+    BRANCHING = 16
+    LEAF_SIZE = 32 # most triangles per leaf, the actual size is picked so the leaves come out about full
+    LEAF_BATCH = 4 # leaves whose triangles are tested together, nearest entry first
+
+    def __init__(self, vertices, triangles):
+        self.vertices = np.asarray(vertices)
+        triangles = np.asarray(triangles)
+        self.count = len(triangles)
+        self.depth = 0 # levels below the root
+        while self.BRANCHING ** self.depth * self.LEAF_SIZE < self.count:
+            self.depth += 1
+        self.leafCount = self.BRANCHING ** self.depth
+        self.leafSize = max(1, -(-self.count // self.leafCount))
+
+        corners = self.vertices[triangles].astype(np.float64) if self.count else np.zeros((0, 3, 3))
+        lo, hi = corners.min(axis=1), corners.max(axis=1)
+        self.slots = np.full(self.leafCount * self.leafSize, -1, dtype=np.int64) # slot -> triangle, -1 pads the leaves
+        if self.count:
+            self.slots[:self.count] = np.argsort(mortonCodes((lo + hi) / 2), kind="stable")
+        # the corner indices in slot order, so a leaf's triangles are one contiguous block; padding is a degenerate
+        # (0, 0, 0) triangle that no ray can hit
+        self.slotTriangles = np.zeros((len(self.slots), 3), dtype=triangles.dtype if self.count else np.uint32)
+        self.slotTriangles[:self.count] = triangles[self.slots[:self.count]]
+
+        # leaf boxes, then every level above as the union of its children; boxes are (nodes, 6) min then max corners and
+        # nodes without triangles get NaN boxes, which fail every comparison of the ray test
+        used = (self.slots >= 0).reshape(self.leafCount, self.leafSize, 1)
+        triangle = np.maximum(self.slots, 0).reshape(self.leafCount, self.leafSize)
+        mins = np.where(used, lo[triangle] if self.count else np.inf, np.inf).min(axis=1)
+        maxs = np.where(used, hi[triangle] if self.count else -np.inf, -np.inf).max(axis=1)
+        self.boxes = []
+        for level in range(self.depth + 1):
+            boxes = np.concatenate((mins, maxs), axis=1)
+            boxes[mins[:, 0] > maxs[:, 0]] = np.nan
+            self.boxes.insert(0, boxes)
+            mins = mins.reshape(-1, self.BRANCHING, 3).min(axis=1) if level < self.depth else mins
+            maxs = maxs.reshape(-1, self.BRANCHING, 3).max(axis=1) if level < self.depth else maxs
+
+    def leaves(self, origin, direction):
+        """
+        The leaves whose boxes the ray (origin + t direction, t >= 0) passes through, and the t where it enters each.
+        The sign of each direction component says which of a box's two planes on that axis the ray meets first, so
+        the entry and exit distances are a max and a min over fixed columns (no min/max between plane pairs).
+        """
+        inverse = 1.0 / np.where(direction == 0, 1e-300, direction) # axis parallel rays -> huge slopes, no NaNs
+        origin6, inverse6 = np.tile(origin, 2), np.tile(inverse, 2)
+        enters = np.where(inverse >= 0, 0, 3) + np.arange(3) # columns of the planes the ray meets first
+        exits = np.where(inverse >= 0, 3, 0) + np.arange(3)
+        children = np.arange(self.BRANCHING)
+        nodes = np.zeros(1, dtype=np.int64)
+        for level in range(self.depth + 1):
+            slabs = (self.boxes[level][nodes] - origin6) * inverse6 # (nodes, 6) where the ray crosses each box plane
+            enter, leave = slabs[:, enters].max(axis=1), slabs[:, exits].min(axis=1)
+            passed = (enter <= leave) & (leave >= 0)
+            nodes, enter = nodes[passed], enter[passed]
+            if level < self.depth:
+                nodes = (nodes[:, None] * self.BRANCHING + children).ravel()
+        return nodes, enter
+
+    def intersect(self, origin, direction):
+        """Nearest hit of the ray -> (triangle, t, u, v) with the point at origin + t direction, or None"""
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+        leaves, enter = self.leaves(origin, direction)
+        if not len(leaves):
+            return None
+        order = np.argsort(enter)
+        leaves, enter = leaves[order], enter[order].tolist() + [np.inf]
+        best = None
+        for start in range(0, len(leaves), self.LEAF_BATCH):
+            if best is not None and best[1] <= enter[start]:
+                break # every leaf left starts behind the hit we have
+            slots = (leaves[start:start + self.LEAF_BATCH, None] * self.leafSize + np.arange(self.leafSize)).ravel()
+            hit = intersectTriangles(self.vertices, self.slotTriangles[slots], origin, direction)
+            if hit is not None and (best is None or hit[1] < best[1]):
+                best = (int(self.slots[slots[hit[0]]]),) + hit[1:]
+        return best
+
+def intersectTriangles(vertices, triangles, origin, direction):
+    """
+    Moller-Trumbore against triangles ((n, 3) corner indices), both sides count (the shapes draw without culling).
+    Returns the nearest hit in front of the origin as (row in triangles, t, u, v), u and v being the barycentric
+    weights of the 2nd and 3rd corners, or None if the ray misses them all.
+    The crosses with the ray direction are products with its 3x3 cross product matrix, and t uses the face normal
+    (e2 . (s x e1) = s . (e1 x e2)), which keeps this to a few whole-array operations.
+    """
+    corners = vertices[triangles].astype(np.float64)
+    v0 = corners[:, 0]
+    edge1, edge2 = corners[:, 1] - v0, corners[:, 2] - v0
+    dx, dy, dz = direction
+    crossDirection = np.array(((0.0, -dz, dy), (dz, 0.0, -dx), (-dy, dx, 0.0))) # a @ crossDirection = a x direction
+    normals = edge1[:, (1, 2, 0)] * edge2[:, (2, 0, 1)] - edge1[:, (2, 0, 1)] * edge2[:, (1, 2, 0)] # np.cross, minus its overhead
+    ones = np.ones(3)
+    s = origin - v0
+    determinant = normals @ -direction # edge1 . (direction x edge2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inverse = 1.0 / determinant
+        u = ((s * -(edge2 @ crossDirection)) @ ones) * inverse # s . (direction x edge2)
+        v = ((s * (edge1 @ crossDirection)) @ ones) * inverse # direction . (s x edge1) = s . (edge1 x direction)
+        t = ((s * normals) @ ones) * inverse
+        hit = (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0) & np.isfinite(inverse) & (determinant != 0)
+    if not hit.any():
+        return None
+    candidates = np.flatnonzero(hit)
+    nearest = candidates[t[candidates].argmin()]
+    return int(nearest), float(t[nearest]), float(u[nearest]), float(v[nearest])
+
+def bruteForceIntersect(vertices, triangles, origin, direction):
+    """Reference for TriangleBVH.intersect -> tests every triangle"""
+    return intersectTriangles(vertices, np.asarray(triangles), np.asarray(origin, dtype=np.float64), np.asarray(direction, dtype=np.float64))
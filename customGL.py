@@ -1,24 +1,76 @@
 #NOTE: In progress -> Rainbow mode and pulsing/sweeping mode for colors/extras
 import numpy as np
-import math
-import random
-import sys
-from PIL import Image
-from PySide2.QtGui import QOpenGLFunctions
-from PySide2.QtWidgets import QApplication, QMessageBox, QOpenGLWidget
-from PySide2.QtCore import Signal, SIGNAL, SLOT, QTimer
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from PySide2.QtGui import QOpenGLFunctions, QPainter, QColor, QFont
+from PySide2.QtWidgets import QOpenGLWidget
+from PySide2.QtCore import Qt, Signal, QTimer
 
 try:
     from OpenGL.GL import *
-except ImportError:
-    app = QApplication(sys.argv)
-    messageBox = QMessageBox(QMessageBox.Critical, "OpenGL Dialog",
-                                       "PyOpenGL must be installed to run this application. If you are seeing this, try what is in the 'show details' below." +
-                                       "\nIf that fails, email me, please.",
-                                       QMessageBox.Close)
-    messageBox.setDetailedText("Run:\npip install PyOpenGL PyOpenGL_accelerate")
-    messageBox.exec_()
-    sys.exit(1)
+except ImportError as error:
+    # 3DApp.py catches this and falls back to the NumPy software renderer (softwareWidget.py)
+    raise ImportError("PyOpenGL must be installed for the OpenGL renderer, run: pip install PyOpenGL PyOpenGL_accelerate") from error
+
+#custom classes -> imported after the check above since they need PyOpenGL too
+from glBuffers import ShapeBuffers, InstancedBatch
+from shaders import (ShaderCache, INSTANCED_VERTEX_SHADER, INSTANCED_FRAGMENT_SHADER, INSTANCED_ATTRIBUTES, COLOR_VERTEX_SHADER,
+                     COLOR_FRAGMENT_SHADER, COLOR_ATTRIBUTES, COLOR_PART_LOCATION, EDGE_PART, FACE_PART, WIREFRAME_VERTEX_SHADER,
+                     WIREFRAME_GEOMETRY_SHADER, WIREFRAME_FRAGMENT_SHADER, setLightUniforms)
+from textures import TextureLoader, TextureCache, texturedMesh
+from meshCache import loadCachedMesh
+from profiling import FrameProfiler
+from renderState import RenderState
+from transforms import (IDENTITY_QUATERNION, quatIntegrate, quatNlerp, modelMatrix, glMatrix, frustumMatrix,
+                        translationMatrix, frustumPlanes, unprojectRay)
+from picking import meshBVH, pickMesh
+from lighting import SHADING_MODES, LIGHT_DIRECTION, LIGHT_AMBIENT, LIGHT_DIFFUSE
+from transparency import TRANSPARENCY_MODES, DepthSorter
+from oit import WeightedBlendedOIT
+from mesh import (CUBE, PYRAMID, TETRAHEDRON, OCTAHEDRON, SPHERE, TORUS, ICOSAHEDRON, DODECAHEDRON, GEODESIC_SPHERE,
+                  SHAPES, ProceduralShape, geodesicMesh, geodesicLevel)
+from simplify import LodChain, LOD_MIN_TRIANGLES, lodChain
+
+class ShapeCache:
+    """
+    Holds one compiled display list per shape index so paintGL can just call it.
+    A list is only recompiled when its key (shape, shading and, without the color program, colors and rainbow generation)
+    changes, and the list it replaces is freed right away so the number of live lists stays flat.
+    """
+    def __init__(self):
+        self.entries = {} # shape index -> (key, display list)
+        self.hits = 0 # number of lookups served by an already compiled list
+        self.misses = 0 # number of lookups that had to compile a new list
+
+    @property
+    def liveLists(self):
+        """The number of display lists currently owned by the cache"""
+        return len(self.entries)
+
+    def get(self, index, key, build):
+        """Returns the display list for index, calling build() to compile a new one only if key changed"""
+        entry = self.entries.get(index)
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        if entry is not None:
+            glDeleteLists(entry[1], 1) # free the stale list before we replace it
+        shape = build()
+        self.entries[index] = (key, shape)
+        return shape
+
+    def clear(self):
+        """Deletes every display list owned by the cache (needs a current context)"""
+        for key, shape in self.entries.values():
+            glDeleteLists(shape, 1)
+        self.entries.clear()
+
+    def stats(self):
+        """Returns the cache counters as a dict, handy for logging long runs"""
+        return {"hits": self.hits, "misses": self.misses, "liveLists": self.liveLists}
 
 class GLWidget(QOpenGLWidget, QOpenGLFunctions): # QOpenGLWidget, QOpenGLFunctions -> from qt examples | QtOpenGL.QGLWidget
     """
@@ -29,69 +81,321 @@ class GLWidget(QOpenGLWidget, QOpenGLFunctions): # QOpenGLWidget, QOpenGLFunctio
     yRotationChanged = Signal(int)
     zRotationChanged = Signal(int)
 
-    def __init__(self, parent=None):
+    # background loading -> textureDecoded/meshDecoded hand a finished job (a Future) from the worker thread over to the GUI thread
+    textureDecoded = Signal(str, object)
+    meshDecoded = Signal(str, object)
+    lodBuilt = Signal(int, object) # (shape index, future) of a finished simplification, see buildLods
+    shapeOptimized = Signal(int, int, object) # (shape index, resolution, future) of a procedural mesh, see optimizeShape
+    meshAdded = Signal(int, str) # (shape index, name) of a shape added after start up, e.g. for the shape combo box
+    statusMessage = Signal(str) # loading progress/errors in words (e.g. for the status bar)
+    shapePicked = Signal(object) # the PickHit of a click on the shape, None when the click missed it
+
+    RENDER_BACKENDS = ("immediate", "buffered") # the values setRenderBackend accepts
+    SHADING_MODES = SHADING_MODES # the values setShadingMode accepts
+    TRANSPARENCY_MODES = TRANSPARENCY_MODES # the values setTransparencyMode accepts
+    WIREFRAME_MODES = ("lines", "barycentric") # the values setWireframeMode accepts
+    WIREFRAME_LINE_WIDTH = 1.5 # pixels, edges of the barycentric wireframe (GL_LINES edges are 1 pixel)
+
+    # the camera set up in resizeGL -> also used to estimate how big a shape is on screen
+    FRUSTUM_HALF_SIZE = 1.2 # half width/height of the near plane
+    NEAR_PLANE = 6.0
+    FAR_PLANE = 70.0
+    CAMERA_DISTANCE = 30.0 # how far the shapes sit in front of the camera
+
+    # animation is integrated in fixed steps of simulated time, independent of how often the timer really fires
+    FIXED_TIMESTEP = 0.01 # seconds per integration step (the old 10ms tick)
+    MAX_FRAME_TIME = 0.25 # longest gap we catch up on, so a stall (e.g. dragging the window) does not spin the shape wildly
+    DEGREES_PER_SPEED = 5.0 # degrees/second per rotation slider unit -> same spin rate as the old speed / 20 per 10ms tick
+
+    # mouse picking highlight
+    PICKED_FACE_COLOR = (1.0, 0.0, 1.0, 1.0) #RGBA -> Magenta
+    PICKED_VERTEX_COLOR = (1.0, 1.0, 1.0, 1.0) #RGBA -> White
+    PICKED_VERTEX_SIZE = 8.0 # pixels
+
+    DEFAULT_REFRESH_RATE = 60.0 # used when the screen does not report its refresh rate
+    RAINBOW_MS_PER_SPEED = 10 # rainbow interval = (51 - speed) * this -> same cadence as the old 10ms tick counting
+
+    TEXTURE_BUDGET_BYTES = 256 * 2**20 # GPU memory the texture cache may hold (mip chains included) before evicting
+    IMMEDIATE_MAX_VERTICES = 20000 # bigger meshes (e.g. imported scans) always draw from buffers, a display list would hold a second copy
+    INLINE_OPTIMIZE_RESOLUTION = 32 # procedural shapes up to this are optimized where they are first drawn (~1K triangles, a few ms)
+
+    def __init__(self, parent=None, rainbowSeed=None):
         super().__init__(parent)
 
         self.setGeometry(180, 30, 1091, 591) # sets the geometry of the OpenGL window area
 
         # The shapes that we can draw -> maybe eventually allow user to create shapes (hard/time-consuming)
-        self.shapes = [None, None, None, None] # array of the current shapes
+        self.meshes = list(SHAPES) # the geometry of each shape, a Mesh or a ProceduralShape (generated at a level of detail)
+        self.shapes = [None] * len(self.meshes) # array of the current shapes (compiled display lists), same order as self.meshes
         self.shapeIndex = 0 # used to get the current shape from the UI
+        self.shapeCache = ShapeCache() # compiled display lists, only rebuilt when a shape's inputs change
+
+        # Level of detail for procedural shapes -> picked from the size of the shape on screen unless overridden
+        self.viewportSide = min(self.width(), self.height()) # size in pixels of the square viewport, updated in resizeGL
+        self.viewport = (0, 0, self.viewportSide, self.viewportSide) # (x, y, width, height) as given to glViewport, for unprojecting clicks
+        self.lodOverride = None # a fixed resolution (e.g. for close inspection), None means automatic
+        # vertex cache optimizing a procedural mesh is a Python loop (seconds for the biggest) -> done in a worker process,
+        # the nearest resolution already optimized is drawn until it arrives (see optimizeShape)
+        self.proceduralMeshes = {} # (shape index, resolution) -> optimized Mesh
+        self.shapeJobs = set() # (shape index, resolution) sent to the worker process
+        # big meshes -> simplified into a LodChain in a worker process (see buildLods), the level is picked like the resolution above
+        self.lodChains = {} # shape index -> LodChain
+        self.processPool = None # ProcessPoolExecutor, started by workerProcesses the first time a job needs it
+
+        # Render backends -> "immediate" compiles display lists from per-vertex calls, "buffered" uploads each shape once into vertex/index buffers
+        self.renderBackend = "immediate"
+        self.shapeBuffers = {} # (shape index, resolution) -> ShapeBuffers, created lazily the first time a shape is drawn with the buffered backend
+        self.shaderCache = ShaderCache() # GLSL programs, compiled the first time they are needed
+
+        # Multiple objects -> when a Scene is set we draw it instead of the single selected shape
+        self.scene = None
+        self.sceneBatches = {} # Mesh -> InstancedBatch, one per distinct mesh in the scene
+        self.visibleCount = 0 # scene objects that survived frustum culling in the last frame
+        h = self.FRUSTUM_HALF_SIZE
+        self.projectionMatrix = frustumMatrix(-h, h, -h, h, self.NEAR_PLANE, self.FAR_PLANE) # mirrors what resizeGL loads, for culling
+        self.viewMatrix = translationMatrix(0.0, 0.0, -self.CAMERA_DISTANCE)
+
+        # Shading -> "unlit" draws plain colors, "flat"/"smooth" light the surfaces with face/vertex normals computed from the mesh
+        self.shadingMode = "unlit"
+
+        # Transparency -> a surface alpha below 1 draws the faces blended, sorted back to front every frame the view turns
+        # ("sorted") or accumulated without sorting ("weighted", weighted blended OIT)
+        self.transparencyMode = "sorted"
+        self.depthSorters = {} # (shape index, resolution) -> DepthSorter, like shapeBuffers
+        self.oit = WeightedBlendedOIT(self.shaderCache)
+
+        # Edges -> "lines" draws them as GL_LINES indexing the faces' vertices, "barycentric" paints them onto the faces in
+        # the same draw call with the wireframe shader (no line geometry at all, best for million-triangle meshes)
+        self.wireframeMode = "lines"
+
+        # Colors -> with shaderColors the surface/edge colors are uniforms of the "color" program, so the compiled lists and
+        # buffers hold geometry only and a color change is one glUniform. Falls back to baking them in if the program fails
+        self.shaderColors = True
 
         self.surfaceColor = (1.0, 1.0, 0.0, 1.0) #RGBA -> Yellow
         self.edgeColor = (0.0, 0.0, 1.0, 1.0) #RGBA -> Blue
 
         # Don't forget to initialize your values or OpenGL will NOT be happy :)
-        self.randomColorArray = [(random.random(), random.random(), random.random(), 1) for x in range(50)] # holds random vertex points for rainbowMode, larger than any amount of expected verts
+        self.rng = np.random.default_rng(rainbowSeed) # seedable so rainbow frames can be reproduced
+        self.rainbowColors = self.makeRainbowColors(self.activeMesh(self.shapeIndex)[0].vertexCount) # (N,4) float32 RGBA, one row per vertex of the active mesh
 
         self.animate = True # stores whether or not to play rotation/animation this each frame -> set from parent UI
         self.textureMode = False # used to decide whether we draw colors or textures on shapes -> set from parent UI
+
+        # Textures -> decoded off the GUI thread, uploaded on the next paint, then kept in an LRU cache
+        self.texturePath = None # the image currently applied (or being decoded)
+        self.textureLoader = TextureLoader()
+        self.textureCache = TextureCache(self.TEXTURE_BUDGET_BYTES)
+        self.decodedTextures = {} # path -> TextureImage waiting for its upload in paintGL
+        self.textureDecoded.connect(self.onTextureDecoded) # queued -> runs on the GUI thread
+
+        # Imported meshes -> parsed on a worker thread, then appended to self.meshes like the built-in shapes
+        self.meshLoader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mesh")
+        self.meshDecoded.connect(self.onMeshDecoded)
+        self.lodBuilt.connect(self.onLodBuilt)
+        self.shapeOptimized.connect(self.onShapeOptimized)
+
+        # Frame timing -> per-phase times of the last frames in a ring buffer, a frame ends once it is swapped on screen
+        self.profiler = FrameProfiler()
+        self.showProfilerOverlay = False # draws the profiler summary over the viewport -> toggled from parent UI
+        self.frameSwapped.connect(self.profiler.endFrame)
+
+        # Mouse picking -> a click casts a ray against the mesh's triangle BVH (cached, built on the first pick or in the background)
+        self.bvhJobs = {} # mesh -> Future of its BVH, imported meshes and their levels of detail build it on meshLoader (see prepareBVH)
+        self.pickedMesh = None # the mesh the highlighted hit belongs to, the highlight only shows while that mesh is drawn
+        self.pickedHit = None # PickHit of the last click, or None
         
         # Rainbow mode helpers
         self.rainbowMode = False # rainbow mode means we color every vertex on the shape an RNG color each frame -> set from parent UI
-        self.rainbowPaint = False # this is updated in the main loop via timer, this flag tells us whether to update the colors or not
-        self.ticks = 1 # tracks frames since last paint for random paint mode
-        self.rainbowSpeed = 30 # this value comes from the slider and determines how fast we update the rainbow mode painting, value == frames we wait (based on clock time @ ~10ms each)
+        self.rainbowGeneration = 0 # bumped every time rainbowColors is regenerated, part of the shape cache key
+        self.rainbowSpeed = 30 # this value comes from the slider and determines how fast we update the rainbow mode painting, range 1-50
+        self.rainbowInterval = self.rainbowIntervalFor(self.rainbowSpeed) # milliseconds between two rainbow repaints
+        self.lastRainbowTime = 0.0 # wall clock (seconds) of the last rainbow repaint
 
-        # define the current rotations and rotation speeds for each axis (x,y,z)
+        # define the rotation speeds for each axis (x,y,z)
         self.x_rot_speed = 0
-        self.x_shape_rot = 0
         self.y_rot_speed = 0
-        self.y_shape_rot = 0
         self.z_rot_speed = 0
-        self.z_shape_rot = 0
 
-        #NOTE: This is effectively the main loop -> we establish a 10ms callback that calls self.step() that will process animations/rotations over that time
+        # UI changes (color and rotation sliders) -> gathered here and applied once at the start of the next paintGL,
+        # so a drag that fires many signals per frame costs one update (and at most one shape rebuild) per frame
+        self.renderState = RenderState({"surfaceColor": self.surfaceColor, "edgeColor": self.edgeColor,
+                                        "rotationSpeed": (self.x_rot_speed, self.y_rot_speed, self.z_rot_speed)}, self.update)
+
+        # the orientation of the shape as a quaternion (w,x,y,z) -> no gimbal lock, previousOrientation is the one from
+        # the step before so frames that land between two steps can be interpolated
+        self.orientation = IDENTITY_QUATERNION.copy()
+        self.previousOrientation = IDENTITY_QUATERNION.copy()
+        self.accumulator = 0.0 # simulated time not yet consumed by a fixed step
+        self.lastStepTime = time.perf_counter() # wall clock of the previous step() call
+
+        #NOTE: This is effectively the main loop -> a callback that calls self.step() to process animations/rotations
+        # it only runs while something is actually moving (see scheduleFrames), otherwise we sit idle and only repaint on demand
+        self.frameCap = 0 # max frames per second while animating, 0 means follow the display refresh rate
         self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
         self.timer.timeout.connect(self.step)
-        self.timer.start(10)
         
     """
     Helpers
     """
     def setSurfaceColor(self, color):
-        """Set the color of the current object RGBA"""
-        self.surfaceColor = color
+        """Set the color of the current object RGBA, applied on the next frame (see applyRenderState)"""
+        self.renderState.set("surfaceColor", color)
 
     def setEdgeColor(self, color):
-        """Set the color of the current object RGBA"""
-        self.edgeColor = color
+        """Set the color of the current object RGBA, applied on the next frame (see applyRenderState)"""
+        self.renderState.set("edgeColor", color)
+
+    def setSurfaceChannel(self, channel, value):
+        """Sets one channel (0-3 -> RGBA) of the surface color, for the sliders"""
+        self.renderState.setChannel("surfaceColor", channel, value)
+
+    def setEdgeChannel(self, channel, value):
+        """Sets one channel (0-3 -> RGBA) of the edge color, for the sliders"""
+        self.renderState.setChannel("edgeColor", channel, value)
+
+    def applyRenderState(self):
+        """Applies the UI changes gathered since the last frame, called once at the start of a paint"""
+        changes = self.renderState.flush()
+        if "surfaceColor" in changes:
+            self.surfaceColor = changes["surfaceColor"]
+        if "edgeColor" in changes:
+            self.edgeColor = changes["edgeColor"]
+        if "rotationSpeed" in changes:
+            self.x_rot_speed, self.y_rot_speed, self.z_rot_speed = changes["rotationSpeed"]
+            self.scheduleFrames() # may start or stop spinning
 
     def toggleAnimation(self):
         """Toggles the animation playback"""
         self.animate = not self.animate
+        self.scheduleFrames()
 
     def setCurrentShape(self, index):
         """Sets the index of the current shape in the shapes array"""
         self.shapeIndex = index
+        if self.rainbowMode:
+            self.regenerateRainbowColors() # the new shape may have a different vertex count
+        self.update()
 
     def toggleRainbowMode(self):
         """Toggles rainbow mode"""
         self.rainbowMode = not self.rainbowMode
+        if self.rainbowMode:
+            self.regenerateRainbowColors() # the shape may have changed while rainbow mode was off
+        self.update()
+        self.scheduleFrames()
     
     def setRainbowModeSpeed(self, speed):
         """Sets the speed of rainbow mode paint updates, higher = faster, range(1-50) expected"""
         self.rainbowSpeed = speed
+        self.rainbowInterval = self.rainbowIntervalFor(speed)
+
+    def rainbowIntervalFor(self, speed):
+        """Milliseconds between rainbow repaints for a slider speed, 50 -> every 10ms, 1 -> every 500ms"""
+        return (51 - speed) * self.RAINBOW_MS_PER_SPEED
+
+    def setFrameCap(self, fps):
+        """Caps the frame rate while animating, 0 follows the display refresh rate"""
+        self.frameCap = fps
+        if self.timer.isActive():
+            self.timer.setInterval(self.frameInterval())
+
+    def frameInterval(self):
+        """Milliseconds between animation frames, from the frame cap or else the refresh rate of our screen"""
+        rate = self.frameCap
+        if not rate:
+            screen = self.screen() if self.isVisible() else None
+            rate = screen.refreshRate() if screen is not None else 0
+        return max(1, int(round(1000.0 / (rate or self.DEFAULT_REFRESH_RATE))))
+
+    def isSpinning(self):
+        """True while the animation plays and the shape (or any scene object) has a non-zero spin"""
+        return bool(self.animate and (self.x_rot_speed or self.y_rot_speed or self.z_rot_speed or
+                                      (self.scene is not None and self.scene.isAnimated())))
+
+    def needsFrames(self):
+        """True while something changes on its own (spinning shape or rainbow colors) and we have to keep stepping"""
+        return self.isSpinning() or self.rainbowMode
+
+    def scheduleFrames(self):
+        """Starts the frame timer when something needs to animate and stops it when nothing does, so we idle at 0% CPU"""
+        if self.needsFrames():
+            if not self.timer.isActive():
+                self.lastStepTime = time.perf_counter() # do not count the idle time as elapsed animation time
+                self.timer.start(self.frameInterval())
+        elif self.timer.isActive():
+            self.timer.stop()
+
+    def setRainbowSeed(self, seed):
+        """Reseeds the rainbow mode generator so the same seed replays the same colors"""
+        self.rng = np.random.default_rng(seed)
+
+    def makeRainbowColors(self, count, out=None):
+        """Returns a (count,4) float32 block of random opaque RGBA colors, filled in place when out already has that shape"""
+        if out is None or out.shape != (count, 4):
+            out = np.empty((count, 4), dtype=np.float32)
+        self.rng.random(out=out, dtype=np.float32) # one call for the whole block instead of one tuple per vertex
+        out[:, 3] = 1.0
+        return out
+
+    def regenerateRainbowColors(self):
+        """Makes a new set of rainbow colors sized to the active mesh and marks cached colors as stale"""
+        self.rainbowColors = self.makeRainbowColors(self.activeMesh(self.shapeIndex)[0].vertexCount, self.rainbowColors)
+        self.rainbowGeneration += 1 # new colors -> the cached lists/color buffers are stale
+
+    def setScene(self, scene):
+        """Draws scene (a scene.Scene) instead of the selected shape, None goes back to the single shape"""
+        self.scene = scene
+        self.update()
+        self.scheduleFrames()
+
+    def setDetailOverride(self, resolution):
+        """Forces procedural shapes to a fixed resolution (e.g. a high one for inspection), None goes back to automatic LOD"""
+        self.lodOverride = resolution
+        self.update()
+
+    def toggleProfilerOverlay(self):
+        """Shows/hides the frame timing overlay in the corner of the viewport"""
+        self.showProfilerOverlay = not self.showProfilerOverlay
+        self.update()
+
+    def setGpuTiming(self, enabled):
+        """Turns GPU timer queries around paintGL on or off (they show up as the gpu phase)"""
+        self.profiler.setGpuTiming(enabled)
+        self.update()
+
+    def setRenderBackend(self, backend):
+        """Selects how shapes are drawn, one of RENDER_BACKENDS, "immediate" stays the default/fallback"""
+        if backend not in self.RENDER_BACKENDS:
+            raise ValueError("unknown render backend %r, expected one of %s" % (backend, ", ".join(self.RENDER_BACKENDS)))
+        self.renderBackend = backend
+        self.update()
+
+    def setShadingMode(self, mode):
+        """Selects how surfaces are lit, one of SHADING_MODES (normals are computed the first time a mesh is drawn lit)"""
+        if mode not in self.SHADING_MODES:
+            raise ValueError("unknown shading mode %r, expected one of %s" % (mode, ", ".join(self.SHADING_MODES)))
+        self.shadingMode = mode
+        self.update()
+
+    def setTransparencyMode(self, mode):
+        """Selects how see-through surfaces are drawn, one of TRANSPARENCY_MODES (only matters while the surface alpha < 1)"""
+        if mode not in self.TRANSPARENCY_MODES:
+            raise ValueError("unknown transparency mode %r, expected one of %s" % (mode, ", ".join(self.TRANSPARENCY_MODES)))
+        self.transparencyMode = mode
+        self.update()
+
+    def setWireframeMode(self, mode):
+        """Selects how edges are drawn, one of WIREFRAME_MODES ("barycentric" falls back to "lines" without geometry shaders)"""
+        if mode not in self.WIREFRAME_MODES:
+            raise ValueError("unknown wireframe mode %r, expected one of %s" % (mode, ", ".join(self.WIREFRAME_MODES)))
+        self.wireframeMode = mode
+        self.update()
+
+    def isTransparent(self):
+        """True when the faces have to be blended -> the surface alpha is below 1 (rainbow colors are always opaque)"""
+        return self.surfaceColor[3] < 1.0 and not self.rainbowMode
 
     """
     Open GL Functions
@@ -105,23 +409,43 @@ class GLWidget(QOpenGLWidget, QOpenGLFunctions): # QOpenGLWidget, QOpenGLFunctio
         glEnable(GL_NORMALIZE) # enable or disable server-side GL capabilities -> calculates the unit vector in the same direction as the original vector
         glClearColor(0.0, 0.0, 0.0, 1) # NOTE: background of the GL viewport
 
-        #NOTE: IMPORTANT initialize all of our shapes
-        self.shapes[0] = self.makeCube() # make a cube and store it in index 0 of the shapes array
-        self.shapes[1] = self.makePyramid() # make a pyramid and store it in index 1 of the shapes array
-        self.shapes[2] = self.makeTetrahedron() # make a tetreahedron and store it in index 2 of the shapes array
-        self.shapes[3] = self.makeOctahedron() # make an octahedron and store it in index 3 of the shapes array
-
-        #NOTE: Testing these for transparency --> seems to work okay... more here: https://stackoverflow.com/questions/1617370/how-to-use-alpha-transparency-in-opengl
-        # glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA) 
-        # glEnable(GL_BLEND)
+        # one directional light for the lit shading modes, GL_LIGHTING itself is only switched on around lit surfaces
+        # the modelview is still the identity here, so the light direction is stored in eye space and stays put while the shape turns
+        glLightfv(GL_LIGHT0, GL_POSITION, (*LIGHT_DIRECTION, 0.0)) # w = 0 -> directional
+        glLightfv(GL_LIGHT0, GL_AMBIENT, (LIGHT_AMBIENT, LIGHT_AMBIENT, LIGHT_AMBIENT, 1.0))
+        glLightfv(GL_LIGHT0, GL_DIFFUSE, (LIGHT_DIFFUSE, LIGHT_DIFFUSE, LIGHT_DIFFUSE, 1.0))
+        glLightModelfv(GL_LIGHT_MODEL_AMBIENT, (0.0, 0.0, 0.0, 1.0)) # all the ambient comes from the light, see lighting.py
+        glLightModeli(GL_LIGHT_MODEL_TWO_SIDE, GL_TRUE) # open meshes (imports) show their inside lit too
+        glColorMaterial(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE) # glColor (surface color, rainbow) is the material
+        glEnable(GL_COLOR_MATERIAL)
+        glEnable(GL_LIGHT0)
+
+        #NOTE: IMPORTANT initialize all of our shapes -> compiled once through the cache, then reused every frame
+        colors = self.colorProgram() is None # geometry-only lists when the colors are uniforms
+        for index in range(len(self.shapes)):
+            self.shapes[index] = self.compiledShape(index, colors)
+
+        #NOTE: transparency -> blending alone is only right when faces arrive back to front, see drawTransparentShape. more here: https://stackoverflow.com/questions/1617370/how-to-use-alpha-transparency-in-opengl
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA) 
+        glEnable(GL_BLEND) # always on, opaque colors (alpha 1) blend to themselves
 
     def paintGL(self):
         """Called very often, mostly when we call self.updateGL(), but also on resize events and other things (see docs)"""
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT) #  clear buffers to preset values
-        glPushMatrix() # push and pop the current matrix stack
-        self.drawShape(self.shapes[self.shapeIndex], 0, 0, 0.0, #was (-1, -1, 0) #NOTE: this is how we can offset the location of shapes if we want multiple
-            (self.x_shape_rot, self.y_shape_rot, self.z_shape_rot))
-        glPopMatrix() # push and pop the current matrix stack
+        with self.profiler.measure("paint"):
+            self.applyRenderState()
+            self.profiler.beginPaint()
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT) #  clear buffers to preset values
+            glPushMatrix() # push and pop the current matrix stack
+            if self.scene is not None:
+                self.drawScene() # many shapes, one instanced draw call per mesh
+            else:
+                model = self.currentModelMatrix((0, 0, 0.0))
+                self.drawShape(self.shapes[self.shapeIndex], model) #was (-1, -1, 0) #NOTE: this is how we can offset the location of shapes if we want multiple
+                self.drawPickHighlight(model)
+            glPopMatrix() # push and pop the current matrix stack
+            self.profiler.endPaint()
+        if self.showProfilerOverlay:
+            self.drawProfilerOverlay() # not part of the paint phase, we do not want to measure the measuring
 
     def resizeGL(self, width, height):
         """basic resize handlings, viewport, etc."""
@@ -133,14 +457,17 @@ class GLWidget(QOpenGLWidget, QOpenGLFunctions): # QOpenGLWidget, QOpenGLFunctio
         side = min(width, height)
         if side < 0:
             return
+        self.viewportSide = side # remembered for the level of detail estimate
+        self.viewport = (int((width - side) / 2), int((height - side) / 2), side, side) # remembered for picking
 
-        glViewport(int((width - side) / 2), int((height - side) / 2), side, side) # establish the viewport (x,y,w,h) see: https://www.khronos.org/registry/OpenGL-Refpages/gl4/html/glViewport.xhtml
+        glViewport(*self.viewport) # establish the viewport (x,y,w,h) see: https://www.khronos.org/registry/OpenGL-Refpages/gl4/html/glViewport.xhtml
         glMatrixMode(GL_PROJECTION) # Specifies which matrix stack is the target for subsequent matrix operations
         glLoadIdentity() # glLoadIdentity replaces the current matrix with the identity matrix
-        glFrustum(-1.2, +1.2, -1.2, 1.2, 6.0, 70.0) # glFrustum — multiply the current matrix by a perspective matrix
+        h = self.FRUSTUM_HALF_SIZE
+        glFrustum(-h, +h, -h, h, self.NEAR_PLANE, self.FAR_PLANE) # glFrustum — multiply the current matrix by a perspective matrix
         glMatrixMode(GL_MODELVIEW) # Specifies which matrix stack is the target for subsequent matrix operations
         glLoadIdentity() # glLoadIdentity replaces the current matrix with the identity matrix
-        glTranslated(0.0, 0.0, -30.0) # multiply the current matrix by a translation matrix
+        glTranslated(0.0, 0.0, -self.CAMERA_DISTANCE) # multiply the current matrix by a translation matrix
 
     def freeResources(self):
         """cleans out resources/list for our shapes so we dont have garbage :)"""
@@ -149,9 +476,26 @@ class GLWidget(QOpenGLWidget, QOpenGLFunctions): # QOpenGLWidget, QOpenGLFunctio
         #The latter may happen if the surface is not exposed, or the graphics hardware is not available due to e.g. the application being suspended. - QT docs
         self.makeCurrent()
 
-        # for each of our shapes, delete their respective GLList with a range of 1
-        for shape in self.shapes:
-            glDeleteLists(shape, 1) # delete a contiguous group of display lists
+        # every list we own lives in the shape cache, so clearing it deletes them all
+        self.shapeCache.clear()
+        self.shapes = [None] * len(self.shapes)
+
+        # same for the vertex/index buffers of the buffered backend and the scene batches
+        for buffers in self.shapeBuffers.values():
+            buffers.delete()
+        self.shapeBuffers.clear()
+        self.depthSorters.clear()
+        self.oit.delete()
+        for batch in self.sceneBatches.values():
+            batch.delete()
+        self.sceneBatches.clear()
+        self.shaderCache.clear()
+        self.textureCache.clear()
+        self.textureLoader.shutdown()
+        self.meshLoader.shutdown(wait=False, cancel_futures=True)
+        if self.processPool is not None:
+            self.processPool.shutdown(wait=False, cancel_futures=True)
+        self.profiler.delete()
 
     """
     Rotation Functions
@@ -159,420 +503,661 @@ class GLWidget(QOpenGLWidget, QOpenGLFunctions): # QOpenGLWidget, QOpenGLFunctio
     # slots
     def setXRotSpeed(self, speed):
         """Set the X-axis rotation speed for the current shape"""
-        self.x_rot_speed = speed
+        self.renderState.setChannel("rotationSpeed", 0, speed) # applied on the next frame
 
     def setYRotSpeed(self, speed):
         """Set the X-axis rotation speed for the current shape"""
-        self.y_rot_speed = speed
+        self.renderState.setChannel("rotationSpeed", 1, speed) # applied on the next frame
 
     def setZRotSpeed(self, speed):
         """Set the X-axis rotation speed for the current shape"""
-        self.z_rot_speed = speed
+        self.renderState.setChannel("rotationSpeed", 2, speed) # applied on the next frame
+
+    def angularVelocity(self):
+        """The spin from the rotation sliders in radians/second around the shape's own x, y and z axes"""
+        return np.radians(np.array((self.x_rot_speed, self.y_rot_speed, self.z_rot_speed), dtype=np.float64) * self.DEGREES_PER_SPEED)
+
+    def advance(self, elapsed):
+        """Consumes elapsed wall-clock seconds in FIXED_TIMESTEP steps, leftover time stays in the accumulator"""
+        self.accumulator += min(elapsed, self.MAX_FRAME_TIME)
+        velocity = self.angularVelocity()
+        while self.accumulator >= self.FIXED_TIMESTEP:
+            self.previousOrientation = self.orientation
+            self.orientation = quatIntegrate(self.orientation, velocity, self.FIXED_TIMESTEP)
+            if self.scene is not None:
+                self.scene.advance(self.FIXED_TIMESTEP) # every object of the scene in one vectorized update
+            self.accumulator -= self.FIXED_TIMESTEP
+
+    def currentModelMatrix(self, position):
+        """The model matrix for this frame, blended between the last two fixed steps by how far we are into the next one"""
+        alpha = self.accumulator / self.FIXED_TIMESTEP
+        return modelMatrix(position, quatNlerp(self.previousOrientation, self.orientation, alpha))
 
     def step(self):
-        """Move the shape one step forward via timer, update rainbow mode as needed via timer and ticks"""
-        #NOTE: we ideally would implement Quaternions here so we are not gimbal locked half the time :)
-        if self.animate: # if we are in animation mode
-            self.x_shape_rot += (self.x_rot_speed / 20) % 360 # our current rotation + the new rotation amount modulo 360
-            self.y_shape_rot += (self.y_rot_speed / 20) % 360 # our current rotation + the new rotation amount modulo 360
-            self.z_shape_rot += (self.z_rot_speed / 20) % 360 # our current rotation + the new rotation amount modulo 360
-            self.update() # call update
-
-        # if we are in rainbow mode
-        if self.rainbowMode:
+        """Move the shape forward by the measured time since the last call, update rainbow mode every rainbowInterval ms"""
+        with self.profiler.measure("step"):
+            now = time.perf_counter()
+            elapsed, self.lastStepTime = now - self.lastStepTime, now
+            if self.isSpinning(): # if we are in animation mode and something spins
+                self.advance(elapsed) # same spin speed no matter how regularly the timer fires
+                self.update() # call update
+
+            # if we are in rainbow mode, repaint with new colors once rainbowInterval milliseconds have passed
+            if self.rainbowMode and (now - self.lastRainbowTime) * 1000 >= self.rainbowInterval:
+
+                # generate a new block of random colors, one per vertex of the active mesh
+                self.regenerateRainbowColors()
+                self.lastRainbowTime = now
+                self.update()
+
+        # nothing is moving anymore -> stop the timer until a slider or button needs frames again
+        if not self.needsFrames():
+            self.timer.stop()
+        
+    """
+    Picking
+    """
+    def mousePressEvent(self, event):
+        """Left click -> pick the face and vertex under the cursor"""
+        if event.button() == Qt.LeftButton:
+            self.pick(event.x(), event.y())
+        super().mousePressEvent(event)
 
-            # used to decide whether or not to paint in rainbow mode to avoid flickering -> trying every 3 frames ~ 30ms currently
-            # if this is a paint frame
-            if self.ticks % (51 - self.rainbowSpeed) == 0: # rainbow speed range 1 - 10, since we want 10 to be faster, we do this math first -> 10 is every frame, 1 is every 10 frames
+    def pick(self, x, y):
+        """
+        Casts a ray through widget position (x, y) (pixels, y down like Qt) at the shape as it is drawn right now
+        and highlights what it hits -> returns the PickHit, or None if it missed (scenes are not pickable yet)
+        """
+        if self.scene is not None:
+            return None
+        mesh = self.activeMesh(self.shapeIndex)[0]
+        job = self.bvhJobs.get(mesh)
+        if job is not None and not job.done():
+            self.statusMessage.emit("Still preparing %s for picking" % mesh.name) # building the BVH here would freeze the GUI
+            return None
+        failed = job is None or job.cancelled() or job.exception() is not None
+        bvh = None if failed else job.result() # no job or a failed one -> pickMesh builds it after all
+        clip = self.projectionMatrix @ self.viewMatrix @ self.currentModelMatrix((0, 0, 0.0)) # same matrices paintGL draws with
+        origin, direction = unprojectRay(x + 0.5, self.height() - y - 0.5, self.viewport, clip) # GL windows count rows from the bottom
+        hit = pickMesh(mesh, origin, direction, bvh) # in model space, so the hit stays on the same face as the shape spins
+        self.pickedMesh, self.pickedHit = (mesh, hit) if hit is not None else (None, None)
+        if hit is None:
+            self.statusMessage.emit("Nothing picked")
+        else:
+            self.statusMessage.emit("Picked face %d, vertex %d at (%.3f, %.3f, %.3f)" % ((hit.face, hit.vertex) + tuple(hit.point)))
+        self.shapePicked.emit(hit)
+        self.update() # show (or clear) the highlight even while idle
+        return hit
 
-                # generate a new random color array
-                self.randomColorArray = [(random.random(), random.random(), random.random(), 1) for x in range(50)] # make it larger than any amount of verts we'd expect to see
-                self.rainbowPaint = True
-                self.ticks = 1
+    def clearPick(self):
+        """Removes the pick highlight"""
+        self.pickedMesh = self.pickedHit = None
+        self.update()
+
+    def prepareBVH(self, mesh):
+        """
+        Builds the picking BVH of mesh on the meshLoader thread (about 2s for a million triangles), so a click on it
+        is only the ray cast. The build is sorts and reductions over whole arrays, which leave the GIL to the GUI.
+        """
+        if mesh not in self.bvhJobs:
+            self.bvhJobs[mesh] = self.meshLoader.submit(meshBVH, mesh)
 
-            # if this is not a paint frame, incrment ticks, which tracks frames since last paint for random mode
-            else:
-                self.rainbowPaint = False
-                self.ticks += 1
-        
     """
     Shape Functions
     """
-    def drawShape(self, shape, dx, dy, dz, rotation):
-        """Helper to translate, rotate and draw the shape."""
-        if self.textureMode:
-            #NOTE: THIS WILL BE USED FOR TEXTURE MODES
-            pass
+    def pixelRadius(self, radius, distance=None):
+        """Estimates how many pixels a sphere of radius covers in the viewport (projection from resizeGL)"""
+        distance = self.CAMERA_DISTANCE if distance is None else distance
+        return radius * self.NEAR_PLANE / distance / self.FRUSTUM_HALF_SIZE * self.viewportSide / 2
+
+    def shapeResolution(self, index):
+        """
+        The resolution to generate the shape at index with, or the level of its LodChain to draw (by the size on screen
+        too, level 0 -> None). None for fixed shapes, meshes without a chain and while lodOverride asks for detail.
+        """
+        shape = self.meshes[index]
+        if not isinstance(shape, ProceduralShape):
+            chain = self.lodChains.get(index)
+            if chain is None or self.lodOverride is not None:
+                return None
+            return chain.levelFor(self.pixelRadius(shape.boundingRadius)) or None # the full mesh keeps its (index, None) buffers
+        if self.lodOverride is not None:
+            return self.lodOverride
+        return shape.resolutionFor(self.pixelRadius(shape.radius))
+
+    def activeMesh(self, index):
+        """Returns (mesh, resolution) for the shape at index, procedural shapes and LOD chains at their current level of detail"""
+        resolution = self.shapeResolution(index)
+        if resolution is None:
+            return self.meshes[index], None
+        if not isinstance(self.meshes[index], ProceduralShape):
+            return self.lodChains[index].mesh(resolution), resolution
+        shape = self.meshes[index]
+        mesh = self.proceduralMeshes.get((index, resolution))
+        if mesh is None and (self.lodOverride is not None or resolution <= self.INLINE_OPTIMIZE_RESOLUTION):
+            # an override asks for exactly this mesh (inspection, benchmarks), small ones only take a few ms
+            mesh = self.proceduralMeshes[(index, resolution)] = shape.mesh(resolution)
+        if mesh is None:
+            # until the worker is done -> the nearest resolution we have, or a small one optimized right here
+            self.optimizeShape(index, resolution)
+            ready = [other for shapeIndex, other in self.proceduralMeshes if shapeIndex == index]
+            wanted = resolution
+            resolution = min(ready, key=lambda other: max(other, wanted) / min(other, wanted)) if ready else self.INLINE_OPTIMIZE_RESOLUTION
+            mesh = self.proceduralMeshes.get((index, resolution))
+            if mesh is None:
+                mesh = self.proceduralMeshes[(index, resolution)] = shape.mesh(resolution)
+        return mesh, resolution
+
+    def optimizeShape(self, index, resolution):
+        """
+        Generates and optimizes the procedural shape at index at resolution in a worker process (the shape pickles, its
+        generator is a module function), it arrives through shapeOptimized. A process -> Tipsify holds the GIL throughout.
+        """
+        if (index, resolution) in self.shapeJobs:
+            return
+        self.shapeJobs.add((index, resolution))
+        future = self.workerProcesses().submit(self.meshes[index].mesh, resolution)
+        future.add_done_callback(lambda done: self.shapeOptimized.emit(index, resolution, done)) # emitted from the pool's thread
+
+    def onShapeOptimized(self, index, resolution, future):
+        """A procedural mesh was optimized (GUI thread) -> activeMesh draws it from the next frame on"""
+        if future.cancelled():
+            return
+        shape = self.meshes[index]
+        error = future.exception()
+        if error is not None:
+            self.statusMessage.emit("Could not optimize %s at %d: %s" % (shape.name, resolution, error))
+            mesh = shape.mesh(resolution, False) # same picture, only more vertex cache misses
+        else:
+            mesh = future.result()
+        self.proceduralMeshes[(index, resolution)] = mesh
+        self.update()
+
+    def shapeKey(self, index, resolution=None, colors=True):
+        """The inputs a compiled shape depends on, if any of these change the list must be rebuilt (colors=False -> geometry only)"""
+        if not colors:
+            return (index, resolution, None, None, None, self.shadingMode) # colors come from uniforms, see colorProgram
+        generation = self.rainbowGeneration if self.rainbowMode else None # rainbow colors only matter while rainbow mode is on
+        return (index, resolution, tuple(self.surfaceColor), tuple(self.edgeColor), generation, self.shadingMode)
+
+    def compiledShape(self, index, colors=True):
+        """Returns the display list for the shape at index, compiling it only when its key has changed"""
+        mesh, resolution = self.activeMesh(index)
+        return self.shapeCache.get(index, self.shapeKey(index, resolution, colors), lambda: self.timedCompile(mesh, colors))
+
+    def timedCompile(self, mesh, colors=True):
+        """compileMesh, counted in the compile phase of the frame timing"""
+        with self.profiler.measure("compile"):
+            return self.compileMesh(mesh, colors)
+
+    def wireframeProgram(self):
+        """The barycentric wireframe program, None if it does not build on this driver (no GL 3.2 compatibility profile)"""
+        return self.shaderCache.get("wireframe", WIREFRAME_VERTEX_SHADER, WIREFRAME_FRAGMENT_SHADER, geometrySource=WIREFRAME_GEOMETRY_SHADER)
+
+    def colorProgram(self):
+        """The program drawing shapes with uniform colors, None if shaderColors is off or it does not build on this driver"""
+        if not self.shaderColors:
+            return None
+        return self.shaderCache.get("color", COLOR_VERTEX_SHADER, COLOR_FRAGMENT_SHADER, COLOR_ATTRIBUTES)
+
+    def bufferedShape(self, index):
+        """Returns the ShapeBuffers for the shape at index, uploading its geometry the first time only"""
+        mesh, resolution = self.activeMesh(index)
+        with self.profiler.measure("compile"): # uploads count as shape rebuilds too
+            buffers = self.shapeBuffers.get((index, resolution))
+            if buffers is None:
+                buffers = self.shapeBuffers[(index, resolution)] = ShapeBuffers.fromMesh(mesh)
+            if self.rainbowMode:
+                buffers.updateColors(self.rainbowColors, self.rainbowGeneration) # only the color buffer, geometry stays put
+            if self.shadingMode != "unlit":
+                buffers.uploadNormals(mesh.vertexNormals()) # once per shape, the first time it is drawn lit
+        return buffers
+
+    def drawScene(self):
+        """Draws every object of self.scene, objects sharing a mesh go out in one instanced draw call"""
+        alpha = self.accumulator / self.FIXED_TIMESTEP
+        program = self.shaderCache.get("instanced", INSTANCED_VERTEX_SHADER, INSTANCED_FRAGMENT_SHADER, INSTANCED_ATTRIBUTES)
+        instancing = program is not None and bool(glDrawElementsInstanced) and bool(glVertexAttribDivisor)
+
+        # frustum culling -> only objects whose bounding sphere can reach the screen are transformed and uploaded
+        visible = np.zeros(len(self.scene), dtype=bool)
+        visible[self.scene.visibleObjects(frustumPlanes(self.projectionMatrix @ self.viewMatrix))] = True
+        self.visibleCount = int(visible.sum())
+
+        for mesh, indices in self.scene.batches():
+            indices = indices[visible[indices]]
+            if not len(indices):
+                continue # the whole batch is off screen -> no upload, no draw call
+            models = self.scene.modelMatrices(alpha, indices)
+            batch = self.sceneBatches.get(mesh)
+            if batch is None:
+                batch = self.sceneBatches[mesh] = InstancedBatch(ShapeBuffers.fromMesh(mesh))
+
+            if instancing:
+                batch.updateInstances(models, self.scene.colors[indices])
+                program.use()
+                batch.draw(program, self.edgeColor)
+                glUseProgram(0)
+                self.profiler.countDraws(2) # edges and faces of every instance
+            else:
+                # no instancing on this driver -> fall back to one buffered draw per object
+                for model, color in zip(models, self.scene.colors[indices]):
+                    glPushMatrix()
+                    glMultMatrixf(glMatrix(model))
+                    batch.shape.draw(color, self.edgeColor)
+                    glPopMatrix()
+                self.profiler.countDraws(2 * len(indices))
+
+    def drawShape(self, shape, model):
+        """Helper to translate, rotate and draw the shape, model is its 4x4 (row-major) model matrix"""
+        texture = self.applyTexture() if self.textureMode else None
+        if texture is not None:
+            glPushMatrix()
+            glMultMatrixf(glMatrix(model))
+            self.drawTexturedMesh(self.activeMesh(self.shapeIndex)[0])
+            glPopMatrix()
+            self.profiler.countDraws(2)
         else:
             # this draws the current shape from th shapes array depending on the shape index, which comes from the main UI "shapeComboBox"
-            if self.shapeIndex == 0:
-                self.shapes[self.shapeIndex] = self.makeCube()
-            elif self.shapeIndex == 1:
-                self.shapes[self.shapeIndex] = self.makePyramid()
-            elif self.shapeIndex == 2:
-                self.shapes[self.shapeIndex] = self.makeTetrahedron()
-            elif self.shapeIndex == 3:
-                self.shapes[self.shapeIndex] = self.makeOctahedron()
-            
+            if self.rainbowMode and len(self.rainbowColors) != self.activeMesh(self.shapeIndex)[0].vertexCount:
+                self.regenerateRainbowColors() # the level of detail changed -> one color per vertex of the new mesh
+            # see-through faces are re-ordered every frame, which needs an index buffer -> always buffered
+            transparent = self.isTransparent()
+            wireframe = None if transparent or self.wireframeMode != "barycentric" else self.wireframeProgram()
+            if self.wireframeMode == "barycentric" and wireframe is None and not transparent:
+                self.wireframeMode = "lines"
+                self.statusMessage.emit("The barycentric wireframe needs geometry shaders (OpenGL 3.2), drawing edges as lines instead")
+            program = None if transparent or wireframe is not None else self.colorProgram()
+            # with the color program rainbow colors come from the color buffer, so a new generation never recompiles a list
+            buffered = (transparent or wireframe is not None or self.renderBackend == "buffered" or (program is not None and self.rainbowMode) or
+                        self.activeMesh(self.shapeIndex)[0].vertexCount > self.IMMEDIATE_MAX_VERTICES)
+            if buffered:
+                buffers = self.bufferedShape(self.shapeIndex)
+            else:
+                # the cache hands back the same list every frame until a color or the rainbow generation actually changes
+                # (geometry only with the color program -> colors never rebuild it)
+                shape = self.shapes[self.shapeIndex] = self.compiledShape(self.shapeIndex, colors=program is None)
+
             glPushMatrix()
-            if self.animate:
-                glTranslated(dx, dy, dz)
-                glRotated(rotation[0], 1.0, 0.0, 0.0)
-                glRotated(rotation[1], 0.0, 1.0, 0.0)
-                glRotated(rotation[2], 0.0, 0.0, 1.0)
-            glCallList(shape)
+            glMultMatrixf(glMatrix(model)) # translation and rotation in one precomputed matrix
+            if transparent:
+                self.drawTransparentShape(buffers, model)
+            elif wireframe is not None:
+                self.drawWireframeShape(wireframe, buffers)
+            elif program is not None:
+                self.drawColoredShape(program, buffers if buffered else None, shape)
+            elif buffered:
+                buffers.draw(self.surfaceColor, self.edgeColor, vertexColors=self.rainbowMode, shading=self.shadingMode)
+            else:
+                glCallList(shape)
             glPopMatrix()
+            self.profiler.countDraws(1 if wireframe is not None else 2) # edges and faces, also inside a display list
 
-    def makeCube(self):
-        """Makes a cube"""
-        list = glGenLists(1)
-        glNewList(list, GL_COMPILE)
+    def drawColoredShape(self, program, buffers, shape):
+        """
+        Draws the current shape with the color program -> the colors are uniforms set here every frame, buffers (or the
+        geometry-only display list shape when None) only feed positions, normals and the rainbow color buffer.
+        """
+        program.use()
+        glUniform4fv(program.uniform("edgeColor"), 1, self.edgeColor)
+        glUniform4fv(program.uniform("surfaceColor"), 1, self.surfaceColor)
+        glUniform1i(program.uniform("useVertexColor"), int(self.rainbowMode))
+        setLightUniforms(program, self.shadingMode != "unlit")
+        glEnable(GL_VERTEX_PROGRAM_TWO_SIDE) # back faces use gl_BackColor, lit with the flipped normal
+        if buffers is None:
+            glCallList(shape) # sets the part attribute itself
+        else:
+            glVertexAttrib1f(COLOR_PART_LOCATION, EDGE_PART)
+            buffers.drawEdges(self.edgeColor)
+            glVertexAttrib1f(COLOR_PART_LOCATION, FACE_PART)
+            buffers.drawFaces(self.surfaceColor, vertexColors=self.rainbowMode, shading=self.shadingMode)
+        glDisable(GL_VERTEX_PROGRAM_TWO_SIDE)
+        glUseProgram(0)
+
+    def drawWireframeShape(self, program, buffers):
+        """Draws the current shape's faces once with the barycentric wireframe program, which paints the edges onto them"""
+        buffers.uploadEdgeMasks(self.activeMesh(self.shapeIndex)[0].edgeMasks()) # once per shape
+        program.use()
+        glUniform4fv(program.uniform("edgeColor"), 1, self.edgeColor)
+        glUniform4fv(program.uniform("surfaceColor"), 1, self.surfaceColor)
+        glUniform1i(program.uniform("useVertexColor"), int(self.rainbowMode))
+        glUniform1f(program.uniform("lineWidth"), self.WIREFRAME_LINE_WIDTH)
+        glUniform1i(program.uniform("edgeMasks"), 0)
+        setLightUniforms(program, self.shadingMode != "unlit")
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_BUFFER, buffers.edgeMaskTexture)
+        glEnable(GL_VERTEX_PROGRAM_TWO_SIDE)
+        buffers.drawFaces(self.surfaceColor, vertexColors=self.rainbowMode, shading=self.shadingMode)
+        glDisable(GL_VERTEX_PROGRAM_TWO_SIDE)
+        glBindTexture(GL_TEXTURE_BUFFER, 0)
+        glUseProgram(0)
+
+    def drawTransparentShape(self, buffers, model):
+        """
+        Draws the current shape with see-through faces (the modelview already holds model): the edges first, they write
+        depth so faces behind them stay hidden, then the faces either back to front without depth writes ("sorted") or
+        in any order into the weighted blended OIT targets ("weighted", falls back to sorting if the driver cannot).
+        """
+        buffers.drawEdges(self.edgeColor)
+        if self.transparencyMode == "weighted":
+            if self.oit.begin(lit=self.shadingMode != "unlit"):
+                buffers.drawFaces(self.surfaceColor, shading=self.shadingMode)
+                self.oit.end()
+                return
+            self.transparencyMode = "sorted"
+            self.statusMessage.emit("Weighted blended transparency is not supported here, sorting faces instead")
+
+        mesh, resolution = self.activeMesh(self.shapeIndex)
+        sorter = self.depthSorters.get((self.shapeIndex, resolution))
+        if sorter is None:
+            self.depthSorters.clear() # only the shape on screen needs its centroids kept
+            sorter = self.depthSorters[(self.shapeIndex, resolution)] = DepthSorter(mesh)
+        indices, changed = sorter.sort(model[2, :3]) # the camera looks down -z, row 2 of the rotation is its z axis in model space
+        if changed or buffers.sortedFaceBuffer is None:
+            buffers.updateSortedFaces(indices) # only when the view turned since the last frame
+        buffers.drawFaces(self.surfaceColor, shading=self.shadingMode, sortedFaces=True)
+
+    def drawPickHighlight(self, model):
+        """Draws the picked face and vertex over the shape -> a few immediate mode vertices, the shape itself is not rebuilt"""
+        hit = self.pickedHit
+        if hit is None or self.pickedMesh is not self.activeMesh(self.shapeIndex)[0]:
+            return # nothing picked, or the shape/level of detail changed since
+        mesh = self.pickedMesh
+        glPushAttrib(GL_ENABLE_BIT | GL_CURRENT_BIT | GL_POLYGON_BIT | GL_POINT_BIT)
+        glDisable(GL_TEXTURE_2D)
+        glEnable(GL_POLYGON_OFFSET_FILL)
+        glPolygonOffset(-1.0, -1.0) # pulled towards the camera so it wins the depth test against the face it covers
+        glPushMatrix()
+        glMultMatrixf(glMatrix(model))
 
-        # the 8 vertices of the cube
-        verticies = (
-            (1, -1, -1),
-            (1, 1, -1),
-            (-1, 1, -1),
-            (-1, -1, -1),
-            (1, -1, 1),
-            (1, 1, 1),
-            (-1, -1, 1),
-            (-1, 1, 1)
-        )
-
-        # the 12 edges of the cube
-        edges = (
-            (0, 1),
-            (0, 3),
-            (0, 4),
-            (2, 1),
-            (2, 3),
-            (2, 7),
-            (6, 3),
-            (6, 4),
-            (6, 7),
-            (5, 1),
-            (5, 4),
-            (5, 7)
-        )
-
-        # the 6 surfaces of the cube
-        surfaces = (
-            (0, 1, 2, 3),
-            (3, 2, 7, 6),
-            (6, 7, 5, 4),
-            (4, 5, 1, 0),
-            (1, 5, 7, 2),
-            (4, 0, 3, 6)
-        )
-
-        # draw the edges of the cube
-        glBegin(GL_LINES)
-        glColor4fv(self.edgeColor)
-        for edge in edges:
-            for vertex in edge:
-                glVertex3fv(verticies[vertex])
+        glBegin(GL_TRIANGLES)
+        glColor4fv(self.PICKED_FACE_COLOR)
+        for vertex in mesh.triangles[hit.face]:
+            glVertex3fv(mesh.vertices[vertex])
         glEnd()
 
-        # draw the surfaces of the cube
-        glBegin(GL_QUADS)
-        i = 0
-        for surface in surfaces:
-            for vertex in surface:
-
-                # if we are in rainbowMode, draw random colors for each vertex -> only do this every N frames or else it is too flickery
-                if self.rainbowMode:
-                    
-                    # draw what is in the rainbowArray -> this array is managed by timers in the stop function
-                    glColor4fv(self.randomColorArray[i]) # paint the colors at this index in the randomColorArray
-                    i += 1 # increment our index helper
-
-                # if we are not in rainbowMode, paint the colors of the
-                else:
-                    glColor4fv(self.surfaceColor)
-
-                glVertex3fv(verticies[vertex]) # we always draw the vertex regardless
+        glDisable(GL_DEPTH_TEST) # the vertex sits exactly on the surface, drawn on top so it is never half hidden
+        glPointSize(self.PICKED_VERTEX_SIZE)
+        glBegin(GL_POINTS)
+        glColor4fv(self.PICKED_VERTEX_COLOR)
+        glVertex3fv(mesh.vertices[hit.vertex])
         glEnd()
 
-        glEndList()
-
-        return list
-
-    def makePyramid(self):
-        """Makes a square base pyramid with 4 traingle sides"""
+        glPopMatrix()
+        glPopAttrib()
+        self.profiler.countDraws(2)
+
+    def drawProfilerOverlay(self):
+        """Draws the frame timing summary in the top left corner with a QPainter over the GL frame"""
+        lines = self.profiler.overlayLines()
+        # QPainter sets its own viewport, matrices, blending and program -> keep ours so the next paintGL is unaffected
+        glPushAttrib(GL_ALL_ATTRIB_BITS)
+        glPushClientAttrib(GL_CLIENT_ALL_ATTRIB_BITS)
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+
+        painter = QPainter(self)
+        painter.setFont(QFont("monospace", 9))
+        lineHeight = painter.fontMetrics().height()
+        width = max(painter.fontMetrics().horizontalAdvance(line) for line in lines)
+        painter.fillRect(4, 4, width + 12, lineHeight * len(lines) + 8, QColor(0, 0, 0, 160))
+        painter.setPen(QColor(255, 255, 255))
+        for row, line in enumerate(lines):
+            painter.drawText(10, 8 + lineHeight * row + painter.fontMetrics().ascent(), line)
+        painter.end()
+
+        glUseProgram(0)
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glPopMatrix()
+        glPopClientAttrib()
+        glPopAttrib()
+
+    def compileMesh(self, mesh, colors=True):
+        """
+        Compiles a display list that draws the edges and surfaces of a Mesh.
+        Both index the same vertex array (mesh.edges as lines, mesh.triangles as faces), GL copies the arrays into the
+        list once at compile time instead of us submitting every vertex with its own call.
+        colors=False leaves the colors out for the color program, the list only marks which part (edges/faces) follows.
+        """
         list = glGenLists(1)
         glNewList(list, GL_COMPILE)
 
-        #NOTE: The 5 vertices of the pyramid
-        verticies = (
-            (0, 1, 0),      #tip
-            (1, -1, 1),     #front right
-            (1, -1, -1),    #back right
-            (-1, -1, -1),   #back left
-            (-1, -1, 1)     #front left
-        )
-
-        #NOTE: The 8 edges of the pyramid
-        edges = (
-            (0, 1), # tip -> front right
-            (0, 2), # tip -> back right
-            (0, 3), # tip -> back left
-            (0, 4), # tip -> front left
-            (1, 2), # front right -> back right
-            (2, 3), # back right -> back left
-            (3, 4), # back left -> front left
-            (4, 1)  # front left -> front right
-        )
-
-        #NOTE: The 4 traingular faces of the pyramid
-        triSurfaces = (
-            (0, 1, 2), # tip -> front right -> back right
-            (0, 2, 3), # tip -> back right -> back left
-            (0, 3, 4), # tip -> back left -> front left
-            (0, 4, 1), # tip -> front left -> front right
-        )
-
-        #NOTE: The 1 square base of the pyramid
-        baseSurface = (1, 2, 3, 4) # front right -> back right -> back left -> front left
-        
-        # draw the edges (8)
-        glBegin(GL_LINES)
-        glColor4fv(self.edgeColor)
-        for edge in edges:
-            for vertex in edge:
-                glVertex3fv(verticies[vertex])
-        glEnd()
+        # client state and pointers are not recorded, they are only read by the draw calls below (which are)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, mesh.vertices)
 
-        # draw the triangle surfaces (4)
-        glBegin(GL_TRIANGLES)
-        i = 0
-        for surface in triSurfaces:
-            for vertex in surface:
-
-                # if we are in rainbowMode, draw random colors for each vertex -> only do this every N frames or else it is too flickery
-                if self.rainbowMode:
-                    
-                    # draw what is in the rainbowArray -> this array is managed by timers in the stop function
-                    glColor4fv(self.randomColorArray[i]) # paint the colors at this index in the randomColorArray
-                    i += 1 # increment our index helper
-
-                # if we are not in rainbowMode, paint the colors of the
-                else:
-                    glColor4fv(self.surfaceColor)
-
-                glVertex3fv(verticies[vertex]) # we always draw the vertex regardless
-        glEnd()
-
-        # draw the square base (1)
-        glBegin(GL_QUADS)
-        i = 0
-        for vertex in baseSurface:
-            
-            # if we are in rainbowMode, draw random colors for each vertex -> only do this every N frames or else it is too flickery
-            if self.rainbowMode:
-                
-                # draw what is in the rainbowArray -> this array is managed by timers in the stop function
-                glColor4fv(self.randomColorArray[i]) # paint the colors at this index in the randomColorArray
-                i += 1 # increment our index helper
-
-            # if we are not in rainbowMode, paint the colors of the
-            else:
-                glColor4fv(self.surfaceColor)
-
-            glVertex3fv(verticies[vertex]) # we always draw the vertex regardless
+        # draw the edges
+        if colors:
+            glColor4fv(self.edgeColor)
+        else:
+            glVertexAttrib1f(COLOR_PART_LOCATION, EDGE_PART)
+        glDrawElements(GL_LINES, mesh.edges.size, GL_UNSIGNED_INT, mesh.edges)
+
+        # rainbow mode -> the color of every vertex from rainbowColors, managed by timers in the step function
+        vertexColors = None
+        if colors and self.rainbowMode and len(self.rainbowColors) == mesh.vertexCount:
+            vertexColors = self.rainbowColors
+
+        # lit shading -> one normal per triangle (flat) or per vertex (smooth), both computed in batch and cached on the mesh
+        flat, smooth = self.shadingMode == "flat", self.shadingMode == "smooth"
+        triangles = mesh.triangles
+        if flat:
+            # a vertex has one normal but a face normal per triangle around it -> every corner gets its own copy
+            corners = mesh.vertices[triangles].reshape(-1, 3) # kept referenced until the draw below reads it
+            glVertexPointer(3, GL_FLOAT, 0, corners)
+            normals = np.repeat(mesh.faceNormals(), 3, axis=0)
+            vertexColors = None if vertexColors is None else vertexColors[triangles].reshape(-1, 4)
+            triangles = None
+        elif smooth:
+            normals = mesh.vertexNormals()
+        if flat or smooth:
+            glEnableClientState(GL_NORMAL_ARRAY)
+            glNormalPointer(GL_FLOAT, 0, normals)
+            glEnable(GL_LIGHTING) # recorded in the list, so only the surfaces below are lit
+
+        # draw the triangle surfaces
+        if vertexColors is not None:
+            glEnableClientState(GL_COLOR_ARRAY)
+            glColorPointer(4, GL_FLOAT, 0, vertexColors)
+        elif colors:
+            glColor4fv(self.surfaceColor) # one flat color for the whole surface
+        else:
+            glVertexAttrib1f(COLOR_PART_LOCATION, FACE_PART)
+        if triangles is None:
+            glDrawArrays(GL_TRIANGLES, 0, 3 * mesh.triangleCount)
+        else:
+            glDrawElements(GL_TRIANGLES, triangles.size, GL_UNSIGNED_INT, triangles)
 
-        glEnd()
+        if flat or smooth:
+            glDisable(GL_LIGHTING)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
 
         glEndList()
 
         return list
-        
-    def makeTetrahedron(self):
-        """Makes a tetrahedron"""
-        list = glGenLists(1)
-        glNewList(list, GL_COMPILE)
-
-        #NOTE: The 4 vertices of the -> see: https://en.wikipedia.org/wiki/Tetrahedron | # 1.63299316186 == side length before normalize == math.sqrt(8/3)
-        normalizer = math.sqrt(3/8)*2.5 #NOTE: this scales the shape to match the size of our other shapes (or close to)
-        n = normalizer #NOTE: this is just so our vertex definitions are not long
-        verticies = (
-            (math.sqrt(8/9) * n , 0, -1/3 * n),
-            (- math.sqrt(2/9) * n, math.sqrt(2/3) * n, -1/3 * n),
-            (- math.sqrt(2/9) * n, - math.sqrt(2/3) * n, -1/3 * n),
-            (0, 0, 1 * n)
-        )
-
-        #NOTE: The 6 edges of the tetrahedron
-        edges = (
-            (0, 1),
-            (0, 2), 
-            (0, 3), 
-            (1, 2), 
-            (1, 3),
-            (2, 3)
-        )
-
-        #NOTE: The 4 traingular faces of the tetrahedron
-        surfaces = (
-            (0, 1, 2),
-            (0, 1, 3),  
-            (0, 2, 3), 
-            (1, 2, 3) 
-        )
-
-        # draw the edges (6)
-        glBegin(GL_LINES)
-        glColor4fv(self.edgeColor)
-        for edge in edges:
-            for vertex in edge:
-                glVertex3fv(verticies[vertex])
-        glEnd()
 
-        # draw the triangle surfaces (4)
-        glBegin(GL_TRIANGLES)
-        i = 0
-        for surface in surfaces:
-            for vertex in surface:
-
-                # if we are in rainbowMode, draw random colors for each vertex -> only do this every N frames or else it is too flickery
-                if self.rainbowMode:
-                    
-                    # draw what is in the rainbowArray -> this array is managed by timers in the stop function
-                    glColor4fv(self.randomColorArray[i]) # paint the colors at this index in the randomColorArray
-                    i += 1 # increment our index helper
-
-                # if we are not in rainbowMode, paint the colors of the
-                else:
-                    glColor4fv(self.surfaceColor)
-
-                glVertex3fv(verticies[vertex]) # we always draw the vertex regardless
-        glEnd()
+    def makeCube(self):
+        """Makes a cube"""
+        return self.compileMesh(CUBE)
 
-        glEndList()
+    def makePyramid(self):
+        """Makes a square base pyramid with 4 traingle sides"""
+        return self.compileMesh(PYRAMID)
 
-        return list
+    def makeTetrahedron(self):
+        """Makes a tetrahedron"""
+        return self.compileMesh(TETRAHEDRON)
 
     def makeOctahedron(self):
-        """
-        An octahedron with edge length √2 can be placed with its center at the origin and 
-        its vertices on the coordinate axes; the Cartesian coordinates of the vertices are then
-        ( ±1, 0, 0 );
-        ( 0, ±1, 0 );
-        ( 0, 0, ±1 ).
-        """
-        list = glGenLists(1)
-        glNewList(list, GL_COMPILE)
+        """Makes an octahedron, see mesh.py for the math"""
+        return self.compileMesh(OCTAHEDRON)
 
-        #NOTE: The 6 vertices of the octahedron
-        r2 = math.sqrt(2)
-        verticies = (  
-            (0, r2, 0), #top tip
-            (0, 0, r2), #front right
-            (r2, 0, 0), #back right
-            (0, 0, -r2), #back left
-            (-r2, 0, 0), #front left
-            (0, -r2, 0)  #bottom tip
-        )
-
-        #NOTE: The 12 edges of the octohedron
-        edges = (
-            (0, 1),     # top tip -> front right
-            (0, 2),     # top tip -> back right
-            (0, 3),     # top tip -> back left
-            (0, 4),     # top tip -> front left
-            (1, 2),     # front right -> back right
-            (2, 3),     # back right -> back left
-            (3, 4),     # back left -> front left
-            (4, 1),     # front left -> front right
-            (5, 1),     # bottom tip -> front right
-            (5, 2),     # bottom tip -> back right
-            (5, 3),     # bottom tip -> back left
-            (5, 4)      # bottom tip -> front left
-        )
-
-        #NOTE: The 8 traingular faces of the octahedron
-        surfaces = (
-            (0, 1, 2),  # top tip -> front right -> back right
-            (0, 2, 3),  # top tip -> back right -> back left
-            (0, 3, 4),  # top tip -> back left -> front left
-            (0, 4, 1),  # top tip -> front left -> front right
-            (5, 1, 2),  # bottom tip -> front right -> back right
-            (5, 2, 3),  # bottom tip -> back right -> back left
-            (5, 3, 4),  # bottom tip -> back left -> front left
-            (5, 4, 1)   # bottom tip -> front left -> front right
-        )
-
-        # draw the edges (12)
-        glBegin(GL_LINES)
-        glColor4fv(self.edgeColor)
-        for edge in edges:
-            for vertex in edge:
-                glVertex3fv(verticies[vertex])
-        glEnd()
+    def makeIcosahedron(self):
+        """Makes an icosahedron, see mesh.py for the golden ratio math"""
+        return self.compileMesh(ICOSAHEDRON)
 
-        # draw the triangle surfaces (8)
-        glBegin(GL_TRIANGLES)
-        i = 0
-        for surface in surfaces:
-            for vertex in surface:
-
-                # if we are in rainbowMode, draw random colors for each vertex -> only do this every N frames or else it is too flickery
-                if self.rainbowMode:
-                    
-                    # draw what is in the rainbowArray -> this array is managed by timers in the stop function
-                    glColor4fv(self.randomColorArray[i]) # paint the colors at this index in the randomColorArray
-                    i += 1 # increment our index helper
-
-                # if we are not in rainbowMode, paint the colors of the
-                else:
-                    glColor4fv(self.surfaceColor)
-
-                glVertex3fv(verticies[vertex]) # we always draw the vertex regardless
-        glEnd()
+    def makeDodecahedron(self):
+        """Makes a dodecahedron, see mesh.py for the golden ratio math"""
+        return self.compileMesh(DODECAHEDRON)
 
-        glEndList()
+    def makeGeodesicSphere(self, level=None):
+        """Makes an icosahedron subdivided level times onto a sphere, automatic LOD if None"""
+        resolution = GEODESIC_SPHERE.resolutionFor(self.pixelRadius(GEODESIC_SPHERE.radius))
+        return self.compileMesh(geodesicMesh(geodesicLevel(resolution) if level is None else level))
 
-        return list
+    def makeSphere(self, resolution=None):
+        """Makes a UV sphere, resolution is the number of slices (half as many stacks), automatic LOD if None"""
+        return self.compileMesh(SPHERE.mesh(resolution or SPHERE.resolutionFor(self.pixelRadius(SPHERE.radius))))
 
-    #NOTE: TODO
-    def makeIcosahedron(self):
-        """
-        The vertices of an icosahedron centered at the origin with an edge-length 
-        of 2 and a circumradius of ϕ + 2 ≈ 1.9 are described by circular permutations of:
-        (0, ±1, ±ϕ)
-        where ϕ = 1 + √5/2 is the golden ratio. 
+    def makeTorus(self, resolution=None):
+        """Makes a torus, resolution is the number of rings (half as many sides), automatic LOD if None"""
+        return self.compileMesh(TORUS.mesh(resolution or TORUS.resolutionFor(self.pixelRadius(TORUS.radius))))
+
+    """
+    Imported Meshes
+    """
+    def addMesh(self, mesh):
+        """Adds a Mesh (or ProceduralShape) after the built-in shapes and returns its shape index, big meshes get a LodChain"""
+        self.meshes.append(mesh)
+        self.shapes.append(None) # compiled/uploaded lazily the first time it is drawn
+        index = len(self.meshes) - 1
+        self.meshAdded.emit(index, mesh.name)
+        if not isinstance(mesh, ProceduralShape):
+            self.prepareBVH(mesh)
+            if mesh.triangleCount >= LOD_MIN_TRIANGLES:
+                self.buildLods(index)
+        return index
+
+    def workerProcesses(self):
+        """The ProcessPoolExecutor for jobs that hold the GIL (simplifying, vertex cache optimizing), started on first use"""
+        if self.processPool is None:
+            # spawn -> a fresh interpreter, forking this one would copy the Qt/GL state into the worker
+            self.processPool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        return self.processPool
+
+    def buildLods(self, index):
         """
-        pass
-        
-    #NOTE: TODO
-    def makeDodecahedron(self):
-        #NOTE: -> glutSolidDodecahedron()
-        """NOTE: The Math
-        (±1, ±1, ±1)
-        (0, ±1/φ, ±φ)
-        (±1/φ, ±φ, 0)
-        (±φ, 0, ±1/φ)
-        where φ = (1 + √5) / 2 is the golden ratio (also written τ) ≈ 1.618. 
-        The edge length is 2/φ = √5 – 1. The containing sphere has a radius of √3.
+        Simplifies the mesh at index (simplify.lodChain) in a worker process, it is drawn at full detail until the
+        chain arrives (see lodBuilt). A process, not a thread -> the decimation holds the GIL for long stretches.
         """
-        """Makes a tetrahedron"""
-        pass
+        mesh = self.meshes[index]
+        # the arrays only, as plain ndarrays -> a memmap backed cached mesh is not pickled with its caches and mapping
+        arrays = [None if array is None else np.asarray(array) for array in (mesh.vertices, mesh.triangles, mesh.edges, mesh.colors)]
+        future = self.workerProcesses().submit(lodChain, *arrays, mesh.name)
+        future.add_done_callback(lambda done: self.lodBuilt.emit(index, done)) # emitted from the pool's thread
+
+    def onLodBuilt(self, index, future):
+        """A simplification finished (GUI thread) -> draw the shape at index by its size on screen from now on"""
+        if future.cancelled():
+            return
+        mesh = self.meshes[index]
+        error = future.exception()
+        if error is not None:
+            self.statusMessage.emit("Could not simplify %s: %s" % (mesh.name, error))
+            return
+        chain = self.lodChains[index] = LodChain(mesh, future.result())
+        for level in chain.levels[1:]:
+            self.prepareBVH(level)
+        self.statusMessage.emit("Levels of detail for %s: %s triangles" % (mesh.name, ", ".join(str(level.triangleCount) for level in chain.levels)))
+        self.update()
 
-    #NOTE: TODO
-    def makeSphere(self):
-        pass
+    def importMesh(self, path):
+        """
+        Reads an OBJ/STL/PLY file in the background, it is added as a new shape (see meshAdded) once parsed.
+        Goes through the binary cache next to the file, so importing the same file again is nearly instant.
+        """
+        self.statusMessage.emit("Importing %s..." % path)
+        future = self.meshLoader.submit(loadCachedMesh, path)
+        future.add_done_callback(lambda done: self.meshDecoded.emit(path, done)) # emitted from the worker thread
 
-    #NOTE: TODO
-    def makeTorus(self):
-        pass
+    def onMeshDecoded(self, path, future):
+        """An import finished (GUI thread) -> add the mesh or report why it failed"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self.statusMessage.emit("Could not import %s: %s" % (path, error))
+            return
+        mesh = future.result()
+        self.addMesh(mesh)
+        report = mesh.geometryReport # None when the mesh came from the cache or was too big to optimize on import
+        self.statusMessage.emit("Imported %s (%d vertices, %d triangles%s)" % (mesh.name, mesh.vertexCount, mesh.triangleCount,
+                                "" if report is None else ", vertex cache ACMR %.2f -> %.2f" % (report.acmrBefore, report.acmrAfter)))
 
     """
     Texture Fuctions
     """
-    #NOTE: TODO
-    def loadTexture(self):
-        pass
+    def loadTexture(self, path):
+        """Starts showing the image at path on the shapes, it is decoded in the background and appears once ready"""
+        self.texturePath = path
+        if path in self.textureCache or path in self.decodedTextures:
+            self.textureMode = True # already decoded -> no need to wait
+            self.update()
+            return
+        self.statusMessage.emit("Loading texture %s..." % path)
+        self.textureLoader.request(path, lambda future: self.textureDecoded.emit(path, future)) # emitted from the worker thread
+
+    def clearTexture(self):
+        """Goes back to drawing colors, the texture stays cached in case it is picked again"""
+        self.textureMode = False
+        self.texturePath = None
+        self.update()
+
+    def onTextureDecoded(self, path, future):
+        """A decode finished (GUI thread) -> keep the pixels for the upload in the next paintGL"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            if path == self.texturePath:
+                self.clearTexture()
+            self.statusMessage.emit("Could not load texture %s: %s" % (path, error))
+            return
+        self.decodedTextures[path] = future.result()
+        if path == self.texturePath:
+            self.textureMode = True
+            self.statusMessage.emit("Loaded texture %s" % path)
+            self.update()
 
-    #NOTE: TODO
     def applyTexture(self):
-        pass
\ No newline at end of file
+        """Binds the current texture (uploading it first if it was just decoded), returns its id or None if it is not ready"""
+        texture = self.textureCache.get(self.texturePath)
+        if texture is None:
+            image = self.decodedTextures.pop(self.texturePath, None)
+            if image is None:
+                # evicted from the cache to make room for others -> decode it again, colors are drawn until it is back
+                path = self.texturePath
+                self.textureLoader.request(path, lambda future: self.textureDecoded.emit(path, future))
+                return None
+            texture = self.textureCache.put(self.texturePath, image)
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, texture)
+        glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE) # texel * color -> white keeps the image, alpha still follows the slider
+        return texture
+
+    def drawTexturedMesh(self, mesh):
+        """Draws the faces of mesh with the bound texture (box projected UVs), then its edges untextured"""
+        positions, uvs = texturedMesh(mesh) # one entry per triangle corner, cached per mesh
+        glBindBuffer(GL_ARRAY_BUFFER, 0) # client side arrays below, not a buffer the buffered backend left bound
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, positions)
+        glTexCoordPointer(2, GL_FLOAT, 0, uvs)
+        glColor4f(1.0, 1.0, 1.0, self.surfaceColor[3])
+        glDrawArrays(GL_TRIANGLES, 0, len(positions))
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glDisable(GL_TEXTURE_2D)
+        glColor4fv(self.edgeColor)
+        glVertexPointer(3, GL_FLOAT, 0, mesh.vertices)
+        glDrawElements(GL_LINES, mesh.edges.size, GL_UNSIGNED_INT, mesh.edges)
+        glDisableClientState(GL_VERTEX_ARRAY)
@@ -0,0 +1,244 @@
+"""
+Geometry stage every mesh goes through before it is drawn:
+  triangulate          -> polygon faces of any corner count into triangles, a fan for convex faces, ear clipping otherwise
+  optimizeVertexCache  -> a triangle order that reuses the post-transform vertex cache (Tipsify, a linear time
+                          Forsyth-style greedy: fan around the vertex that is still in the cache, else jump)
+  optimizeVertexFetch  -> vertices renumbered in the order the triangles first use them, so fetches walk memory forwards
+  acmr                 -> average cache miss ratio (vertex shader runs per triangle) of a triangle order, for reports
+Only needs NumPy, mesh.py builds on it.
+"""
+import time
+from array import array
+
+import numpy as np
+
+VERTEX_CACHE_SIZE = 16 # FIFO entries assumed for the post-transform cache, small enough to help every GPU generation
+CONVEXITY_BLOCK = 1 << 20 # polygon corners checked per array op, bounds the float64 temporaries on huge imports
+
+def fanTriangles(indices, counts):
+    """Splits polygons (indices flat, counts corners each) into triangle fans around their first corner"""
+    counts = np.asarray(counts, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    fans = np.maximum(counts - 2, 0) # triangles per polygon
+    first = np.repeat(starts, fans)
+    k = np.arange(fans.sum()) - np.repeat(np.cumsum(fans) - fans, fans) + 1 # 1..n-2 inside each polygon
+    return np.stack((indices[first], indices[first + k], indices[first + k + 1]), axis=-1)
+
+def concavePolygons(vertices, indices, counts):
+    """Indices of the polygons (counts > 3) that are not convex, checked per corner count with one array op per group"""
+    counts = np.asarray(counts, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    concave = []
+    vertices = np.asarray(vertices)
+    for count in np.unique(counts[counts > 3]).tolist():
+        for block in np.array_split(np.flatnonzero(counts == count), max(1, (counts == count).sum() * count // CONVEXITY_BLOCK)):
+            points = vertices[indices[starts[block, None] + np.arange(count)]].astype(np.float64) # (P, count, 3)
+            sides = np.roll(points, -1, axis=1) - points
+            normals = np.cross(points, np.roll(points, -1, axis=1)).sum(axis=1) # Newell's normal, fine for non-planar faces too
+            turns = (np.cross(np.roll(sides, 1, axis=1), sides) * normals[:, None, :]).sum(axis=-1) # < 0 -> a reflex corner
+            concave.append(block[(turns < -1e-12 * (normals * normals).sum(axis=-1, keepdims=True)).any(axis=1)])
+    return np.concatenate(concave) if concave else np.zeros(0, dtype=np.int64)
+
+def earClip(points):
+    """
+    Triangulates one simple polygon (n, 3) by ear clipping, returns (n - 2, 3) corner numbers in the polygon's winding.
+    O(n^2), only used for the few faces that are not convex.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    normal = np.cross(points, np.roll(points, -1, axis=0)).sum(axis=0)
+    drop = int(np.argmax(np.abs(normal))) # project onto the plane the polygon faces most
+    flat = np.delete(points, drop, axis=1).tolist()
+    sign = 1.0 if normal[drop] > 0 else -1.0
+    if drop == 1:
+        sign = -sign # (x, z) is a left-handed view of the xz plane
+
+    def cross(a, b, c):
+        return sign * ((flat[b][0] - flat[a][0]) * (flat[c][1] - flat[a][1]) - (flat[b][1] - flat[a][1]) * (flat[c][0] - flat[a][0]))
+
+    remaining = list(range(len(points)))
+    triangles = []
+    while len(remaining) > 3:
+        n = len(remaining)
+        for k in range(n):
+            a, b, c = remaining[k - 1], remaining[k], remaining[(k + 1) % n]
+            if cross(a, b, c) <= 0:
+                continue # reflex or flat corner, not an ear
+            if any(cross(a, b, p) >= 0 and cross(b, c, p) >= 0 and cross(c, a, p) >= 0 for p in remaining if p not in (a, b, c)):
+                continue # another corner lies inside or on it
+            triangles.append((a, b, c))
+            del remaining[k]
+            break
+        else: # no ear left (self-intersecting or degenerate face) -> fan what is left
+            triangles.extend((remaining[0], remaining[k], remaining[k + 1]) for k in range(1, n - 1))
+            remaining = []
+    if len(remaining) == 3:
+        triangles.append(tuple(remaining))
+    return np.array(triangles, dtype=np.int64).reshape(-1, 3)
+
+def triangulate(vertices, indices, counts):
+    """
+    Triangles (T, 3) of polygons given flat (indices, counts corners each), in polygon order and winding, with the
+    integer type of indices. Convex polygons become fans in one vectorized pass, the concave ones are then redone by
+    ear clipping. Input that is all triangles is returned as a view of indices, no copy.
+    """
+    indices = np.asarray(indices)
+    if indices.dtype.kind not in "iu":
+        indices = indices.astype(np.int64) # e.g. an empty list
+    counts = np.asarray(counts)
+    if (counts == 3).all():
+        return indices.reshape(-1, 3)
+    counts = counts.astype(np.int64)
+    triangles = fanTriangles(indices, counts)
+    concave = concavePolygons(vertices, indices, counts)
+    if len(concave):
+        starts = np.cumsum(counts) - counts
+        fans = np.maximum(counts - 2, 0)
+        fanStarts = np.cumsum(fans) - fans
+        for polygon in concave.tolist():
+            corners = indices[starts[polygon]:starts[polygon] + counts[polygon]]
+            triangles[fanStarts[polygon]:fanStarts[polygon] + fans[polygon]] = corners[earClip(np.asarray(vertices)[corners])]
+    return triangles
+
+def vertexTriangles(triangles, vertexCount):
+    """The triangles around each vertex in CSR form (offsets, faces), like Mesh.vertexFaces"""
+    flat = np.asarray(triangles).ravel()
+    offsets = np.zeros(vertexCount + 1, dtype=np.int64)
+    np.cumsum(np.bincount(flat, minlength=vertexCount), out=offsets[1:])
+    return offsets, np.argsort(flat, kind="stable") // 3
+
+class VertexCache:
+    """
+    The FIFO post-transform cache model optimizeVertexCache optimizes for and acmr measures with -> size entries,
+    a vertex stays cached until size other vertices were loaded after it. One stamp per vertex in an array (8 bytes
+    each, not a Python int object), so the model stays small and fast on meshes with millions of vertices.
+    """
+    def __init__(self, vertexCount, size=VERTEX_CACHE_SIZE):
+        self.size = size
+        self.misses = 0
+        self.stamps = array("q", [-size]) * vertexCount # the miss count right after each vertex was loaded
+
+    def age(self, vertex):
+        """How many vertices were loaded after vertex, it is still cached while that is below size"""
+        return self.misses - self.stamps[vertex]
+
+    def load(self, vertex):
+        """Uses vertex, loading it if it is not cached -> True on a miss"""
+        if self.misses - self.stamps[vertex] < self.size:
+            return False
+        self.misses += 1
+        self.stamps[vertex] = self.misses
+        return True
+
+def optimizeVertexCache(triangles, vertexCount, cacheSize=VERTEX_CACHE_SIZE):
+    """
+    (order, misses) -> a triangle order (permutation of range(T)) for a VertexCache of cacheSize and the cache misses
+    drawing in that order costs, Tipsify (Sander et al. 2007): emit every remaining triangle around a fanning vertex,
+    then continue with the neighbour that will still be in the cache, or the most recent dead end, or the next vertex
+    in index order. Linear in the triangle count, the bookkeeping lives in typed buffers rather than Python lists.
+    """
+    triangles = np.asarray(triangles, dtype=np.int64)
+    offsets, faces = vertexTriangles(triangles, vertexCount)
+    live = np.diff(offsets).astype(np.int32) # triangles not emitted yet around each vertex
+    offsets, faces, live = memoryview(offsets), memoryview(faces.astype(np.int32)), memoryview(live)
+    corners = memoryview(np.ascontiguousarray(triangles.ravel(), dtype=np.int32))
+    order = np.empty(len(triangles), dtype=np.int64)
+    emitted = bytearray(len(triangles))
+    cache = VertexCache(vertexCount, cacheSize)
+    load, age = cache.load, cache.age # bound once, this loop runs 3 times per triangle
+    deadEnds = array("i")
+    written = 0
+    cursor = 0
+    fanning = 0 if vertexCount else -1
+    while fanning >= 0:
+        candidates = []
+        for face in faces[offsets[fanning]:offsets[fanning + 1]]:
+            if emitted[face]:
+                continue
+            emitted[face] = 1
+            order[written] = face
+            written += 1
+            for vertex in corners[3 * face:3 * face + 3]:
+                deadEnds.append(vertex)
+                candidates.append(vertex)
+                live[vertex] -= 1
+                load(vertex)
+
+        # next fanning vertex -> the candidate that stays in the cache the longest while all its triangles are drawn
+        fanning, best = -1, -1
+        for vertex in candidates:
+            if live[vertex]:
+                loadedAfter = age(vertex)
+                # older first as long as fanning it would not push it out, +1 so the newest entry still beats those that would
+                priority = loadedAfter + 1 if loadedAfter + 2 * live[vertex] < cacheSize else 0
+                if priority > best:
+                    fanning, best = vertex, priority
+        if fanning < 0:
+            while deadEnds: # a recently used vertex with work left
+                vertex = deadEnds.pop()
+                if live[vertex]:
+                    fanning = vertex
+                    break
+        if fanning < 0:
+            while cursor < vertexCount and not live[cursor]: # nothing nearby -> the next vertex in index order
+                cursor += 1
+            fanning = cursor if cursor < vertexCount else -1
+    return order[:written], cache.misses
+
+def optimizeVertexFetch(triangles, vertexCount):
+    """
+    (order, remap) renumbering the vertices in the order triangles first uses them: new vertex i is old vertex order[i]
+    and old vertex v becomes remap[v]. Vertices no triangle uses go last, in their old order.
+    """
+    flat = np.asarray(triangles).ravel()
+    firstUse = np.full(vertexCount, len(flat), dtype=np.int64)
+    used, first = np.unique(flat, return_index=True)
+    firstUse[used] = first
+    order = np.argsort(firstUse, kind="stable")
+    remap = np.empty(vertexCount, dtype=np.int64)
+    remap[order] = np.arange(vertexCount)
+    return order, remap
+
+def acmr(triangles, cacheSize=VERTEX_CACHE_SIZE):
+    """Average cache miss ratio of drawing triangles in order through a VertexCache of cacheSize, 3 is the worst, ~0.5 the best"""
+    flat = np.asarray(triangles).ravel()
+    if not len(flat):
+        return 0.0
+    cache = VertexCache(int(flat.max()) + 1, cacheSize)
+    load = cache.load
+    for vertex in memoryview(np.ascontiguousarray(flat, dtype=np.int32)):
+        load(vertex)
+    return cache.misses / (len(flat) // 3)
+
+class GeometryReport:
+    """What optimizing a mesh did -> ACMR of the triangle order before and after, and how long it took"""
+    __slots__ = ("triangles", "acmrBefore", "acmrAfter", "seconds")
+
+    def __init__(self, triangles, acmrBefore, acmrAfter, seconds):
+        self.triangles = triangles
+        self.acmrBefore = acmrBefore
+        self.acmrAfter = acmrAfter
+        self.seconds = seconds
+
+    def __repr__(self):
+        return "GeometryReport(%d triangles, ACMR %.3f -> %.3f, %.1f ms)" % (self.triangles, self.acmrBefore, self.acmrAfter, self.seconds * 1000)
+
+def optimizeIndices(triangles, edges, vertexCount, cacheSize=VERTEX_CACHE_SIZE, report=False):
+    """
+    The cache and fetch passes together -> (order, triangles, edges, report): new vertex i is old vertex order[i],
+    triangles/edges are renumbered to match (edges sorted by their first vertex), report is a GeometryReport or None.
+    The triangles keep their order when the cache pass cannot beat it (already optimized or tiny meshes).
+    """
+    start = time.perf_counter()
+    triangles = np.asarray(triangles)
+    before = acmr(triangles, cacheSize)
+    reordered, misses = optimizeVertexCache(triangles, vertexCount, cacheSize)
+    after = misses / max(len(triangles), 1)
+    if after < before:
+        triangles = triangles[reordered]
+    order, remap = optimizeVertexFetch(triangles, vertexCount)
+    triangles, edges = remap[triangles], remap[np.asarray(edges, dtype=np.int64).reshape(-1, 2)]
+    edges = edges[np.argsort(edges.min(axis=1), kind="stable")] # lines fetch in the same order as the faces
+    seconds = time.perf_counter() - start
+    if report:
+        report = GeometryReport(len(triangles), before, min(before, after), seconds)
+    return order, triangles, edges, report or None
@@ -0,0 +1,231 @@
+"""
+Retained-mode (vertex buffer) rendering helpers for GLWidget.
+Each shape is uploaded once into GPU buffers and then drawn with one glDrawElements call for
+its faces and one for its edges, instead of one PyOpenGL call per vertex like the immediate path.
+"""
+import ctypes
+import numpy as np
+from OpenGL.GL import *
+
+class ShapeBuffers:
+    """
+    GPU copy of one shape: a position buffer, a per-vertex color buffer and index buffers for the faces and edges.
+    Geometry is uploaded once in the constructor, after that only the color buffer is ever rewritten (rainbow mode).
+    A normal buffer is added by uploadNormals() the first time the shape is drawn lit, and a sorted face buffer by
+    updateSortedFaces() the first time it is drawn transparent, and the edge mask texture by uploadEdgeMasks() the first
+    time it is drawn with the barycentric wireframe. The edges index the same position buffer as the faces.
+    """
+    def __init__(self, positions, faceIndices, edgeIndices):
+        positions = np.ascontiguousarray(positions, dtype=np.float32)
+        faceIndices = np.ascontiguousarray(faceIndices, dtype=np.uint32)
+        edgeIndices = np.ascontiguousarray(edgeIndices, dtype=np.uint32)
+
+        self.vertexCount = len(positions)
+        self.faceIndexCount = faceIndices.size
+        self.edgeIndexCount = edgeIndices.size
+        self.colorGeneration = None # which rainbow generation is currently in the color buffer
+        self.normalBuffer = None # only created for lit drawing
+        self.sortedFaceBuffer = None # face indices back to front, only created for transparency
+        self.edgeMaskBuffer = self.edgeMaskTexture = None # which sides of each face are edges, for the wireframe shader
+
+        self.positionBuffer, self.colorBuffer, self.faceBuffer, self.edgeBuffer = (int(b) for b in glGenBuffers(4))
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.positionBuffer)
+        glBufferData(GL_ARRAY_BUFFER, positions.nbytes, positions, GL_STATIC_DRAW)
+
+        colors = np.ones((self.vertexCount, 4), dtype=np.float32) # placeholder until the first rainbow upload
+        glBindBuffer(GL_ARRAY_BUFFER, self.colorBuffer)
+        glBufferData(GL_ARRAY_BUFFER, colors.nbytes, colors, GL_DYNAMIC_DRAW) # dynamic -> rewritten on rainbow ticks
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.faceBuffer)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, faceIndices.nbytes, faceIndices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.edgeBuffer)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, edgeIndices.nbytes, edgeIndices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    @classmethod
+    def fromMesh(cls, mesh):
+        """Uploads a Mesh, its arrays are already float32/uint32 so nothing is copied on the way"""
+        return cls(mesh.vertices, mesh.triangles, mesh.edges)
+
+    def updateColors(self, colors, generation):
+        """Rewrites the per-vertex color buffer, skipped if this generation is already uploaded"""
+        if generation == self.colorGeneration:
+            return
+        colors = np.ascontiguousarray(colors[:self.vertexCount], dtype=np.float32)
+        glBindBuffer(GL_ARRAY_BUFFER, self.colorBuffer)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, colors.nbytes, colors)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.colorGeneration = generation
+
+    def uploadNormals(self, normals):
+        """Uploads the (N, 3) vertex normals lit drawing needs, once"""
+        if self.normalBuffer is not None:
+            return
+        normals = np.ascontiguousarray(normals[:self.vertexCount], dtype=np.float32)
+        self.normalBuffer = int(glGenBuffers(1))
+        glBindBuffer(GL_ARRAY_BUFFER, self.normalBuffer)
+        glBufferData(GL_ARRAY_BUFFER, normals.nbytes, normals, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def uploadEdgeMasks(self, masks):
+        """Uploads the (T,) uint8 Mesh.edgeMasks into a buffer texture (GL_R8UI) the wireframe shader reads per face, once"""
+        if self.edgeMaskTexture is not None:
+            return
+        masks = np.ascontiguousarray(masks, dtype=np.uint8)
+        self.edgeMaskBuffer = int(glGenBuffers(1))
+        glBindBuffer(GL_TEXTURE_BUFFER, self.edgeMaskBuffer)
+        glBufferData(GL_TEXTURE_BUFFER, max(masks.nbytes, 1), masks if masks.nbytes else None, GL_STATIC_DRAW)
+        glBindBuffer(GL_TEXTURE_BUFFER, 0)
+        self.edgeMaskTexture = int(glGenTextures(1))
+        glBindTexture(GL_TEXTURE_BUFFER, self.edgeMaskTexture)
+        glTexBuffer(GL_TEXTURE_BUFFER, GL_R8UI, self.edgeMaskBuffer)
+        glBindTexture(GL_TEXTURE_BUFFER, 0)
+
+    def updateSortedFaces(self, indices):
+        """Uploads the face indices in back-to-front order (transparency.DepthSorter) into the sorted face buffer"""
+        indices = np.ascontiguousarray(indices, dtype=np.uint32)
+        if self.sortedFaceBuffer is None:
+            self.sortedFaceBuffer = int(glGenBuffers(1))
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.sortedFaceBuffer)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STREAM_DRAW) # orphan + refill, the GPU may still read the old order
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def draw(self, surfaceColor, edgeColor, vertexColors=False, shading="unlit", sortedFaces=False):
+        """Draws the edges then the faces, see drawEdges/drawFaces"""
+        self.drawEdges(edgeColor)
+        self.drawFaces(surfaceColor, vertexColors, shading, sortedFaces)
+
+    def drawEdges(self, edgeColor):
+        """The edges -> one flat color, one draw call"""
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, self.positionBuffer)
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        glColor4fv(edgeColor)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.edgeBuffer)
+        glDrawElements(GL_LINES, self.edgeIndexCount, GL_UNSIGNED_INT, None)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def drawFaces(self, surfaceColor, vertexColors=False, shading="unlit", sortedFaces=False):
+        """
+        The faces in one draw call, with the color buffer if vertexColors else the flat surfaceColor.
+        shading "flat"/"smooth" lights the faces with the normal buffer (uploadNormals first), flat uses GL_FLAT so
+        each face takes the lighting of one of its corners -> faceted, but with the vertex normal rather than the face's.
+        sortedFaces draws the back-to-front order of updateSortedFaces without writing depth, for alpha blending.
+        """
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, self.positionBuffer)
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        if vertexColors:
+            glEnableClientState(GL_COLOR_ARRAY)
+            glBindBuffer(GL_ARRAY_BUFFER, self.colorBuffer)
+            glColorPointer(4, GL_FLOAT, 0, None)
+        else:
+            glColor4fv(surfaceColor)
+        lit = shading != "unlit" and self.normalBuffer is not None
+        if lit:
+            glEnableClientState(GL_NORMAL_ARRAY)
+            glBindBuffer(GL_ARRAY_BUFFER, self.normalBuffer)
+            glNormalPointer(GL_FLOAT, 0, None)
+            glEnable(GL_LIGHTING)
+            if shading == "flat":
+                glShadeModel(GL_FLAT)
+        if sortedFaces:
+            glDepthMask(GL_FALSE) # faces behind still have to show through the ones drawn after them
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.sortedFaceBuffer if sortedFaces else self.faceBuffer)
+        glDrawElements(GL_TRIANGLES, self.faceIndexCount, GL_UNSIGNED_INT, None)
+        if sortedFaces:
+            glDepthMask(GL_TRUE)
+        if lit:
+            glShadeModel(GL_SMOOTH)
+            glDisable(GL_LIGHTING)
+            glDisableClientState(GL_NORMAL_ARRAY)
+
+        # leave the client state how we found it so the immediate path is not affected
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def delete(self):
+        """Frees the GPU buffers (needs a current context)"""
+        glDeleteBuffers(4, [self.positionBuffer, self.colorBuffer, self.faceBuffer, self.edgeBuffer])
+        for buffer in (self.normalBuffer, self.sortedFaceBuffer, self.edgeMaskBuffer):
+            if buffer is not None:
+                glDeleteBuffers(1, [buffer])
+        if self.edgeMaskTexture is not None:
+            glDeleteTextures([self.edgeMaskTexture])
+        self.normalBuffer = self.sortedFaceBuffer = self.edgeMaskBuffer = self.edgeMaskTexture = None
+
+class InstancedBatch:
+    """
+    Draws many copies of one shape with a single instanced call for the faces and one for the edges.
+    Each instance gets its own model matrix and color from a per-instance buffer that is refilled every frame.
+    Needs a program using the INSTANCED_* sources/attribute locations from shaders.py.
+    """
+    FLOATS_PER_INSTANCE = 20 # 16 for the model matrix (column-major) + 4 for the color
+
+    def __init__(self, shapeBuffers):
+        self.shape = shapeBuffers
+        self.instanceBuffer = int(glGenBuffers(1))
+        self.instanceCount = 0
+        self.instanceData = np.zeros((0, self.FLOATS_PER_INSTANCE), dtype=np.float32) # reused between frames
+
+    def updateInstances(self, models, colors):
+        """Uploads (N,4,4) row-major model matrices and (N,4) colors for this frame"""
+        count = len(models)
+        if self.instanceData.shape[0] != count:
+            self.instanceData = np.empty((count, self.FLOATS_PER_INSTANCE), dtype=np.float32)
+        self.instanceData[:, :16] = np.swapaxes(models, -1, -2).reshape(count, 16) # column-major, one mat4 attribute column per slot
+        self.instanceData[:, 16:] = colors
+        self.instanceCount = count
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.instanceBuffer)
+        glBufferData(GL_ARRAY_BUFFER, self.instanceData.nbytes, self.instanceData, GL_STREAM_DRAW) # orphan + refill
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def draw(self, program, edgeColor):
+        """Draws every instance, edges in edgeColor and faces in each instance's own color"""
+        if not self.instanceCount:
+            return
+        stride = self.FLOATS_PER_INSTANCE * 4
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.shape.positionBuffer)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.instanceBuffer)
+        for column in range(4): # a mat4 attribute is 4 vec4 slots
+            glEnableVertexAttribArray(1 + column)
+            glVertexAttribPointer(1 + column, 4, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(16 * column))
+            glVertexAttribDivisor(1 + column, 1) # advance once per instance, not per vertex
+        glEnableVertexAttribArray(5)
+        glVertexAttribPointer(5, 4, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(64))
+        glVertexAttribDivisor(5, 1)
+
+        # edges -> flat edge color
+        glUniform1i(program.uniform("useInstanceColor"), 0)
+        glUniform4fv(program.uniform("flatColor"), 1, edgeColor)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.shape.edgeBuffer)
+        glDrawElementsInstanced(GL_LINES, self.shape.edgeIndexCount, GL_UNSIGNED_INT, None, self.instanceCount)
+
+        # faces -> per-instance color
+        glUniform1i(program.uniform("useInstanceColor"), 1)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.shape.faceBuffer)
+        glDrawElementsInstanced(GL_TRIANGLES, self.shape.faceIndexCount, GL_UNSIGNED_INT, None, self.instanceCount)
+
+        # reset the divisors too, they are global vertex array state
+        for location in range(1, 6):
+            glVertexAttribDivisor(location, 0)
+            glDisableVertexAttribArray(location)
+        glDisableVertexAttribArray(0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def delete(self):
+        """Frees the instance buffer and the shape's buffers (needs a current context)"""
+        glDeleteBuffers(1, [self.instanceBuffer])
+        self.shape.delete()
@@ -0,0 +1,183 @@
+"""
+Headless rendering -> draws GLWidget frames into an offscreen framebuffer and writes them as PNG files,
+for render boxes without a display (run with QT_QPA_PLATFORM=offscreen, and LIBGL_ALWAYS_SOFTWARE=1 without a GPU).
+Frames are read back through two pixel buffers so frame N is copied out while frame N+1 renders,
+and the PNG encoding runs on a thread pool (zlib releases the GIL) so it overlaps both.
+"""
+import ctypes
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+from PySide2.QtGui import (QOffscreenSurface, QOpenGLContext, QSurfaceFormat, QOpenGLFramebufferObject,
+                           QOpenGLFramebufferObjectFormat)
+try:
+    from OpenGL.GL import *
+    from customGL import GLWidget
+except ImportError: # no PyOpenGL -> only the NumPy software renderer (softwareWidget.py) can render
+    GLWidget = None
+from transforms import quatFromAxisAngle, quatMultiply
+
+AXES = {"x": (1.0, 0.0, 0.0), "y": (0.0, 1.0, 0.0), "z": (0.0, 0.0, 1.0)}
+
+class OffscreenRenderer:
+    """
+    An OpenGL context on a QOffscreenSurface rendering a GLWidget into a framebuffer object.
+    The widget itself is never shown, we call its initializeGL/resizeGL/paintGL with our context current instead.
+    """
+    def __init__(self, widget, width, height, samples=4):
+        self.widget = widget
+        self.width, self.height = width, height
+
+        surfaceFormat = QSurfaceFormat()
+        surfaceFormat.setDepthBufferSize(24)
+        self.context = QOpenGLContext()
+        self.context.setFormat(surfaceFormat)
+        if not self.context.create():
+            raise RuntimeError("could not create an OpenGL context (try --software)")
+        self.surface = QOffscreenSurface()
+        self.surface.setFormat(self.context.format())
+        self.surface.create()
+        if not self.context.makeCurrent(self.surface):
+            raise RuntimeError("could not make the offscreen OpenGL context current")
+
+        # multisampled framebuffer to draw into, resolved into a plain one we can read from
+        framebufferFormat = QOpenGLFramebufferObjectFormat()
+        framebufferFormat.setAttachment(QOpenGLFramebufferObject.CombinedDepthStencil)
+        framebufferFormat.setSamples(samples)
+        self.framebuffer = QOpenGLFramebufferObject(width, height, framebufferFormat)
+        self.resolved = QOpenGLFramebufferObject(width, height) if samples else self.framebuffer
+
+        # two pixel pack buffers -> glReadPixels into one returns right away, the other is mapped a frame later
+        self.frameBytes = width * height * 4
+        self.pixelBuffers = [int(b) for b in glGenBuffers(2)]
+        for pixelBuffer in self.pixelBuffers:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, pixelBuffer)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self.frameBytes, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+
+        self.framebuffer.bind()
+        widget.initializeGL()
+        widget.resizeGL(width, height)
+
+    def draw(self):
+        """Draws one frame into the framebuffer, nothing is read back"""
+        self.framebuffer.bind()
+        self.widget.paintGL()
+        self.widget.profiler.endFrame() # no frameSwapped offscreen, the frame is done once painted
+
+    def render(self, slot):
+        """Draws one frame and starts copying it into pixel buffer slot (returns before the copy is done)"""
+        self.draw()
+        if self.resolved is not self.framebuffer:
+            QOpenGLFramebufferObject.blitFramebuffer(self.resolved, self.framebuffer)
+        self.resolved.bind()
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.pixelBuffers[slot])
+        glReadPixels(0, 0, self.width, self.height, GL_RGBA, GL_UNSIGNED_BYTE, ctypes.c_void_p(0)) # into the buffer, asynchronous
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+
+    def pixels(self, slot):
+        """The frame in pixel buffer slot as a (height, width, 4) RGBA array, top row first (waits for its copy)"""
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.pixelBuffers[slot])
+        address = glMapBuffer(GL_PIXEL_PACK_BUFFER, GL_READ_ONLY)
+        mapped = np.ctypeslib.as_array((ctypes.c_ubyte * self.frameBytes).from_address(address))
+        frame = mapped.reshape(self.height, self.width, 4)[::-1].copy() # GL rows start at the bottom, copy before unmapping
+        glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        return frame
+
+    def close(self):
+        """Frees the widget's GL resources and ours"""
+        self.context.makeCurrent(self.surface)
+        self.widget.freeResources()
+        glDeleteBuffers(2, self.pixelBuffers)
+        self.framebuffer.release()
+        self.context.doneCurrent()
+
+def savePng(pixels, path, compressLevel):
+    """Encodes one frame (runs on the encoder pool)"""
+    Image.fromarray(pixels, "RGBA").save(path, "PNG", compress_level=compressLevel)
+
+def findShape(widget, shape):
+    """Shape index from a combo box index or a (case insensitive) shape name"""
+    if str(shape).isdigit() and int(shape) < len(widget.meshes):
+        return int(shape)
+    names = [mesh.name.lower() for mesh in widget.meshes]
+    if str(shape).lower() not in names:
+        raise ValueError("unknown shape %r, pick one of: %s" % (shape, ", ".join(mesh.name for mesh in widget.meshes)))
+    return names.index(str(shape).lower())
+
+def renderTurntable(renderer, frames, outputPattern, axis="y", tilt=20.0, workers=4, compressLevel=6):
+    """
+    Renders frames images of one full turn of the widget's shape around axis (tilted by tilt degrees towards the camera)
+    and writes them to outputPattern % frame. Returns (seconds in total, seconds spent in rendering and readback).
+    """
+    widget = renderer.widget
+    tilted = quatFromAxisAngle((1.0, 0.0, 0.0), math.radians(tilt))
+    encoder = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="png")
+    pending = deque() # encodes in flight, bounded so memory stays flat however many frames we render
+    renderTime = 0.0
+
+    start = time.perf_counter()
+    for frame in range(frames + 1):
+        renderStart = time.perf_counter()
+        if frame < frames:
+            orientation = quatMultiply(tilted, quatFromAxisAngle(AXES[axis], 2 * math.pi * frame / frames))
+            widget.orientation = widget.previousOrientation = orientation # no interpolation, every frame is exact
+            renderer.render(frame % 2)
+        if frame > 0:
+            pixels = renderer.pixels((frame - 1) % 2) # the previous frame, its copy ran while this one rendered
+        renderTime += time.perf_counter() - renderStart
+
+        if frame > 0:
+            pending.append(encoder.submit(savePng, pixels, outputPattern % (frame - 1), compressLevel))
+            while len(pending) > 2 * workers:
+                pending.popleft().result()
+    for encode in pending:
+        encode.result() # also raises if a file could not be written
+    encoder.shutdown()
+    return time.perf_counter() - start, renderTime
+
+def runHeadless(arguments):
+    """Runs the --headless mode of 3DApp.py with its parsed arguments (a QApplication must exist), returns an exit code"""
+    os.makedirs(arguments.output, exist_ok=True)
+    software = arguments.raster or GLWidget is None
+    if software:
+        from softwareWidget import SoftwareWidget, SoftwareRenderer
+        widget, Renderer = SoftwareWidget(rainbowSeed=arguments.seed), SoftwareRenderer
+    else:
+        widget, Renderer = GLWidget(rainbowSeed=arguments.seed), OffscreenRenderer
+    if arguments.mesh:
+        from meshCache import loadCachedMesh
+        widget.addMesh(loadCachedMesh(arguments.mesh))
+        shapeIndex = len(widget.meshes) - 1
+    else:
+        shapeIndex = findShape(widget, arguments.shape)
+    widget.setCurrentShape(shapeIndex)
+    if not software:
+        widget.setRenderBackend(arguments.backend)
+    widget.setShadingMode(arguments.shading)
+    widget.setSurfaceColor(tuple(widget.surfaceColor[:3]) + (arguments.alpha,))
+    widget.setTransparencyMode(arguments.transparency)
+    widget.setWireframeMode(arguments.edges)
+    if arguments.rainbow:
+        widget.toggleRainbowMode()
+
+    renderer = Renderer(widget, arguments.width, arguments.height, arguments.samples)
+    try:
+        pattern = os.path.join(arguments.output, "frame_%04d.png")
+        total, rendering = renderTurntable(renderer, arguments.frames, pattern, arguments.axis, arguments.tilt,
+                                           arguments.workers, arguments.compress_level)
+    finally:
+        renderer.close()
+
+    print("Rendered %d frames of %s (%dx%d) to %s" % (arguments.frames, widget.meshes[shapeIndex].name,
+                                                      arguments.width, arguments.height, arguments.output))
+    print("%.2f s total -> %.1f frames per second (rendering + readback alone: %.1f fps)" %
+          (total, arguments.frames / total, arguments.frames / max(rendering, 1e-9)))
+    return 0
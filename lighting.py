@@ -0,0 +1,23 @@
+"""
+The one light of the lit shading modes, shared by the OpenGL and software renderers.
+A white directional light from the upper left, behind the camera, fixed in eye space so the shape turns under it.
+Colors are the material (GL_COLOR_MATERIAL), lighting only scales them: ambient + diffuse * max(0, normal . light).
+"""
+import numpy as np
+
+SHADING_MODES = ("unlit", "flat", "smooth") # unlit -> plain colors, flat -> one normal per face, smooth -> area-weighted vertex normals
+
+LIGHT_DIRECTION = np.array((-0.4, 0.6, 1.0)) / np.linalg.norm((-0.4, 0.6, 1.0)) # towards the light, eye space
+LIGHT_AMBIENT = 0.25
+LIGHT_DIFFUSE = 0.75
+
+def lightFactors(normals, rotation):
+    """How bright (N,) each unit normal (N, 3) in model space is once rotated by the 3x3 model rotation"""
+    return LIGHT_AMBIENT + LIGHT_DIFFUSE * np.maximum((np.asarray(normals, dtype=np.float64) @ np.asarray(rotation).T) @ LIGHT_DIRECTION, 0.0)
+
+def litColors(colors, normals, rotation):
+    """colors ((N, 4) or one RGBA) lit with normals (N, 3) -> (N, 4), alpha is left as it is"""
+    colors = np.broadcast_to(np.asarray(colors, dtype=np.float64), (len(normals), 4))
+    lit = colors.copy()
+    lit[:, :3] *= lightFactors(normals, rotation)[:, None]
+    return lit
@@ -0,0 +1,584 @@
+"""
+Array-backed mesh data shared by the renderers.
+A Mesh keeps its geometry in contiguous NumPy arrays so GL buffer uploads, exporters, pickers, etc.
+can all use the same memory without walking Python tuples vertex by vertex.
+"""
+import functools
+import math
+import numpy as np
+
+from geometry import triangulate, optimizeIndices
+
+EDGE_BLOCK = 1 << 16 # sorted edge keys turned into index pairs per block
+
+class Mesh:
+    """
+    Compact triangle mesh:
+    vertices  -> float32 (N, 3)
+    edges     -> uint32 (E, 2), the lines drawn in the edge color, every side of every triangle if None is given
+    triangles -> uint32 (T, 3), the surfaces
+    normals   -> optional float32 (N, 3), filled in with area-weighted normals by vertexNormals() if not given
+    colors    -> optional float32 (N, 4) RGBA
+    Arrays that already have the right dtype and layout are kept as-is (no copy).
+    Triangles wind counter-clockwise seen from outside, that is the side the normals point to.
+    version counts geometry changes (updateVertices), caches built from the vertices key on it.
+    geometryReport is the GeometryReport of optimized() (ACMR before/after) on meshes that went through it, else None.
+    """
+    __slots__ = ("name", "vertices", "edges", "triangles", "normals", "colors", "version", "_bounds", "_faceNormals",
+                 "_faceAreaNormals", "_normalSums", "_vertexFaces", "_edgeMasks", "geometryReport")
+
+    def __init__(self, vertices, edges, triangles, normals=None, colors=None, name=""):
+        self.name = name
+        self.vertices = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 3)
+        self.triangles = np.ascontiguousarray(triangles, dtype=np.uint32).reshape(-1, 3)
+        if edges is None:
+            edges = triangleEdges(self.triangles) # derived from the topology
+        self.edges = np.ascontiguousarray(edges, dtype=np.uint32).reshape(-1, 2)
+        self.normals = None if normals is None else np.ascontiguousarray(normals, dtype=np.float32).reshape(-1, 3)
+        self.colors = None if colors is None else np.ascontiguousarray(colors, dtype=np.float32).reshape(-1, 4)
+        self.version = 0
+        self._bounds = None # (aabb min, aabb max, radius around the origin), computed on first use
+        self._faceNormals = None # unit normal per triangle, computed on first use
+        self._faceAreaNormals = None # unnormalized normal per triangle (length = 2 * area), what vertex normals sum up
+        self._normalSums = None # float64 (N, 3) sum of _faceAreaNormals around each vertex, kept for incremental updates
+        self._vertexFaces = None # (offsets, faces) the triangles around each vertex, built on the first updateVertices
+        self._edgeMasks = None # which sides of each triangle are edges, for the barycentric wireframe
+        self.geometryReport = None
+
+    @classmethod
+    def fromPolygons(cls, vertices, edges, polygons, name=""):
+        """
+        Builds a mesh from polygon surfaces (triangles, quads, ...), anything bigger than a triangle is triangulated
+        (geometry.triangulate -> fans for convex faces, ear clipping for concave ones).
+        edges None -> the polygon outlines, so the diagonals are not drawn as edges.
+        """
+        counts = [len(polygon) for polygon in polygons]
+        triangles = triangulate(vertices, [corner for polygon in polygons for corner in polygon], counts)
+        if edges is None:
+            edges = polygonEdges(polygons)
+        return cls(vertices, edges, triangles, name=name)
+
+    @property
+    def vertexCount(self):
+        return len(self.vertices)
+
+    @property
+    def triangleCount(self):
+        return len(self.triangles)
+
+    @property
+    def nbytes(self):
+        """Total size of every array the mesh holds"""
+        arrays = (self.vertices, self.edges, self.triangles, self.normals, self.colors)
+        return sum(a.nbytes for a in arrays if a is not None)
+
+    def bounds(self):
+        """Returns (min corner, max corner, radius) -> the axis aligned box and the radius of the sphere around the origin"""
+        if self._bounds is None:
+            if self.vertexCount:
+                self._bounds = (self.vertices.min(axis=0), self.vertices.max(axis=0),
+                                float(np.sqrt((self.vertices.astype(np.float64) ** 2).sum(axis=1).max())))
+            else:
+                self._bounds = (np.zeros(3, dtype=np.float32), np.zeros(3, dtype=np.float32), 0.0)
+        return self._bounds
+
+    @property
+    def boundingRadius(self):
+        """Radius of the sphere around the origin that holds every vertex -> stays valid however the mesh is rotated"""
+        return self.bounds()[2]
+
+    def faceNormals(self):
+        """Unit normal of every triangle (T, 3) float32, degenerate triangles get (0, 0, 0)"""
+        if self._faceNormals is None:
+            self._faceNormals = normalized(self.faceAreaNormals())
+        return self._faceNormals
+
+    def faceAreaNormals(self):
+        """Unnormalized normal of every triangle (T, 3) float32, twice the triangle's area long"""
+        if self._faceAreaNormals is None:
+            self._faceAreaNormals = triangleAreaNormals(self.vertices, self.triangles)
+        return self._faceAreaNormals
+
+    def vertexNormals(self):
+        """
+        Area-weighted vertex normals (N, 3) float32 -> the sum of the normals of the triangles around each vertex, so big
+        triangles count more than slivers. Stored in self.normals, normals passed to the constructor are used as they are.
+        """
+        if self.normals is None:
+            self.normals = normalized(self.normalSums())
+        return self.normals
+
+    def normalSums(self):
+        """The unnormalized vertex normals (N, 3) float64 behind vertexNormals()"""
+        if self._normalSums is None:
+            self._normalSums = accumulateNormals(self.triangles, self.faceAreaNormals(), self.vertexCount)
+        return self._normalSums
+
+    def vertexFaces(self):
+        """The triangles around each vertex in CSR form (offsets, faces): vertex v is a corner of faces[offsets[v]:offsets[v + 1]]"""
+        if self._vertexFaces is None:
+            order = np.argsort(self.triangles.ravel(), kind="stable")
+            offsets = np.zeros(self.vertexCount + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.triangles.ravel(), minlength=self.vertexCount), out=offsets[1:])
+            self._vertexFaces = (offsets, order // 3)
+        return self._vertexFaces
+
+    def optimized(self, report=True):
+        """
+        A copy drawn the same but faster -> triangles in post-transform vertex cache order and vertices renumbered in
+        the order those triangles use them (geometry.optimizeIndices). report measures the ACMR before and after.
+        """
+        order, triangles, edges, geometryReport = optimizeIndices(self.triangles, self.edges, self.vertexCount, report=report)
+        mesh = Mesh(self.vertices[order], edges, triangles, None if self.normals is None else self.normals[order],
+                    None if self.colors is None else self.colors[order], name=self.name)
+        mesh.geometryReport = geometryReport
+        return mesh
+
+    def edgeMasks(self):
+        """
+        Which sides of every triangle are edges of the mesh, (T,) uint8: bit k is set when the side from corner k to
+        corner k+1 is in self.edges -> fan and grid diagonals are left out of the wireframe.
+        """
+        if self._edgeMasks is None:
+            n = np.int64(self.vertexCount)
+            keys = np.sort(np.minimum(self.edges[:, 0], self.edges[:, 1]).astype(np.int64) * n +
+                           np.maximum(self.edges[:, 0], self.edges[:, 1]))
+            a, b = self.triangles.astype(np.int64), np.roll(self.triangles, -1, axis=1).astype(np.int64)
+            sides = np.minimum(a, b) * n + np.maximum(a, b) # (T, 3), side k runs from corner k to corner k + 1
+            found = np.searchsorted(keys, sides).clip(max=max(len(keys) - 1, 0))
+            isEdge = keys[found] == sides if len(keys) else np.zeros(sides.shape, dtype=bool)
+            self._edgeMasks = (isEdge * np.array((1, 2, 4), dtype=np.uint8)).sum(axis=1, dtype=np.uint8)
+        return self._edgeMasks
+
+    def updateVertices(self, indices, positions):
+        """
+        Moves the vertices at indices to positions and updates whatever normals were computed already, only for the
+        triangles around the moved vertices -> the cost follows the size of the edit, not of the mesh.
+        """
+        indices = np.asarray(indices, dtype=np.int64).ravel()
+        self.vertices[indices] = positions
+        self.version += 1
+        self._bounds = None
+        if self._faceAreaNormals is None:
+            self.normals = None if self._normalSums is None else self.normals # nothing derived from the old geometry yet
+            return
+
+        offsets, faces = self.vertexFaces()
+        counts = offsets[indices + 1] - offsets[indices]
+        starts = np.repeat(offsets[indices] - np.cumsum(counts) + counts, counts) # CSR gather of every index's range
+        faces = np.unique(faces[starts + np.arange(counts.sum())])
+        changed = triangleAreaNormals(self.vertices, self.triangles[faces])
+        if self._normalSums is not None:
+            corners = self.triangles[faces]
+            np.add.at(self._normalSums, corners.ravel(), np.repeat((changed - self._faceAreaNormals[faces]).astype(np.float64), 3, axis=0))
+            if self.normals is not None:
+                touched = np.unique(corners)
+                self.normals[touched] = normalized(self._normalSums[touched])
+        self._faceAreaNormals[faces] = changed
+        if self._faceNormals is not None:
+            self._faceNormals[faces] = normalized(changed)
+
+    def __repr__(self):
+        return "Mesh(%r, %d vertices, %d edges, %d triangles)" % (self.name, self.vertexCount, len(self.edges), self.triangleCount)
+
+def triangleAreaNormals(vertices, triangles):
+    """Cross product of two edges of every triangle (T, 3) float32 -> along the normal, twice the area long"""
+    corners = vertices[triangles]
+    a, b = corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]
+    normals = np.empty_like(a) # one component at a time, np.cross makes temporaries of the whole (T, 3) several times
+    normals[:, 0] = a[:, 1] * b[:, 2] - a[:, 2] * b[:, 1]
+    normals[:, 1] = a[:, 2] * b[:, 0] - a[:, 0] * b[:, 2]
+    normals[:, 2] = a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]
+    return normals
+
+def accumulateNormals(triangles, areaNormals, vertexCount):
+    """Sums the normal of every triangle into its 3 corners -> (N, 3) float64, one bincount per corner and axis"""
+    sums = np.zeros((vertexCount, 3))
+    for corner in range(3):
+        for axis in range(3):
+            sums[:, axis] += np.bincount(triangles[:, corner], weights=areaNormals[:, axis], minlength=vertexCount)
+    return sums
+
+def normalized(vectors):
+    """Unit length float32 copies of vectors (..., 3), zero vectors stay zero"""
+    lengths = np.sqrt((vectors * vectors).sum(axis=-1, keepdims=True))
+    return (vectors / np.where(lengths > 0, lengths, 1)).astype(np.float32)
+
+"""
+Edges -> derived from the topology, one integer key per undirected edge so duplicates go with a 1d sort
+"""
+def polygonSides(indices, counts):
+    """The sides (as index pairs) of polygons given flat with counts corners each, every corner joined to the next one around"""
+    indices = np.asarray(indices, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.int64)
+    nextCorner = np.arange(1, len(indices) + 1)
+    nextCorner[np.cumsum(counts) - 1] = np.cumsum(counts) - counts # the last corner closes back to the first
+    return np.stack((indices, indices[nextCorner]), axis=-1)
+
+def uniqueEdges(edges):
+    """The distinct undirected edges of an (E, 2) index array, edges from a vertex to itself are dropped"""
+    edges = np.asarray(edges)
+    n = int(edges.max()) + 1 if len(edges) else 1
+    return edgesFromKeys(edgeKeys(edges[:, 0], edges[:, 1], n), n)
+
+def triangleEdges(triangles):
+    """The distinct undirected sides of a (T, 3) triangle array, keyed straight off its columns (no (3T, 2) copy)"""
+    n = int(triangles.max()) + 1 if len(triangles) else 1
+    keys = np.empty(3 * len(triangles), dtype=np.int64)
+    for side, (first, second) in enumerate(((0, 1), (1, 2), (2, 0))):
+        keys[side * len(triangles):(side + 1) * len(triangles)] = edgeKeys(triangles[:, first], triangles[:, second], n)
+    return edgesFromKeys(keys, n)
+
+def edgeKeys(a, b, n):
+    """One int64 per undirected edge (min * n + max) -> a 1d sort is much faster than sorting rows, -1 for a == b"""
+    keys = np.minimum(a, b).astype(np.int64)
+    keys *= n
+    keys += np.maximum(a, b)
+    keys[a == b] = -1
+    return keys
+
+def edgesFromKeys(keys, n):
+    """The distinct edges of edgeKeys as (E, 2), uint32 when the indices fit (they always do for a Mesh)"""
+    keys.sort() # sort + neighbour compare -> much faster than np.unique on millions of keys, sorts in place
+    distinct = np.concatenate((keys[:1] >= 0, (keys[1:] != keys[:-1]) & (keys[1:] >= 0)))
+    edges = np.empty((int(distinct.sum()), 2), dtype=np.uint32 if n <= 1 << 32 else np.int64)
+    done = 0
+    for start in range(0, len(keys), EDGE_BLOCK): # a block at a time -> no second copy of the keys
+        block = keys[start:start + EDGE_BLOCK][distinct[start:start + EDGE_BLOCK]]
+        edges[done:done + len(block), 0] = block // n
+        edges[done:done + len(block), 1] = block % n
+        done += len(block)
+    return edges
+
+def polygonEdges(polygons):
+    """The unique undirected outline edges of a list of polygons (any mix of corner counts)"""
+    counts = [len(polygon) for polygon in polygons]
+    return uniqueEdges(polygonSides([corner for polygon in polygons for corner in polygon], counts))
+
+"""
+Built-in shapes -> built once at import and shared by every renderer
+"""
+CUBE = Mesh.fromPolygons(
+    # the 8 vertices of the cube
+    (
+        (1, -1, -1),
+        (1, 1, -1),
+        (-1, 1, -1),
+        (-1, -1, -1),
+        (1, -1, 1),
+        (1, 1, 1),
+        (-1, -1, 1),
+        (-1, 1, 1)
+    ),
+    None, # the edges -> the outlines of the faces below (polygonEdges)
+    # the 6 surfaces of the cube, counter-clockwise seen from outside
+    (
+        (3, 2, 1, 0),
+        (6, 7, 2, 3),
+        (4, 5, 7, 6),
+        (0, 1, 5, 4),
+        (2, 7, 5, 1),
+        (6, 3, 0, 4)
+    ),
+    name="Cube")
+
+PYRAMID = Mesh.fromPolygons(
+    #NOTE: The 5 vertices of the pyramid
+    (
+        (0, 1, 0),      #tip
+        (1, -1, 1),     #front right
+        (1, -1, -1),    #back right
+        (-1, -1, -1),   #back left
+        (-1, -1, 1)     #front left
+    ),
+    None, # the edges -> the outlines of the faces below (polygonEdges)
+    #NOTE: The 4 traingular faces and the 1 square base of the pyramid
+    (
+        (0, 1, 2), # tip -> front right -> back right
+        (0, 2, 3), # tip -> back right -> back left
+        (0, 3, 4), # tip -> back left -> front left
+        (0, 4, 1), # tip -> front left -> front right
+        (4, 3, 2, 1) # front left -> back left -> back right -> front right (counter-clockwise seen from below)
+    ),
+    name="Pyramid")
+
+#NOTE: The 4 vertices of the tetrahedron -> see: https://en.wikipedia.org/wiki/Tetrahedron | # 1.63299316186 == side length before normalize == math.sqrt(8/3)
+_n = math.sqrt(3/8)*2.5 #NOTE: this scales the shape to match the size of our other shapes (or close to)
+TETRAHEDRON = Mesh.fromPolygons(
+    (
+        (math.sqrt(8/9) * _n , 0, -1/3 * _n),
+        (- math.sqrt(2/9) * _n, math.sqrt(2/3) * _n, -1/3 * _n),
+        (- math.sqrt(2/9) * _n, - math.sqrt(2/3) * _n, -1/3 * _n),
+        (0, 0, 1 * _n)
+    ),
+    None, # the edges -> the outlines of the faces below (polygonEdges)
+    #NOTE: The 4 traingular faces of the tetrahedron, counter-clockwise seen from outside
+    (
+        (0, 2, 1),
+        (0, 1, 3),
+        (0, 3, 2),
+        (1, 2, 3)
+    ),
+    name="Tetrahedron")
+
+"""
+An octahedron with edge length √2 can be placed with its center at the origin and
+its vertices on the coordinate axes; the Cartesian coordinates of the vertices are then
+( ±1, 0, 0 );
+( 0, ±1, 0 );
+( 0, 0, ±1 ).
+"""
+_r2 = math.sqrt(2)
+OCTAHEDRON = Mesh.fromPolygons(
+    #NOTE: The 6 vertices of the octahedron
+    (
+        (0, _r2, 0), #top tip
+        (0, 0, _r2), #front right
+        (_r2, 0, 0), #back right
+        (0, 0, -_r2), #back left
+        (-_r2, 0, 0), #front left
+        (0, -_r2, 0)  #bottom tip
+    ),
+    None, # the edges -> the outlines of the faces below (polygonEdges)
+    #NOTE: The 8 traingular faces of the octahedron
+    (
+        (0, 1, 2),  # top tip -> front right -> back right
+        (0, 2, 3),  # top tip -> back right -> back left
+        (0, 3, 4),  # top tip -> back left -> front left
+        (0, 4, 1),  # top tip -> front left -> front right
+        (5, 2, 1),  # bottom tip -> back right -> front right (the bottom half winds the other way round the tip,
+        (5, 3, 2),  # bottom tip -> back left -> back right     so every face is counter-clockwise seen from outside)
+        (5, 4, 3),  # bottom tip -> front left -> back left
+        (5, 1, 4)   # bottom tip -> front right -> front left
+    ),
+    name="Octahedron")
+
+"""
+The platonic solids with golden ratio coordinates -> the faces of each are found from the vertices of the other,
+since the icosahedron and the dodecahedron are duals (each face of one points at a vertex of the other)
+"""
+PHI = (1 + math.sqrt(5)) / 2 # the golden ratio
+
+def polygonsAround(vertices, directions, corners):
+    """
+    For each direction, returns the polygon made of the corners vertices furthest along it,
+    ordered counter-clockwise seen from outside so every face winds the same way.
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    directions = np.asarray(directions, dtype=np.float64)
+    directions = directions / np.linalg.norm(directions, axis=1, keepdims=True)
+    faces = np.argsort(-(directions @ vertices.T), axis=1)[:, :corners] # the closest corners to each face direction
+
+    # sort the corners of each face by angle around its direction
+    points = vertices[faces] - (vertices[faces] * directions[:, None, :]).sum(-1, keepdims=True) * directions[:, None, :]
+    u = points[:, 0, :] / np.linalg.norm(points[:, 0, :], axis=1, keepdims=True)
+    v = np.cross(directions, u)
+    angles = np.arctan2((points * v[:, None, :]).sum(-1), (points * u[:, None, :]).sum(-1))
+    return np.take_along_axis(faces, np.argsort(angles, axis=1), axis=1)
+
+"""
+The vertices of an icosahedron centered at the origin with an edge-length
+of 2 and a circumradius of ϕ + 2 ≈ 1.9 are described by circular permutations of:
+(0, ±1, ±ϕ)
+where ϕ = 1 + √5/2 is the golden ratio.
+"""
+_icosahedronVertices = np.array([p for a in (-1, 1) for b in (-PHI, PHI)
+                                 for p in ((0, a, b), (a, b, 0), (b, 0, a))]) # the 3 circular permutations
+
+"""
+The vertices of a dodecahedron:
+(±1, ±1, ±1)
+(0, ±1/φ, ±φ)
+(±1/φ, ±φ, 0)
+(±φ, 0, ±1/φ)
+where φ = (1 + √5) / 2 is the golden ratio (also written τ) ≈ 1.618.
+The edge length is 2/φ = √5 – 1. The containing sphere has a radius of √3.
+"""
+_dodecahedronVertices = np.array([(a, b, c) for a in (-1, 1) for b in (-1, 1) for c in (-1, 1)] +
+                                 [p for a in (-1 / PHI, 1 / PHI) for b in (-PHI, PHI)
+                                  for p in ((0, a, b), (a, b, 0), (b, 0, a))])
+
+# with these coordinates the two solids are duals once y and z are swapped on the other one
+_icosahedronFaces = polygonsAround(_icosahedronVertices, _dodecahedronVertices[:, [0, 2, 1]], 3) # 20 triangles
+_dodecahedronFaces = polygonsAround(_dodecahedronVertices, _icosahedronVertices[:, [0, 2, 1]], 5) # 12 pentagons
+
+ICOSAHEDRON = Mesh.fromPolygons(_icosahedronVertices, None, _icosahedronFaces, name="Icosahedron")
+DODECAHEDRON = Mesh.fromPolygons(_dodecahedronVertices, None, _dodecahedronFaces, name="Dodecahedron")
+
+"""
+Procedural shapes -> generated with NumPy at a given resolution, each resolution is built once and cached
+"""
+def gridQuads(rows, columns):
+    """
+    Index helper for a (rows x columns) vertex grid whose columns wrap around: returns (triangles, edges) where
+    every grid cell is split into 2 triangles and the edges are the grid lines only (no diagonals).
+    """
+    row = np.arange(rows - 1)[:, None]
+    column = np.arange(columns)[None, :]
+    nextColumn = (column + 1) % columns
+
+    a = row * columns + column # the 4 corners of every cell
+    b = row * columns + nextColumn
+    c = (row + 1) * columns + nextColumn
+    d = (row + 1) * columns + column
+    triangles = np.stack((a, b, c, a, c, d), axis=-1).reshape(-1, 3)
+
+    ringEdges = np.stack((a, b), axis=-1).reshape(-1, 2) # along each row
+    spokeEdges = np.stack((a, d), axis=-1).reshape(-1, 2) # between rows
+    return triangles, np.concatenate((ringEdges, spokeEdges))
+
+SPHERE_RADIUS = 1.5 # about the size of the polyhedra above
+
+@functools.lru_cache(maxsize=None)
+def sphereMesh(stacks, slices, optimize=True):
+    """A UV sphere with stacks latitude bands and slices longitude segments, one vertex per pole (optimize -> Mesh.optimized)"""
+    theta = np.linspace(0.0, math.pi, stacks + 1)[1:-1, None] # inner latitudes only, the poles are added separately
+    phi = np.linspace(0.0, 2 * math.pi, slices, endpoint=False)[None, :]
+    ring = np.stack((np.sin(theta) * np.cos(phi),
+                     np.cos(theta) * np.ones_like(phi),
+                     np.sin(theta) * np.sin(phi)), axis=-1).reshape(-1, 3)
+    vertices = np.concatenate(([(0.0, 1.0, 0.0)], ring, [(0.0, -1.0, 0.0)])) * SPHERE_RADIUS
+
+    # the bands between inner latitudes, shifted by 1 for the top pole
+    bands, bandEdges = gridQuads(stacks - 1, slices)
+    bands, bandEdges = bands + 1, bandEdges + 1
+
+    # triangle fans around each pole
+    top, bottom = 0, len(vertices) - 1
+    column = np.arange(slices)
+    nextColumn = (column + 1) % slices
+    lastRow = 1 + (stacks - 2) * slices
+    topCap = np.stack((np.full(slices, top), 1 + nextColumn, 1 + column), axis=-1)
+    bottomCap = np.stack((np.full(slices, bottom), lastRow + column, lastRow + nextColumn), axis=-1)
+    capEdges = np.concatenate((np.stack((np.full(slices, top), 1 + column), axis=-1),
+                               np.stack((np.full(slices, bottom), lastRow + column), axis=-1)))
+
+    mesh = Mesh(vertices, np.concatenate((bandEdges, capEdges)), np.concatenate((topCap, bands, bottomCap)),
+                name="Sphere %dx%d" % (stacks, slices))
+    return mesh.optimized() if optimize else mesh
+
+TORUS_RADIUS = 1.2 # distance from the center to the middle of the tube
+TORUS_TUBE_RADIUS = 0.5
+
+@functools.lru_cache(maxsize=None)
+def torusMesh(rings, sides, optimize=True):
+    """A torus with rings segments around the main circle and sides segments around the tube (optimize -> Mesh.optimized)"""
+    u = np.linspace(0.0, 2 * math.pi, rings, endpoint=False)[:, None] # around the main circle
+    v = np.linspace(0.0, 2 * math.pi, sides, endpoint=False)[None, :] # around the tube
+    distance = TORUS_RADIUS + TORUS_TUBE_RADIUS * np.cos(v)
+    vertices = np.stack((distance * np.cos(u),
+                         TORUS_TUBE_RADIUS * np.sin(v) * np.ones_like(u),
+                         distance * np.sin(u)), axis=-1).reshape(-1, 3)
+
+    # the grid wraps in both directions -> one extra row of cells that points back at the first ring
+    triangles, edges = gridQuads(rings + 1, sides)
+    triangles, edges = triangles % len(vertices), edges % len(vertices)
+
+    mesh = Mesh(vertices, edges, triangles, name="Torus %dx%d" % (rings, sides))
+    return mesh.optimized() if optimize else mesh
+
+def subdivide(mesh, radius):
+    """
+    Splits every triangle of mesh into 4 and pushes the new vertices out onto a sphere of radius.
+    Midpoints are numbered per distinct edge with np.unique -> neighbouring triangles never duplicate a vertex and
+    there is no Python loop over the edges.
+    """
+    n = mesh.vertexCount
+    triangles = mesh.triangles.astype(np.int64)
+    a, b = triangles, np.roll(triangles, -1, axis=1) # the 3 edges of every triangle -> (v0,v1), (v1,v2), (v2,v0)
+    keys = (np.minimum(a, b) * n + np.maximum(a, b)).ravel() # one integer key per undirected edge
+
+    # midpoints numbered in the order the triangles first reach their edge (not by key) -> same mesh as walking them
+    edgeKeys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(n, n + len(order))
+    middle = rank[inverse].reshape(-1, 3)
+    edgeKeys = edgeKeys[order]
+
+    # place the new vertices halfway along their edge, then project them onto the sphere
+    points = mesh.vertices[edgeKeys // n].astype(np.float64) + mesh.vertices[edgeKeys % n]
+    points *= radius / np.linalg.norm(points, axis=1, keepdims=True)
+    vertices = np.concatenate((mesh.vertices, points.astype(np.float32)))
+
+    # each triangle becomes 3 corner triangles plus the middle one, all with the parent's winding, picked by index
+    # from its 6 points (v0, v1, v2, m01, m12, m20) in one go
+    corners = np.concatenate((mesh.triangles, middle.astype(np.uint32)), axis=1)
+    triangles = corners[:, [[0, 3, 5], [1, 4, 3], [2, 5, 4], [3, 4, 5]]].reshape(-1, 3)
+
+    # every parent edge is split in 2 at its midpoint, plus the 3 edges of each middle triangle -> no duplicates to remove
+    split = np.arange(n, len(vertices), dtype=np.uint32)
+    halves = np.concatenate((np.stack(((edgeKeys // n).astype(np.uint32), split), axis=-1),
+                             np.stack(((edgeKeys % n).astype(np.uint32), split), axis=-1)))
+    inner = corners[:, [[3, 4], [4, 5], [5, 3]]].reshape(-1, 2)
+
+    return Mesh(vertices, np.concatenate((halves, inner)), triangles)
+
+@functools.lru_cache(maxsize=None)
+def geodesicMesh(level, optimize=True):
+    """
+    An icosahedron subdivided level times onto a sphere, each level is built from the (memoized) unoptimized level
+    below -> only the level asked for goes through Mesh.optimized, not every one on the way there
+    """
+    if level <= 0:
+        base = ICOSAHEDRON.vertices * (SPHERE_RADIUS / np.linalg.norm(ICOSAHEDRON.vertices, axis=1, keepdims=True))
+        mesh = Mesh(base, ICOSAHEDRON.edges, ICOSAHEDRON.triangles)
+    else:
+        mesh = subdivide(geodesicMesh(level - 1, False), SPHERE_RADIUS)
+    if optimize:
+        mesh = mesh.optimized()
+    mesh.name = "Geodesic Sphere %d" % level
+    return mesh
+
+MAX_GEODESIC_LEVEL = 7
+
+def geodesicLevel(resolution):
+    """Maps a resolution (segments around the outline) to the subdivision level with about as many segments"""
+    return max(0, min(MAX_GEODESIC_LEVEL, int(round(math.log2(max(resolution, 5) / 5))))) # level 0 has ~5 segments around
+
+class ProceduralShape:
+    """
+    A shape that is generated at a chosen resolution instead of being hard-coded.
+    The resolution is picked from how big the shape is on screen (level of detail), so a small or
+    distant shape draws far fewer triangles. Every resolution is a power of two so only a handful get cached.
+    """
+    def __init__(self, name, generator, radius, minResolution=8, maxResolution=256):
+        self.name = name
+        self.generator = generator # (resolution, optimize) -> Mesh, cached per resolution; module level so the shape pickles
+        self.radius = radius # bounding radius, used to estimate the size on screen
+        self.minResolution = minResolution
+        self.maxResolution = maxResolution
+
+    @property
+    def boundingRadius(self):
+        """Same as Mesh.boundingRadius, so scenes can bound either kind of shape"""
+        return self.radius
+
+    def mesh(self, resolution, optimize=True):
+        """
+        Returns the mesh at resolution (clamped to the allowed range). optimize=False skips Mesh.optimized -> the
+        vertex cache pass is a Python loop, GLWidget calls this in a worker process instead (see optimizeShape).
+        """
+        return self.generator(max(self.minResolution, min(self.maxResolution, resolution)), optimize)
+
+    def resolutionFor(self, pixelRadius, pixelsPerSegment=8):
+        """Picks the resolution so that each segment around the outline covers about pixelsPerSegment pixels"""
+        segments = 2 * math.pi * max(pixelRadius, 1.0) / pixelsPerSegment
+        resolution = 2 ** int(round(math.log2(max(segments, 1.0)))) # round to a power of two
+        return max(self.minResolution, min(self.maxResolution, resolution))
+
+def sphereAt(resolution, optimize=True):
+    return sphereMesh(resolution // 2, resolution, optimize)
+
+def torusAt(resolution, optimize=True):
+    return torusMesh(resolution, resolution // 2, optimize)
+
+def geodesicAt(resolution, optimize=True):
+    return geodesicMesh(geodesicLevel(resolution), optimize)
+
+SPHERE = ProceduralShape("Sphere", sphereAt, SPHERE_RADIUS)
+TORUS = ProceduralShape("Torus", torusAt, TORUS_RADIUS + TORUS_TUBE_RADIUS)
+
+GEODESIC_SPHERE = ProceduralShape("Geodesic Sphere", geodesicAt, SPHERE_RADIUS)
+
+SHAPES = (CUBE, PYRAMID, TETRAHEDRON, OCTAHEDRON, SPHERE, TORUS, ICOSAHEDRON, DODECAHEDRON, GEODESIC_SPHERE) # same order as the UI "shapeComboBox"
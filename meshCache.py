@@ -0,0 +1,131 @@
+"""
+On-disk cache for imported meshes.
+The first import of "model.stl" writes "model.stl.meshcache" next to it: a small header followed by the raw
+float32 vertex and uint32 triangle/edge blocks. Later imports numpy.memmap that file, so the Mesh arrays are
+views of the mapped pages and go to glBufferData as they are, with no parsing and no copy.
+The cache is invalid once the source file changes: same size and mtime is trusted as is, otherwise the source
+is hashed and only a different content hash forces a new import.
+"""
+import hashlib
+import os
+
+import numpy as np
+
+from mesh import Mesh
+from meshImport import loadMesh
+
+CACHE_SUFFIX = ".meshcache"
+CACHE_MAGIC = b"MSHC"
+CACHE_VERSION = 2 # bump whenever the layout or the importer output changes, older caches are then rebuilt
+BLOCK_ALIGNMENT = 64 # every array block starts on a multiple of this
+
+HEADER = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u4"),
+    ("sourceSize", "<u8"),
+    ("sourceMtime", "<i8"), # nanoseconds
+    ("sourceHash", "S16"), # blake2b of the whole source file
+    ("vertexCount", "<u8"),
+    ("triangleCount", "<u8"),
+    ("edgeCount", "<u8"),
+    ("nameLength", "<u4"),
+    ("reserved", "<u4"),
+])
+
+def cachePath(path):
+    """Where the cache of the mesh file at path lives"""
+    return path + CACHE_SUFFIX
+
+def fileHash(path, blockSize=1 << 20):
+    """16 byte blake2b digest of a file's content, read a block at a time"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(blockSize), b""):
+            digest.update(block)
+    return digest.digest()
+
+def aligned(offset):
+    return -(-offset // BLOCK_ALIGNMENT) * BLOCK_ALIGNMENT
+
+def blockOffsets(header):
+    """Byte offsets of the vertex, triangle and edge blocks for a header"""
+    vertices = aligned(HEADER.itemsize + int(header["nameLength"]))
+    triangles = aligned(vertices + int(header["vertexCount"]) * 12)
+    edges = aligned(triangles + int(header["triangleCount"]) * 12)
+    return vertices, triangles, edges
+
+def writeMeshCache(path, mesh, sourceStat, sourceHash):
+    """Writes mesh into the cache file at path (through a temporary file, so a reader never sees half of it)"""
+    name = mesh.name.encode("utf-8")
+    header = np.zeros((), dtype=HEADER)
+    header["magic"], header["version"] = CACHE_MAGIC, CACHE_VERSION
+    header["sourceSize"], header["sourceMtime"], header["sourceHash"] = sourceStat.st_size, sourceStat.st_mtime_ns, sourceHash
+    header["vertexCount"], header["triangleCount"], header["edgeCount"] = mesh.vertexCount, mesh.triangleCount, len(mesh.edges)
+    header["nameLength"] = len(name)
+
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(header.tobytes() + name)
+        for offset, array, dtype in zip(blockOffsets(header), (mesh.vertices, mesh.triangles, mesh.edges), ("<f4", "<u4", "<u4")):
+            file.write(bytes(offset - file.tell())) # padding up to the block
+            file.write(np.ascontiguousarray(array, dtype=dtype).tobytes())
+    os.replace(temporary, path)
+
+def readMeshCache(path, sourcePath):
+    """
+    Maps the cache file at path and returns its Mesh, or None if it is missing, damaged or stale for sourcePath.
+    A cache whose source only got a new mtime (touched, copied) but kept its content is kept and its header updated.
+    """
+    try:
+        with open(path, "rb") as file:
+            header = np.frombuffer(file.read(HEADER.itemsize), dtype=HEADER)
+            if len(header) != 1:
+                return None
+            header = header[0]
+            name = file.read(int(header["nameLength"]))
+        sourceStat = os.stat(sourcePath)
+    except OSError:
+        return None
+    if header["magic"] != CACHE_MAGIC or header["version"] != CACHE_VERSION or header["sourceSize"] != sourceStat.st_size:
+        return None
+
+    if header["sourceMtime"] != sourceStat.st_mtime_ns:
+        if fileHash(sourcePath) != header["sourceHash"]:
+            return None # the content really changed
+        try:
+            with open(path, "r+b") as file: # same content -> remember the new mtime so the next load skips the hash
+                file.seek(HEADER.fields["sourceMtime"][1])
+                file.write(np.int64(sourceStat.st_mtime_ns).astype("<i8").tobytes())
+        except OSError:
+            pass
+
+    vertexOffset, triangleOffset, edgeOffset = blockOffsets(header)
+    counts = (int(header["vertexCount"]), int(header["triangleCount"]), int(header["edgeCount"]))
+    if os.path.getsize(path) < edgeOffset + counts[2] * 8:
+        return None # truncated
+    mapped = np.memmap(path, dtype=np.uint8, mode="r") # one mapping, the blocks below are views into it
+    vertices = mapped[vertexOffset:vertexOffset + counts[0] * 12].view("<f4").reshape(-1, 3)
+    triangles = mapped[triangleOffset:triangleOffset + counts[1] * 12].view("<u4").reshape(-1, 3)
+    edges = mapped[edgeOffset:edgeOffset + counts[2] * 8].view("<u4").reshape(-1, 2)
+    return Mesh(vertices, edges, triangles, name=name.decode("utf-8", "replace"))
+
+def loadCachedMesh(path, **options):
+    """
+    Same as meshImport.loadMesh(path, **options) but goes through the cache next to the file.
+    Only default options are cached, since the cache does not record the weld/fit settings it was built with.
+    If the cache cannot be written (e.g. a read-only folder) the freshly imported mesh is returned anyway.
+    """
+    cache = cachePath(path)
+    if not options:
+        mesh = readMeshCache(cache, path)
+        if mesh is not None:
+            return mesh
+
+    sourceStat = os.stat(path)
+    mesh = loadMesh(path, **options)
+    if not options:
+        try:
+            writeMeshCache(cache, mesh, sourceStat, fileHash(path))
+        except OSError:
+            pass
+    return mesh
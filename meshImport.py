@@ -0,0 +1,416 @@
+"""
+Mesh importer for OBJ, STL (binary/ASCII) and PLY (binary/ASCII) files.
+Files are read in chunks straight into NumPy arrays that grow in place -> no Python object per vertex or triangle
+is ever kept and no second copy of the whole file's data is made. Peak memory (benchmarks/benchImport.py) is about 2x
+the final Mesh for OBJ/PLY, the edge sort keys, and about 4x for STL, whose corners arrive unwelded (3 per triangle).
+Duplicate vertices (every STL corner, OBJ/PLY exports split per face) are merged with a hash weld.
+"""
+import os
+import re
+from itertools import islice
+
+import numpy as np
+
+from mesh import Mesh, polygonSides, uniqueEdges
+from geometry import triangulate
+
+CHUNK_BYTES = 1 << 20 # text read per chunk
+CHUNK_RECORDS = 1 << 16 # binary records (STL triangles, PLY vertices/faces) read per chunk
+CHUNK_LINES = 1 << 15 # ASCII PLY lines read per chunk, each is a Python bytes object until parsed
+WELD_BLOCK = 1 << 16 # keys hashed per block in weld/hashWeld -> small temporaries
+IMPORT_RADIUS = 1.5 # imported meshes are centered and scaled to about the size of the built-in shapes
+OPTIMIZE_MAX_TRIANGLES = 1 << 16 # bigger imports skip the vertex cache pass unless asked for, it is a Python loop (~5 us per triangle)
+
+MESH_FILE_FILTER = "Meshes (*.obj *.stl *.ply)" # for file dialogs
+
+class ArrayBuffer:
+    """
+    An array appended to chunk by chunk while its final length is unknown. The one buffer is grown with ndarray.resize
+    (a realloc, done in place for big blocks) instead of keeping a list of chunks to join at the end, which needs the
+    chunks and the joined copy at the same time.
+    """
+    def __init__(self, dtype, columns=None, capacity=1 << 16):
+        self.shape = () if columns is None else (columns,)
+        self.data = np.empty((max(capacity, 1),) + self.shape, dtype=dtype)
+        self.length = 0
+
+    def append(self, values):
+        values = np.asarray(values).reshape((-1,) + self.shape)
+        end = self.length + len(values)
+        if end > len(self.data):
+            self.data.resize((max(end, len(self.data) * 5 // 4),) + self.shape, refcheck=False) # small steps -> little slack
+        self.data[self.length:end] = values
+        self.length = end
+
+    def array(self):
+        """The filled part, the buffer is trimmed to it in place (so no more appends after this)"""
+        self.data.resize((self.length,) + self.shape, refcheck=False)
+        return self.data
+
+def parseNumbers(text, dtype=np.float64):
+    """Parses whitespace separated numbers from bytes in one call, returns a flat array"""
+    return np.fromstring(text, dtype=dtype, sep=" ")
+
+def parseRows(text, rows, columns, dtype=np.float64):
+    """
+    Parses rows lines of numbers into a (rows, columns) array, keeping the first columns of each line.
+    Lines that all have the same number of values are parsed in one go, otherwise they are split one by one.
+    """
+    values = parseNumbers(text, dtype)
+    width = len(values) // max(rows, 1)
+    if width >= columns and len(values) == width * rows:
+        return values.reshape(rows, width)[:, :columns]
+    return np.array([line.split()[:columns] for line in text.splitlines() if line.strip()], dtype=dtype) # ragged rows, e.g. some vertices with colors
+
+def tokenCounts(text):
+    """Number of whitespace separated tokens on each line of text (which must end with a newline)"""
+    data = np.frombuffer(text, dtype=np.uint8)
+    space = (data == ord(" ")) | (data == ord("\t")) | (data == ord("\n")) | (data == ord("\r"))
+    tokenStarts = ~space & np.concatenate(([True], space[:-1]))
+    tokensBefore = np.searchsorted(np.flatnonzero(tokenStarts), np.flatnonzero(data == ord("\n"))) # no count per byte
+    return np.diff(tokensBefore, prepend=0)
+
+def polygonOutlines(indices, counts):
+    """
+    The boundary edges (as index pairs) of polygons given flat, every corner joined to the next one around.
+    None when every polygon is a triangle -> the edges are then simply those of the triangles, found after welding.
+    """
+    if (np.asarray(counts) == 3).all():
+        return None
+    return polygonSides(indices, counts)
+
+"""
+Readers -> each returns (vertices (N, 3), triangles (T, 3), edges (E, 2) or None), edges being the polygon outlines
+"""
+def readObj(path):
+    """Wavefront OBJ, only positions (v) and faces (f) are used, faces may be any polygon and use negative indices"""
+    vertexBuffer, indexBuffer, countBuffer = ArrayBuffer(np.float32, 3), ArrayBuffer(np.int32), ArrayBuffer(np.int32)
+    vertexCount = 0
+    with open(path, "rb") as file:
+        while True:
+            chunk = file.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            chunk += file.readline() # finish the line the chunk stopped in
+            if not chunk.endswith(b"\n"):
+                chunk += b"\n"
+
+            # classify every line of the chunk by its first 2 bytes, then cut the "v"/"f" lines out with byte masks
+            # -> the chunk is never split into one Python object per line
+            data = np.frombuffer(chunk, dtype=np.uint8)
+            ends = np.flatnonzero(data == ord("\n"))
+            starts = np.concatenate(([0], ends[:-1] + 1))
+            second = data[np.minimum(starts + 1, len(data) - 1)]
+            spaced = (second == ord(" ")) | (second == ord("\t"))
+            isVertex = (data[starts] == ord("v")) & spaced
+            isFace = (data[starts] == ord("f")) & spaced
+            lineLengths = ends + 1 - starts # -> per byte flags with np.repeat, 1 byte each instead of a line number
+            body = np.ones(len(data), dtype=bool) # everything but the 2 keyword bytes
+            body[starts] = False
+            body[np.minimum(starts + 1, len(data) - 1)] = False
+
+            vertexRows = int(isVertex.sum())
+            if vertexRows:
+                vertexText = data[np.repeat(isVertex, lineLengths) & body].tobytes()
+                vertexBuffer.append(parseRows(vertexText, vertexRows, 3))
+            if isFace.any():
+                faceText = data[np.repeat(isFace, lineLengths) & body].tobytes()
+                if b"/" in faceText:
+                    faceText = re.sub(rb"/\S*", b"", faceText) # "v/vt/vn" corners -> keep the position index only
+                counts = tokenCounts(faceText)
+                indices = parseNumbers(faceText, np.int64)
+                if len(indices) != counts.sum():
+                    raise ValueError("%s: malformed face line" % path)
+                bases = vertexCount + np.cumsum(isVertex)[isFace] # vertices read before each face, negative indices count back from here
+                bases = np.repeat(bases, counts)
+                indices = np.where(indices < 0, bases + indices, indices - 1) # 1-based or relative -> 0-based
+                if len(indices) and (indices.min() < 0 or indices.max() >= 2**31):
+                    raise ValueError("%s: face index out of range" % path)
+                indexBuffer.append(indices)
+                countBuffer.append(counts)
+            vertexCount += vertexRows
+
+    if not vertexBuffer.length or not indexBuffer.length:
+        raise ValueError("%s: no vertices or faces found" % path)
+    vertices, indices, counts = vertexBuffer.array(), indexBuffer.array(), countBuffer.array()
+    if indices.max() >= len(vertices):
+        raise ValueError("%s: face index out of range" % path)
+    return vertices, triangulate(vertices, indices, counts), polygonOutlines(indices, counts)
+
+VERTEX_LINE = re.compile(rb"vertex\s+([^\n]*)")
+STL_RECORD = np.dtype([("normal", "<f4", (3,)), ("corners", "<f4", (3, 3)), ("attribute", "<u2")])
+
+def readStl(path):
+    """STL, binary or ASCII (told apart by the file size the binary header promises)"""
+    size = os.path.getsize(path)
+    with open(path, "rb") as file:
+        header = file.read(84)
+        count = int(np.frombuffer(header[80:84], dtype="<u4")[0]) if len(header) == 84 else -1
+        binary = size == 84 + count * STL_RECORD.itemsize or not header.lstrip().startswith(b"solid")
+
+        if binary:
+            if size < 84 + count * STL_RECORD.itemsize:
+                raise ValueError("%s: truncated binary STL" % path)
+            vertices = np.empty((count * 3, 3), dtype=np.float32)
+            for start in range(0, count, CHUNK_RECORDS):
+                records = np.frombuffer(file.read(min(CHUNK_RECORDS, count - start) * STL_RECORD.itemsize), dtype=STL_RECORD)
+                vertices[start * 3:(start + len(records)) * 3] = records["corners"].reshape(-1, 3)
+        else:
+            file.seek(0)
+            buffer = ArrayBuffer(np.float32, 3, capacity=size // 100) # ~ 3 corners per 250-300 bytes of facet text
+            while True:
+                chunk = file.read(CHUNK_BYTES)
+                if not chunk:
+                    break
+                chunk += file.readline() # finish the line the chunk stopped in
+                corners = VERTEX_LINE.findall(chunk) # the 3 numbers after every "vertex"
+                if corners:
+                    buffer.append(parseRows(b"\n".join(corners), len(corners), 3))
+            if not buffer.length:
+                raise ValueError("%s: no facets found" % path)
+            vertices = buffer.array()
+
+    corners = len(vertices) - len(vertices) % 3
+    triangles = np.arange(corners, dtype=np.int32 if corners < 2**31 else np.int64).reshape(-1, 3) # every facet has its own 3 corners
+    return vertices, triangles, None
+
+PLY_TYPES = {"char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1", "short": "i2", "int16": "i2",
+             "ushort": "u2", "uint16": "u2", "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+             "float": "f4", "float32": "f4", "double": "f8", "float64": "f8"}
+
+def readPlyHeader(file, path):
+    """Returns (format, [(element name, count, [properties])]), a property is (name, type) or (name, count type, item type)"""
+    if file.readline().strip() != b"ply":
+        raise ValueError("%s: not a PLY file" % path)
+    format, elements = None, []
+    for line in iter(file.readline, b""):
+        words = line.decode("ascii", "replace").split()
+        if not words or words[0] in ("comment", "obj_info"):
+            continue
+        if words[0] == "end_header":
+            return format, elements
+        if words[0] == "format":
+            format = words[1]
+        elif words[0] == "element":
+            elements.append((words[1], int(words[2]), []))
+        elif words[0] == "property" and words[1] == "list":
+            elements[-1][2].append((words[4], PLY_TYPES[words[2]], PLY_TYPES[words[3]]))
+        elif words[0] == "property":
+            elements[-1][2].append((words[2], PLY_TYPES[words[1]]))
+    raise ValueError("%s: PLY header never ends" % path)
+
+def readPlyFacesBinary(file, count, properties, order, path):
+    """
+    Reads count binary faces. They are first read as fixed size records assuming every face has as many corners as the
+    first one (by far the usual case), a file that mixes polygon sizes continues one face at a time from where it differs.
+    """
+    listAt = [i for i, p in enumerate(properties) if len(p) == 3]
+    if len(listAt) != 1:
+        raise ValueError("%s: faces need exactly one list property" % path)
+    listAt = listAt[0]
+    name, countType, itemType = properties[listAt]
+    before = sum(np.dtype(p[1]).itemsize for p in properties[:listAt])
+    after = sum(np.dtype(p[1]).itemsize for p in properties[listAt + 1:])
+    countType, itemType = np.dtype(order + countType), np.dtype(order + itemType)
+
+    start = file.tell()
+    file.seek(start + before)
+    corners = int(np.frombuffer(file.read(countType.itemsize), dtype=countType)[0]) if count else 3
+    file.seek(start)
+    record = np.dtype([("before", "V%d" % before), ("count", countType), ("indices", itemType, (corners,)), ("after", "V%d" % after)])
+
+    indexBuffer = ArrayBuffer(np.int32, capacity=count * corners) # exact unless polygon sizes are mixed
+    countBuffer = ArrayBuffer(np.int32, capacity=count)
+    done = 0
+    while done < count:
+        data = file.read(min(CHUNK_RECORDS, count - done) * record.itemsize)
+        if not data:
+            raise ValueError("%s: truncated PLY faces" % path)
+        records = np.frombuffer(data[:len(data) - len(data) % record.itemsize], dtype=record)
+        mismatch = np.flatnonzero(records["count"] != corners)
+        uniform = records[:mismatch[0]] if len(mismatch) else records
+        indexBuffer.append(uniform["indices"].reshape(-1))
+        countBuffer.append(np.full(len(uniform), corners, dtype=np.int32))
+        done += len(uniform)
+        if len(mismatch) or (done < count and len(data) % record.itemsize):
+            # mixed polygon sizes (a differing face, or one that is smaller than a record at the end of the chunk)
+            # -> walk the remaining faces one by one
+            rest = data[len(uniform) * record.itemsize:] + file.read()
+            position = 0
+            while done < count:
+                position += before
+                n = int(np.frombuffer(rest, dtype=countType, count=1, offset=position)[0])
+                position += countType.itemsize
+                indexBuffer.append(np.frombuffer(rest, dtype=itemType, count=n, offset=position))
+                countBuffer.append(n)
+                position += n * itemType.itemsize + after
+                done += 1
+    return indexBuffer.array(), countBuffer.array()
+
+def readPlyFacesAscii(file, count, properties, path):
+    """Reads count ASCII faces, the list property must come first (as every exporter writes it)"""
+    if not properties or len(properties[0]) != 3:
+        raise ValueError("%s: the face list property must come first" % path)
+    indexBuffer, countBuffer = ArrayBuffer(np.int32, capacity=count * 3), ArrayBuffer(np.int32, capacity=count)
+    for start in range(0, count, CHUNK_LINES):
+        lines = list(islice(file, min(CHUNK_LINES, count - start)))
+        rows = parseNumbers(b"".join(lines), np.int64)
+        corners = int(rows[0]) if len(rows) else 0
+        width = len(rows) // max(len(lines), 1)
+        if width >= corners + 1 and len(rows) == width * len(lines) and (rows[::width] == corners).all():
+            indexBuffer.append(rows.reshape(len(lines), width)[:, 1:corners + 1])
+            countBuffer.append(np.full(len(lines), corners, dtype=np.int32))
+        else:
+            # mixed polygon sizes -> one line at a time
+            for line in lines:
+                values = line.split()
+                n = int(values[0])
+                indexBuffer.append(np.array(values[1:n + 1], dtype=np.int64))
+                countBuffer.append(n)
+    return indexBuffer.array(), countBuffer.array()
+
+def readPly(path):
+    """Stanford PLY, ascii or binary in either byte order, only the vertex positions and the faces are used"""
+    with open(path, "rb") as file:
+        format, elements = readPlyHeader(file, path)
+        if format not in ("ascii", "binary_little_endian", "binary_big_endian"):
+            raise ValueError("%s: unknown PLY format %r" % (path, format))
+        order = "<" if format == "binary_little_endian" else ">"
+
+        vertices = indices = counts = None
+        for name, count, properties in elements:
+            if name == "vertex":
+                names = [p[0] for p in properties]
+                try:
+                    columns = [names.index(axis) for axis in ("x", "y", "z")]
+                except ValueError:
+                    raise ValueError("%s: vertices have no x, y, z" % path)
+                vertices = np.empty((count, 3), dtype=np.float32)
+                if format == "ascii":
+                    for start in range(0, count, CHUNK_LINES):
+                        lines = list(islice(file, min(CHUNK_LINES, count - start)))
+                        rows = parseRows(b"".join(lines), len(lines), len(properties))
+                        vertices[start:start + len(rows)] = rows[:, columns]
+                else:
+                    record = np.dtype([(p[0], order + p[1]) for p in properties])
+                    for start in range(0, count, CHUNK_RECORDS):
+                        records = np.frombuffer(file.read(min(CHUNK_RECORDS, count - start) * record.itemsize), dtype=record)
+                        for column, axis in enumerate("xyz"):
+                            vertices[start:start + len(records), column] = records[axis]
+            elif name == "face":
+                if format == "ascii":
+                    indices, counts = readPlyFacesAscii(file, count, properties, path)
+                else:
+                    indices, counts = readPlyFacesBinary(file, count, properties, order, path)
+            elif vertices is not None and indices is not None:
+                break # everything we need is read, ignore what follows
+            elif format == "ascii":
+                for line in islice(file, count):
+                    pass
+            elif any(len(p) == 3 for p in properties):
+                raise ValueError("%s: cannot skip the list element %r" % (path, name))
+            else:
+                file.seek(count * sum(np.dtype(p[1]).itemsize for p in properties), os.SEEK_CUR) # fixed size records
+
+    if vertices is None or indices is None:
+        raise ValueError("%s: no vertices or faces found" % path)
+    if len(indices) and (indices.min() < 0 or indices.max() >= len(vertices)):
+        raise ValueError("%s: face index out of range" % path)
+    return vertices, triangulate(vertices, indices, counts), polygonOutlines(indices, counts)
+
+READERS = {".obj": readObj, ".stl": readStl, ".ply": readPly}
+
+"""
+Welding
+"""
+def hashWeld(keys):
+    """
+    Groups equal integer keys with an open addressing hash table built from NumPy arrays: every round, the keys that
+    are still unresolved try their slot, one of them claims each empty slot and everyone matching a slot's owner is done,
+    the rest probe the next slot. Returns for each key the index of the representative key of its group.
+    The keys go in blocks of WELD_BLOCK (the table is shared, so a later block finds the groups of the earlier ones)
+    -> the hashing and probing temporaries stay small however many keys there are.
+    """
+    count = len(keys)
+    bits = max(1, int(count * 2 - 1).bit_length()) # table at least twice the keys -> short probe chains
+    mask = (1 << bits) - 1
+    index = np.int32 if count < 2**31 else np.int64 # half the memory for everything below on any realistic mesh
+    table = np.full(1 << bits, -1, dtype=index) # slot -> index of the key that owns it
+    owners = np.empty(count, dtype=index)
+
+    for start in range(0, count, WELD_BLOCK):
+        pending = np.arange(start, min(start + WELD_BLOCK, count), dtype=index)
+        pendingKeys = keys[start:start + WELD_BLOCK]
+        slots = ((pendingKeys.view(np.uint64) * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(64 - bits)).astype(index) # Fibonacci hashing
+        while len(pending):
+            empty = table[slots] < 0
+            table[slots[empty]] = pending[empty] # if several keys want the same empty slot the last write wins
+            owner = table[slots]
+            matched = keys[owner] == pendingKeys
+            owners[pending[matched]] = owner[matched]
+            pending, pendingKeys, slots = pending[~matched], pendingKeys[~matched], (slots[~matched] + 1) & mask # linear probing
+    return owners
+
+def weld(vertices, triangles, edges, tolerance=None):
+    """
+    Merges vertices closer than tolerance (default: about a millionth of the mesh size) into one.
+    Positions are snapped to a grid of that size and packed 21 bits per axis into one int64 key for hashWeld, WELD_BLOCK
+    vertices at a time with int32 grid coordinates -> no temporaries over all vertices but the keys themselves.
+    Triangles that collapse (two corners merged) are dropped, the result indexes with uint32 (as Mesh stores them).
+    """
+    lo, hi = vertices.min(axis=0).astype(np.float64), vertices.max(axis=0).astype(np.float64)
+    step = max(float((hi - lo).max()) / ((1 << 20) - 1), tolerance or 0.0) or 1.0 # the grid must fit in 21 bits
+    keys = np.empty(len(vertices), dtype=np.int64)
+    for start in range(0, len(vertices), WELD_BLOCK):
+        block = keys[start:start + WELD_BLOCK]
+        grid = np.rint((vertices[start:start + WELD_BLOCK] - lo) / step).astype(np.int32) # (B, 3), < 2**21 each
+        np.left_shift(grid[:, 2], 42, out=block, dtype=np.int64)
+        block |= grid[:, 1].astype(np.int64) << 21
+        block |= grid[:, 0]
+    owners = hashWeld(keys)
+    del keys
+
+    kept = np.flatnonzero(owners == np.arange(len(owners), dtype=owners.dtype)) # one vertex per group, in file order
+    remap = np.empty(len(owners), dtype=np.uint32 if len(owners) <= 1 << 32 else np.int64)
+    remap[kept] = np.arange(len(kept))
+    remap = remap[owners]
+
+    triangles = remap[triangles]
+    whole = (triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) & (triangles[:, 0] != triangles[:, 2])
+    if not whole.all():
+        triangles = triangles[whole]
+    return vertices[kept], triangles, None if edges is None else remap[edges]
+
+def fitToRadius(vertices, radius):
+    """Centers vertices on their bounding box and scales them so the furthest one is radius away from the origin"""
+    lo, hi = vertices.min(axis=0), vertices.max(axis=0)
+    centered = vertices - (lo + hi) / 2
+    squares = np.zeros(len(centered))
+    for axis in range(3): # one axis at a time -> no (N, 3) float64 temporaries
+        squares += centered[:, axis].astype(np.float64) ** 2
+    centered *= radius / float(np.sqrt(squares.max())) if squares.max() > 0 else 1.0
+    return centered
+
+def loadMesh(path, weldVertices=True, tolerance=None, fitRadius=IMPORT_RADIUS, optimize=None):
+    """
+    Reads an OBJ/STL/PLY file into a Mesh named after the file.
+    weldVertices merges duplicates (see weld), fitRadius (None to keep the file's units) centers and scales the result.
+    optimize reorders for the vertex cache (Mesh.optimized), None -> only meshes up to OPTIMIZE_MAX_TRIANGLES.
+    Raises ValueError for unsupported or malformed files.
+    """
+    reader = READERS.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        raise ValueError("%s: unsupported mesh format (use %s)" % (path, ", ".join(sorted(READERS))))
+    vertices, triangles, edges = reader(path)
+    if not len(vertices) or not len(triangles):
+        raise ValueError("%s: the mesh is empty" % path)
+    if weldVertices:
+        vertices, triangles, edges = weld(vertices, triangles, edges, tolerance)
+    if fitRadius is not None:
+        vertices = fitToRadius(vertices, fitRadius)
+    if edges is not None:
+        edges = uniqueEdges(edges) # else all triangles -> their sides are the outlines, Mesh derives them
+    mesh = Mesh(vertices, edges, triangles, name=os.path.splitext(os.path.basename(path))[0])
+    if optimize is None:
+        optimize = mesh.triangleCount <= OPTIMIZE_MAX_TRIANGLES
+    return mesh.optimized() if optimize else mesh # done once here since the mesh cache stores the result
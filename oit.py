@@ -0,0 +1,134 @@
+"""
+Weighted blended order-independent transparency for GLWidget (McGuire & Bavoil, "Weighted Blended Order-Independent
+Transparency", JCGT 2013). Transparent faces go into two float render targets in any order:
+  target 0 -> rgb: sum of color * alpha * weight, alpha: product of (1 - alpha), the "revealage" of the background
+  target 1 -> r: sum of alpha * weight
+so one blend function serves both (glBlendFuncSeparate(ONE, ONE, ZERO, ONE_MINUS_SRC_ALPHA)), no GL 4 per-target
+blending needed. A composite pass then blends the weighted average color over the frame. No sorting at all, the
+price is an approximation: surfaces of similar depth mix instead of covering each other exactly.
+"""
+from OpenGL.GL import *
+from OpenGL.error import GLError, NullFunctionError
+
+from shaders import (OIT_ACCUMULATE_VERTEX_SHADER, OIT_ACCUMULATE_FRAGMENT_SHADER, OIT_COMPOSITE_VERTEX_SHADER,
+                     OIT_COMPOSITE_FRAGMENT_SHADER, setLightUniforms)
+
+class WeightedBlendedOIT:
+    """
+    The accumulation framebuffer (two RGBA16F textures plus a depth buffer) and the two passes around it.
+    Use begin() -> draw the transparent faces -> end(). The framebuffer is sized to the viewport on demand.
+    If the driver lacks float textures, MRT or the shaders, available turns False and the widget falls back to sorting.
+    """
+    def __init__(self, shaderCache):
+        self.shaderCache = shaderCache
+        self.framebuffer = None
+        self.textures = None # (accumulation, weights)
+        self.depthBuffer = None
+        self.size = None # (width, height) of the framebuffer
+        self.target = 0 # the framebuffer begin() found bound, end() composites into it
+        self.available = True
+
+    def programs(self):
+        """(accumulate, composite) programs, None if either cannot be built"""
+        accumulate = self.shaderCache.get("oitAccumulate", OIT_ACCUMULATE_VERTEX_SHADER, OIT_ACCUMULATE_FRAGMENT_SHADER)
+        composite = self.shaderCache.get("oitComposite", OIT_COMPOSITE_VERTEX_SHADER, OIT_COMPOSITE_FRAGMENT_SHADER)
+        return (accumulate, composite) if accumulate is not None and composite is not None else None
+
+    def allocate(self, width, height):
+        """(Re)creates the targets for a width x height framebuffer"""
+        self.delete()
+        self.framebuffer = int(glGenFramebuffers(1))
+        self.textures = tuple(int(texture) for texture in glGenTextures(2))
+        self.depthBuffer = int(glGenRenderbuffers(1))
+        glBindFramebuffer(GL_FRAMEBUFFER, self.framebuffer)
+        for attachment, texture in zip((GL_COLOR_ATTACHMENT0, GL_COLOR_ATTACHMENT1), self.textures):
+            glBindTexture(GL_TEXTURE_2D, texture)
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA16F, width, height, 0, GL_RGBA, GL_FLOAT, None)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+            glFramebufferTexture2D(GL_FRAMEBUFFER, attachment, GL_TEXTURE_2D, texture, 0)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.depthBuffer)
+        # same format as the combined depth/stencil buffer of QOpenGLWidget and the offscreen renderer, blits need matching formats
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH24_STENCIL8, width, height)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_STENCIL_ATTACHMENT, GL_RENDERBUFFER, self.depthBuffer)
+        complete = glCheckFramebufferStatus(GL_FRAMEBUFFER) == GL_FRAMEBUFFER_COMPLETE
+        glBindFramebuffer(GL_FRAMEBUFFER, self.target)
+        self.size = (width, height)
+        return complete
+
+    def begin(self, lit):
+        """
+        Switches drawing to the accumulation targets, with the depth of what is already drawn (the opaque edges) copied
+        in so transparent faces behind them are still hidden. Returns False (nothing changed) if OIT is not available.
+        """
+        if not self.available:
+            return False
+        try:
+            programs = self.programs()
+            self.target = int(glGetIntegerv(GL_DRAW_FRAMEBUFFER_BINDING)) # the widget's (or the offscreen renderer's) framebuffer
+            x, y, width, height = (int(value) for value in glGetIntegerv(GL_VIEWPORT))
+            size = (x + width, y + height) # covers the viewport, pixel coordinates stay the same in both framebuffers
+            if programs is None or (size != self.size and not self.allocate(*size)):
+                self.available = False
+                self.delete()
+                return False
+            glBindFramebuffer(GL_READ_FRAMEBUFFER, self.target)
+            glBindFramebuffer(GL_DRAW_FRAMEBUFFER, self.framebuffer)
+            glBlitFramebuffer(x, y, x + width, y + height, x, y, x + width, y + height, GL_DEPTH_BUFFER_BIT, GL_NEAREST)
+        except (GLError, NullFunctionError):
+            self.available = False # no framebuffer objects, float textures or depth blits between these formats
+            glBindFramebuffer(GL_FRAMEBUFFER, self.target)
+            return False
+
+        glBindFramebuffer(GL_FRAMEBUFFER, self.framebuffer)
+        glDrawBuffers(2, (GL_COLOR_ATTACHMENT0, GL_COLOR_ATTACHMENT1))
+        glClearBufferfv(GL_COLOR, 0, (0.0, 0.0, 0.0, 1.0)) # nothing accumulated, background fully revealed
+        glClearBufferfv(GL_COLOR, 1, (0.0, 0.0, 0.0, 0.0))
+
+        glPushAttrib(GL_ENABLE_BIT | GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        glDepthMask(GL_FALSE) # tested against the opaque depth, never written
+        glEnable(GL_BLEND)
+        glBlendFuncSeparate(GL_ONE, GL_ONE, GL_ZERO, GL_ONE_MINUS_SRC_ALPHA)
+        glEnable(GL_VERTEX_PROGRAM_TWO_SIDE) # back faces use gl_BackColor, lit with the flipped normal
+
+        accumulate = programs[0]
+        accumulate.use()
+        setLightUniforms(accumulate, lit)
+        return True
+
+    def end(self):
+        """Composites the accumulated surfaces over the framebuffer begin() found bound"""
+        glUseProgram(0)
+        glPopAttrib()
+        glBindFramebuffer(GL_FRAMEBUFFER, self.target)
+
+        composite = self.programs()[1]
+        glPushAttrib(GL_ENABLE_BIT | GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        glDisable(GL_DEPTH_TEST)
+        glDepthMask(GL_FALSE)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        composite.use()
+        for unit, (name, texture) in enumerate(zip(("accumulation", "weights"), self.textures)):
+            glActiveTexture(GL_TEXTURE0 + unit)
+            glBindTexture(GL_TEXTURE_2D, texture)
+            glUniform1i(composite.uniform(name), unit)
+        glUniform2f(composite.uniform("size"), *self.size)
+        glBegin(GL_QUADS) # the whole viewport, already in clip space so no matrices are involved
+        for corner in ((-1.0, -1.0), (1.0, -1.0), (1.0, 1.0), (-1.0, 1.0)):
+            glVertex2f(*corner)
+        glEnd()
+        for unit in (1, 0):
+            glActiveTexture(GL_TEXTURE0 + unit)
+            glBindTexture(GL_TEXTURE_2D, 0)
+        glUseProgram(0)
+        glPopAttrib()
+
+    def delete(self):
+        """Frees the framebuffer and its targets (needs a current context), the next begin() recreates them"""
+        if self.framebuffer is not None:
+            glDeleteFramebuffers(1, [self.framebuffer])
+            glDeleteTextures(2, list(self.textures))
+            glDeleteRenderbuffers(1, [self.depthBuffer])
+        self.framebuffer = self.textures = self.depthBuffer = self.size = None
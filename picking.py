@@ -0,0 +1,51 @@
+"""
+Mouse picking -> which face and vertex of a mesh a ray hits.
+The TriangleBVH of a mesh is built once and kept, meshes never change once built (a new level of detail or import is
+a new Mesh), so picks are only the ray cast. Big meshes get theirs built in the background when they are added (see
+GLWidget.prepareBVH), anything else on its first pick.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from bvh import TriangleBVH
+
+@lru_cache(maxsize=16)
+def meshBVH(mesh):
+    """The TriangleBVH of mesh, built once per mesh"""
+    return TriangleBVH(mesh.vertices, mesh.triangles)
+
+class PickHit:
+    """
+    Where a ray hit a mesh:
+    face     -> index of the triangle hit (a row of mesh.triangles)
+    vertex   -> index of the corner of that triangle nearest to the hit
+    point    -> the hit in model space, float64 (3,)
+    distance -> from the ray origin to the hit, in model units
+    """
+    __slots__ = ("face", "vertex", "point", "distance")
+
+    def __init__(self, face, vertex, point, distance):
+        self.face = face
+        self.vertex = vertex
+        self.point = point
+        self.distance = distance
+
+    def __repr__(self):
+        return "PickHit(face=%d, vertex=%d, point=(%.3f, %.3f, %.3f), distance=%.3f)" % ((self.face, self.vertex) + tuple(self.point) + (self.distance,))
+
+def pickMesh(mesh, origin, direction, bvh=None):
+    """
+    The nearest hit of the ray origin + t direction (t >= 0, model space) on mesh as a PickHit, or None.
+    bvh -> the TriangleBVH of mesh if the caller already has it, otherwise meshBVH(mesh)
+    """
+    origin = np.asarray(origin, dtype=np.float64)
+    direction = np.asarray(direction, dtype=np.float64)
+    hit = (meshBVH(mesh) if bvh is None else bvh).intersect(origin, direction)
+    if hit is None:
+        return None
+    face, t, u, v = hit
+    point = origin + t * direction
+    corners = mesh.triangles[face]
+    vertex = int(corners[np.argmin(((mesh.vertices[corners] - point) ** 2).sum(axis=1))])
+    return PickHit(face, vertex, point, t * float(np.linalg.norm(direction)))
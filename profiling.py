@@ -0,0 +1,195 @@
+"""
+Frame timing for GLWidget.
+Every frame records how long each phase took (the animation step, shape compiles/uploads, paintGL, the buffer swap
+and optionally the GPU time from timer queries) plus its draw calls, into a fixed size ring buffer, so profiling
+a long session costs the same memory as a short one. The overlay, the status bar and the CSV dump all read from it.
+"""
+import csv
+import time
+from collections import deque
+
+import numpy as np
+try:
+    from OpenGL.GL import *
+    from OpenGL.error import GLError, NullFunctionError
+except ImportError: # the software renderer profiles without PyOpenGL -> GpuTimer finds no glGenQueries and turns itself off
+    GLError = NullFunctionError = NameError
+
+PHASES = ("step", "compile", "paint", "swap", "gpu") # milliseconds spent per frame in each, compiles happen inside paint
+
+FRAME_RECORD = np.dtype([("time", "f8"), ("frame", "f4")] + [(phase, "f4") for phase in PHASES] + [("drawCalls", "i4")])
+
+class PhaseTimer:
+    """Context manager adding the time spent inside it to one phase of the profiler's current frame"""
+    __slots__ = ("profiler", "phase", "start")
+
+    def __init__(self, profiler, phase):
+        self.profiler = profiler
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        self.profiler.current[self.phase] += (time.perf_counter() - self.start) * 1000
+
+class GpuTimer:
+    """
+    GL_TIME_ELAPSED queries around paintGL. Results are read a few frames later, once the GPU has them,
+    so asking never stalls the pipeline. Turns itself off if the driver has no timer queries.
+    """
+    def __init__(self, depth=4):
+        self.depth = depth # queries in flight, a frame is skipped when all of them are still pending
+        self.free = None # created on the first begin(), a context has to be current
+        self.pending = deque()
+        self.active = None
+        self.available = True
+
+    def begin(self):
+        if not self.available:
+            return
+        try:
+            if self.free is None:
+                self.free = [int(query) for query in glGenQueries(self.depth)]
+            if self.free:
+                self.active = self.free.pop()
+                glBeginQuery(GL_TIME_ELAPSED, self.active)
+        except (GLError, NullFunctionError):
+            self.available = False # no GL 3.3 / ARB_timer_query
+
+    def end(self):
+        if self.active is not None:
+            glEndQuery(GL_TIME_ELAPSED)
+            self.pending.append(self.active)
+            self.active = None
+
+    def collect(self):
+        """Milliseconds of every finished query, oldest first"""
+        results = []
+        while self.pending and glGetQueryObjectiv(self.pending[0], GL_QUERY_RESULT_AVAILABLE):
+            query = self.pending.popleft()
+            results.append(glGetQueryObjectui64v(query, GL_QUERY_RESULT) / 1e6)
+            self.free.append(query)
+        return results
+
+    def delete(self):
+        """Deletes the query objects (needs a current context)"""
+        if self.free is not None:
+            glDeleteQueries(len(self.free) + len(self.pending), self.free + list(self.pending))
+        self.free, self.pending, self.active = None, deque(), None
+
+class FrameProfiler:
+    """
+    Per-frame phase times in a ring buffer of capacity frames.
+    The widget times its phases with measure(phase), counts draw calls with countDraws() and calls endFrame() once
+    the frame is on screen, which stores the frame and starts the next one.
+    """
+    def __init__(self, capacity=1024):
+        self.records = np.zeros(capacity, dtype=FRAME_RECORD)
+        self.count = 0 # frames recorded in total, the ring holds the last min(count, capacity) of them
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.drawCalls = 0
+        self.lastFrameTime = None # perf_counter of the previous endFrame
+        self.paintEnd = None # perf_counter when paintGL returned, the swap phase runs from there to endFrame
+        self.gpuTimer = GpuTimer()
+        self.gpuTiming = False # timer queries are off unless asked for, some drivers sync on them
+
+    @property
+    def capacity(self):
+        return len(self.records)
+
+    def measure(self, phase):
+        """with profiler.measure("step"): ... -> adds the time spent to phase"""
+        return PhaseTimer(self, phase)
+
+    def countDraws(self, calls=1):
+        self.drawCalls += calls
+
+    def beginPaint(self):
+        if self.gpuTiming:
+            self.gpuTimer.begin()
+
+    def endPaint(self):
+        if self.gpuTiming:
+            self.gpuTimer.end()
+            for milliseconds in self.gpuTimer.collect():
+                self.current["gpu"] += milliseconds # from a frame or two ago, the GPU runs behind
+        self.paintEnd = time.perf_counter()
+
+    def endFrame(self):
+        """The frame is on screen (frameSwapped) -> store it in the ring and start the next one"""
+        now = time.perf_counter()
+        if self.paintEnd is not None:
+            self.current["swap"] += (now - self.paintEnd) * 1000
+            self.paintEnd = None
+        record = self.records[self.count % self.capacity]
+        record["time"] = now
+        record["frame"] = 0.0 if self.lastFrameTime is None else (now - self.lastFrameTime) * 1000
+        for phase in PHASES:
+            record[phase] = self.current[phase]
+            self.current[phase] = 0.0
+        record["drawCalls"] = self.drawCalls
+        self.drawCalls = 0
+        self.lastFrameTime = now
+        self.count += 1
+
+    def setGpuTiming(self, enabled):
+        self.gpuTiming = enabled
+
+    def recent(self, frames=None):
+        """The last frames records (all that are kept if None), oldest first"""
+        kept = min(self.count, self.capacity)
+        frames = kept if frames is None else min(frames, kept)
+        order = (np.arange(self.count - frames, self.count)) % self.capacity
+        return self.records[order]
+
+    def summary(self, frames=240):
+        """
+        FPS, frame time percentiles, mean phase times and draw calls over the last frames frames, or None before any.
+        The first frame after an idle period measures the idle gap, not a frame, so it is left out.
+        """
+        records = self.recent(frames)
+        records = records[1:] if len(records) > 1 else records[:0]
+        if not len(records):
+            return None
+        frameTimes = records["frame"]
+        span = records["time"][-1] - records["time"][0] + frameTimes[0] / 1000
+        p50, p95, p99 = np.percentile(frameTimes, (50, 95, 99))
+        summary = {"fps": float(len(records) / span) if span > 0 else 0.0, "p50": float(p50), "p95": float(p95), "p99": float(p99),
+                   "drawCalls": float(records["drawCalls"].mean()), "frames": len(records)}
+        summary.update((phase, float(records[phase].mean())) for phase in PHASES)
+        return summary
+
+    def overlayLines(self):
+        """The summary as short lines of text for the overlay"""
+        summary = self.summary()
+        if summary is None:
+            return ["waiting for frames..."]
+        lines = ["%.1f FPS  %d draw calls/frame" % (summary["fps"], round(summary["drawCalls"])),
+                 "frame p50 %.2f  p95 %.2f  p99 %.2f ms" % (summary["p50"], summary["p95"], summary["p99"]),
+                 "step %.2f  compile %.2f  paint %.2f  swap %.2f ms" % tuple(summary[phase] for phase in PHASES[:4])]
+        if self.gpuTiming:
+            lines.append("gpu %.2f ms" % summary["gpu"] if self.gpuTimer.available else "gpu timer queries not supported")
+        return lines
+
+    def writeCsv(self, path):
+        """Writes every kept frame as a CSV row (milliseconds, time in seconds since the first kept frame)"""
+        records = self.recent()
+        start = records["time"][0] if len(records) else 0.0
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(FRAME_RECORD.names)
+            for record in records:
+                writer.writerow(["%.6f" % (record["time"] - start)] + ["%.4f" % record[name] for name in FRAME_RECORD.names[1:-1]] +
+                                [int(record["drawCalls"])])
+        return len(records)
+
+    def clear(self):
+        """Forgets every recorded frame"""
+        self.count = 0
+        self.lastFrameTime = None
+
+    def delete(self):
+        """Frees the GPU timer queries (needs a current context)"""
+        self.gpuTimer.delete()
@@ -0,0 +1,67 @@
+"""
+Coalesced UI -> renderer state for GLWidget and SoftwareWidget.
+The color and rotation sliders fire valueChanged for every pixel of a drag, often several times between two frames.
+Instead of touching the renderer each time, a change only lands here and marks its field dirty. The widget applies
+every dirty field once at the start of its next paint, so however many signals arrive, a frame sees one change per
+field and rebuilds a shape at most once.
+"""
+
+class RenderState:
+    """
+    The latest value of each field plus a dirty flag per field.
+    set()/setChannel() store a value and ask for one frame with requestFrame (widget.update, Qt merges repeats too),
+    flush() hands the dirty fields to the widget and clears the flags. A write that a later write in the same frame
+    overrides, or that changes nothing, is dropped and counted.
+    """
+    def __init__(self, values, requestFrame):
+        self.applied = {field: tuple(value) for field, value in values.items()} # what the widget draws with right now
+        self.pending = {} # dirty fields -> their newest value, applied on the next flush
+        self.requestFrame = requestFrame
+        self.updates = 0 # writes received
+        self.dropped = 0 # writes that never reached the widget (overridden within the frame or no change)
+        self.flushes = 0 # flushes that applied at least one field
+
+    def value(self, field):
+        """The newest value of field, pending or applied"""
+        return self.pending.get(field, self.applied[field])
+
+    def set(self, field, value):
+        """Marks field dirty with value, it reaches the widget on the next flush"""
+        value = tuple(value)
+        self.updates += 1
+        if field in self.pending:
+            self.dropped += 1 # the pending write is overridden before any frame drew it
+        elif value == self.applied[field]:
+            self.dropped += 1 # nothing to do
+            return
+        wasClean = not self.pending
+        self.pending[field] = value
+        if wasClean:
+            self.requestFrame() # one request per frame, the following writes ride along
+
+    def setChannel(self, field, channel, value):
+        """Replaces one component of field (e.g. the red of a color), the others keep their newest value"""
+        values = list(self.value(field))
+        values[channel] = value
+        self.set(field, values)
+
+    def isDirty(self, field=None):
+        """True if field (any field when None) changed since the last flush"""
+        return bool(self.pending) if field is None else field in self.pending
+
+    def flush(self):
+        """Returns {field: value} of every field that really changed since the last flush and marks them applied"""
+        changes = {}
+        for field, value in self.pending.items():
+            if value == self.applied[field]:
+                self.dropped += 1 # dragged back to where it started within the frame
+                continue
+            changes[field] = self.applied[field] = value
+        self.pending.clear()
+        if changes:
+            self.flushes += 1
+        return changes
+
+    def stats(self):
+        """Returns the counters as a dict, like ShapeCache.stats"""
+        return {"updates": self.updates, "dropped": self.dropped, "flushes": self.flushes}
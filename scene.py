@@ -0,0 +1,178 @@
+"""
+Multi-object scenes.
+Objects are stored column-wise (one NumPy array per property) instead of one Python object each, so moving,
+spinning and building the per-instance transforms of thousands of shapes is a handful of array operations.
+Objects that share a Mesh are grouped into batches so the renderer can draw each group with one instanced call.
+"""
+import numpy as np
+
+from bvh import SceneBVH
+from transforms import IDENTITY_QUATERNION, quatIntegrate, quatNlerp, modelMatrix
+
+class SceneObject:
+    """A handle to one object of a Scene, reads and writes go straight to the scene's arrays"""
+    __slots__ = ("scene", "index")
+
+    def __init__(self, scene, index):
+        self.scene = scene
+        self.index = index
+
+    @property
+    def mesh(self):
+        return self.scene.meshes[self.scene.meshIds[self.index]]
+
+    @property
+    def position(self):
+        return self.scene.positions[self.index]
+
+    @position.setter
+    def position(self, value):
+        self.scene.positions[self.index] = value
+        self.scene.moved(self.index)
+
+    @property
+    def orientation(self):
+        return self.scene.orientations[self.index]
+
+    @property
+    def color(self):
+        return self.scene.colors[self.index]
+
+    @color.setter
+    def color(self, value):
+        self.scene.colors[self.index] = value
+
+class Scene:
+    """
+    A flat scene graph: every object has a mesh reference, a transform (position, orientation quaternion, scale),
+    a spin (radians/second around its own x, y, z axes) and an RGBA color.
+    """
+    def __init__(self):
+        self.meshes = [] # the distinct meshes used, objects point into this list with meshIds
+        self.meshIds = np.zeros(0, dtype=np.int32)
+        self.positions = np.zeros((0, 3))
+        self.orientations = np.zeros((0, 4))
+        self.previousOrientations = np.zeros((0, 4)) # orientation one fixed step ago, for interpolating frames
+        self.spins = np.zeros((0, 3))
+        self.scales = np.zeros(0)
+        self.colors = np.zeros((0, 4), dtype=np.float32)
+        self.version = 0 # bumped whenever objects are added/moved, lets caches (batches, bounds) know they are stale
+        self._batches = None
+        self._bvh = None # built on the first culling query, rebuilt when objects are added
+        self._moved = [] # object indices moved since the last refit
+
+    def __len__(self):
+        return len(self.meshIds)
+
+    def __getitem__(self, index):
+        return SceneObject(self, index)
+
+    def meshId(self, mesh):
+        """Index of mesh in self.meshes, registering it the first time it is used"""
+        for index, known in enumerate(self.meshes):
+            if known is mesh:
+                return index
+        self.meshes.append(mesh)
+        return len(self.meshes) - 1
+
+    def add(self, mesh, position=(0, 0, 0), orientation=None, spin=(0, 0, 0), scale=1.0, color=(1.0, 1.0, 0.0, 1.0)):
+        """Adds one object and returns its SceneObject handle, use addMany for large numbers of objects"""
+        orientation = IDENTITY_QUATERNION if orientation is None else orientation
+        self.addMany(mesh, [position], [orientation], [spin], [scale], [color])
+        return self[len(self) - 1]
+
+    def addMany(self, mesh, positions, orientations=None, spins=None, scales=None, colors=None):
+        """Adds len(positions) objects that all use mesh, every other property can be one value or one per object"""
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        count = len(positions)
+        if orientations is None:
+            orientations = IDENTITY_QUATERNION
+        orientations = np.broadcast_to(np.asarray(orientations, dtype=np.float64), (count, 4))
+        spins = np.broadcast_to(np.asarray(0.0 if spins is None else spins, dtype=np.float64), (count, 3))
+        scales = np.broadcast_to(np.asarray(1.0 if scales is None else scales, dtype=np.float64), (count,))
+        colors = np.broadcast_to(np.asarray((1.0, 1.0, 0.0, 1.0) if colors is None else colors, dtype=np.float32), (count, 4))
+
+        self.meshIds = np.concatenate((self.meshIds, np.full(count, self.meshId(mesh), dtype=np.int32)))
+        self.positions = np.concatenate((self.positions, positions))
+        self.orientations = np.concatenate((self.orientations, orientations))
+        self.previousOrientations = np.concatenate((self.previousOrientations, orientations))
+        self.spins = np.concatenate((self.spins, spins))
+        self.scales = np.concatenate((self.scales, scales))
+        self.colors = np.concatenate((self.colors, colors))
+        self.version += 1
+        self._batches = None
+        self._bvh = None # new objects -> the tree layout changes
+
+    def moved(self, indices):
+        """Call after writing positions/scales directly so caches depending on them are refreshed"""
+        self._moved.append(np.atleast_1d(np.asarray(indices, dtype=np.int64)))
+        self.version += 1
+
+    def radii(self):
+        """World radius of each object's bounding sphere -> the mesh's radius around its origin times the scale"""
+        meshRadii = np.array([mesh.boundingRadius for mesh in self.meshes])
+        return meshRadii[self.meshIds] * self.scales
+
+    def visibleObjects(self, planes):
+        """
+        Indices of the objects whose bounding sphere touches the frustum planes (transforms.frustumPlanes).
+        The spheres are centered on each object's origin, so spinning never changes them and only moves need a refit.
+        """
+        if not len(self):
+            return np.zeros(0, dtype=np.int64)
+        radii = self.radii()
+        if self._bvh is None:
+            self._bvh = SceneBVH(self.positions, radii)
+        elif self._moved:
+            self._bvh.refit(self.positions, radii, np.concatenate(self._moved)) # only the leaves that moved
+        self._moved = []
+        return self._bvh.query(planes, self.positions, radii)
+
+    def advance(self, dt):
+        """Spins every object forward by dt seconds (one vectorized quaternion update for the whole scene)"""
+        if not len(self):
+            return
+        self.previousOrientations = self.orientations
+        self.orientations = quatIntegrate(self.orientations, self.spins, dt)
+
+    def isAnimated(self):
+        """True if any object spins"""
+        return bool(len(self)) and bool(np.any(self.spins))
+
+    def modelMatrices(self, alpha=1.0, indices=None):
+        """(N, 4, 4) model matrices, orientations blended alpha of the way from the previous fixed step to the current"""
+        indices = slice(None) if indices is None else indices
+        orientations = quatNlerp(self.previousOrientations[indices], self.orientations[indices], alpha)
+        return modelMatrix(self.positions[indices], orientations, self.scales[indices])
+
+    def batches(self):
+        """Returns [(mesh, object indices)], one entry per mesh -> one instanced draw call each"""
+        if self._batches is None:
+            order = np.argsort(self.meshIds, kind="stable")
+            starts = np.searchsorted(self.meshIds[order], np.arange(len(self.meshes) + 1))
+            self._batches = [(self.meshes[i], order[starts[i]:starts[i + 1]])
+                             for i in range(len(self.meshes)) if starts[i + 1] > starts[i]]
+        return self._batches
+
+    @classmethod
+    def grid(cls, meshes, count, spacing=1.0, scale=0.3, maxSpin=2.0, seed=None):
+        """
+        A test scene of count objects on a square grid in the z = 0 plane, cycling through meshes,
+        each with a random spin (up to maxSpin radians/second per axis), orientation and color.
+        """
+        rng = np.random.default_rng(seed)
+        side = int(np.ceil(np.sqrt(count)))
+        cells = np.arange(count)
+        positions = np.stack(((cells % side - (side - 1) / 2) * spacing,
+                              (cells // side - (side - 1) / 2) * spacing,
+                              np.zeros(count)), axis=-1)
+        orientations = rng.normal(size=(count, 4))
+        orientations /= np.linalg.norm(orientations, axis=1, keepdims=True)
+        spins = rng.uniform(-maxSpin, maxSpin, size=(count, 3))
+        colors = np.concatenate((rng.random((count, 3)), np.ones((count, 1))), axis=1)
+
+        scene = cls()
+        for k, mesh in enumerate(meshes):
+            chosen = cells[k::len(meshes)]
+            scene.addMany(mesh, positions[chosen], orientations[chosen], spins[chosen], scale, colors[chosen])
+        return scene
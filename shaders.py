@@ -0,0 +1,276 @@
+"""
+GLSL program helpers for GLWidget.
+Programs are compiled and linked once per context and kept in a ShaderCache, so drawing only ever binds them.
+"""
+from OpenGL.GL import *
+from OpenGL.error import GLError, NullFunctionError
+
+from lighting import LIGHT_DIRECTION, LIGHT_AMBIENT, LIGHT_DIFFUSE
+
+"""
+Lighting shared by the programs below -> the light of lighting.py, same result as the fixed-function path.
+Sets gl_FrontColor/gl_BackColor, back faces are lit with the flipped normal like GL_LIGHT_MODEL_TWO_SIDE
+(needs GL_VERTEX_PROGRAM_TWO_SIDE while drawing). Uniforms are set with setLightUniforms().
+"""
+LIGHTING_SOURCE = """
+uniform bool lit;
+uniform vec3 lightDirection;
+uniform float ambient;
+uniform float diffuse;
+void setLitColors(vec4 color, bool shaded) {
+    gl_FrontColor = color;
+    gl_BackColor = color;
+    if (lit && shaded) {
+        float facing = dot(normalize(gl_NormalMatrix * gl_Normal), lightDirection);
+        gl_FrontColor.rgb = color.rgb * (ambient + diffuse * max(facing, 0.0));
+        gl_BackColor.rgb = color.rgb * (ambient + diffuse * max(-facing, 0.0));
+    }
+}
+"""
+
+"""
+Colors as uniforms -> the display lists/buffers of a shape hold geometry only, so a color slider costs one glUniform.
+part tells edges (0) from faces (1): it is a generic attribute set once per part with glVertexAttrib1f, which also
+records into display lists. Rainbow colors come from the shape's color buffer through gl_Color.
+"""
+COLOR_VERTEX_SHADER = """
+#version 120
+attribute float part;
+uniform vec4 edgeColor;
+uniform vec4 surfaceColor;
+uniform bool useVertexColor;
+""" + LIGHTING_SOURCE + """
+void main() {
+    gl_Position = ftransform();
+    bool face = part > 0.5;
+    setLitColors(face ? (useVertexColor ? gl_Color : surfaceColor) : edgeColor, face);
+}
+"""
+
+COLOR_FRAGMENT_SHADER = """
+#version 120
+void main() {
+    gl_FragColor = gl_Color;
+}
+"""
+
+COLOR_ATTRIBUTES = {"part": 7} # away from the locations NVIDIA aliases to gl_Vertex/gl_Normal/gl_Color (0, 2, 3)
+COLOR_PART_LOCATION = COLOR_ATTRIBUTES["part"]
+EDGE_PART, FACE_PART = 0.0, 1.0
+
+"""
+Barycentric wireframe -> the faces are drawn once and the fragment shader paints the pixels near an edge in the edge
+color, so edges cost no line geometry at all. The geometry shader gives every corner of a triangle its barycentric
+coordinate and reads which sides are real edges from a buffer texture (Mesh.edgeMasks, bit k -> corner k to k+1), so
+quad and grid diagonals stay hidden. Needs GL 3.2 (geometry shaders, compatibility profile).
+"""
+WIREFRAME_VERTEX_SHADER = """
+#version 150 compatibility
+uniform vec4 surfaceColor;
+uniform bool useVertexColor;
+""" + LIGHTING_SOURCE + """
+void main() {
+    gl_Position = ftransform();
+    setLitColors(useVertexColor ? gl_Color : surfaceColor, true);
+}
+"""
+
+WIREFRAME_GEOMETRY_SHADER = """
+#version 150 compatibility
+layout(triangles) in;
+layout(triangle_strip, max_vertices = 3) out;
+uniform usamplerBuffer edgeMasks;
+noperspective out vec3 barycentric;
+flat out uint edgeMask;
+void main() {
+    uint mask = texelFetch(edgeMasks, gl_PrimitiveIDIn).r;
+    for (int corner = 0; corner < 3; corner++) {
+        gl_Position = gl_in[corner].gl_Position;
+        gl_FrontColor = gl_in[corner].gl_FrontColor;
+        gl_BackColor = gl_in[corner].gl_BackColor;
+        barycentric = vec3(corner == 0, corner == 1, corner == 2);
+        edgeMask = mask;
+        EmitVertex();
+    }
+    EndPrimitive();
+}
+"""
+
+WIREFRAME_FRAGMENT_SHADER = """
+#version 150 compatibility
+uniform vec4 edgeColor;
+uniform float lineWidth;
+noperspective in vec3 barycentric;
+flat in uint edgeMask;
+void main() {
+    vec3 pixels = barycentric / fwidth(barycentric); // distance to the side opposite each corner, in pixels
+    float distance = 1e6;
+    if ((edgeMask & 1u) != 0u) distance = min(distance, pixels.z); // corner 0 -> 1, opposite corner 2
+    if ((edgeMask & 2u) != 0u) distance = min(distance, pixels.x); // corner 1 -> 2
+    if ((edgeMask & 4u) != 0u) distance = min(distance, pixels.y); // corner 2 -> 0
+    float coverage = 1.0 - smoothstep(0.5 * lineWidth - 0.5, 0.5 * lineWidth + 0.5, distance); // antialiased
+    gl_FragColor = vec4(mix(gl_Color.rgb, edgeColor.rgb, coverage * edgeColor.a), gl_Color.a);
+}
+"""
+
+"""
+Instanced drawing -> one draw call for every object of a scene that shares a mesh.
+The model matrix (4 attribute slots) and color of each instance come from a per-instance buffer.
+"""
+INSTANCED_VERTEX_SHADER = """
+#version 120
+attribute vec3 position;
+attribute mat4 instanceModel;
+attribute vec4 instanceColor;
+uniform bool useInstanceColor;
+uniform vec4 flatColor;
+varying vec4 color;
+void main() {
+    gl_Position = gl_ModelViewProjectionMatrix * (instanceModel * vec4(position, 1.0));
+    color = useInstanceColor ? instanceColor : flatColor;
+}
+"""
+
+INSTANCED_FRAGMENT_SHADER = """
+#version 120
+varying vec4 color;
+void main() {
+    gl_FragColor = color;
+}
+"""
+
+INSTANCED_ATTRIBUTES = {"position": 0, "instanceModel": 1, "instanceColor": 5} # the mat4 takes locations 1-4
+
+"""
+Weighted blended order-independent transparency (McGuire & Bavoil 2013) -> see oit.py.
+The accumulate pass draws transparent faces from the fixed-function arrays (gl_Vertex, gl_Color, gl_Normal) into two
+float targets, the composite pass turns them into one color per pixel over what is already on screen.
+"""
+OIT_ACCUMULATE_VERTEX_SHADER = """
+#version 120
+""" + LIGHTING_SOURCE + """
+void main() {
+    gl_Position = ftransform();
+    setLitColors(gl_Color, true);
+}
+"""
+
+OIT_ACCUMULATE_FRAGMENT_SHADER = """
+#version 120
+void main() {
+    vec4 color = gl_Color;
+    // nearer and more opaque surfaces weigh more, the weight function of the paper's equation 9
+    float weight = clamp(pow(min(1.0, color.a * 10.0) + 0.01, 3.0) * 1e8 * pow(1.0 - gl_FragCoord.z * 0.9, 3.0), 1e-2, 3e3);
+    gl_FragData[0] = vec4(color.rgb * color.a * weight, color.a); // rgb summed, alpha multiplied into the revealage
+    gl_FragData[1] = vec4(color.a * weight); // the sum of the weights
+}
+"""
+
+OIT_COMPOSITE_VERTEX_SHADER = """
+#version 120
+void main() {
+    gl_Position = gl_Vertex; // a quad already in clip space
+}
+"""
+
+OIT_COMPOSITE_FRAGMENT_SHADER = """
+#version 120
+uniform sampler2D accumulation;
+uniform sampler2D weights;
+uniform vec2 size;
+void main() {
+    vec2 uv = gl_FragCoord.xy / size;
+    vec4 accumulated = texture2D(accumulation, uv);
+    float revealage = accumulated.a; // how much of the background still shows through
+    if (revealage >= 1.0)
+        discard; // no transparent surface here
+    vec3 average = accumulated.rgb / max(texture2D(weights, uv).r, 1e-5);
+    gl_FragColor = vec4(average, 1.0 - revealage); // blended over the frame with GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA
+}
+"""
+
+class ShaderError(RuntimeError):
+    """Raised when a shader fails to compile or link, the message holds the driver's info log"""
+
+def compileShader(source, shaderType):
+    """Compiles one shader stage and returns its id"""
+    shader = glCreateShader(shaderType)
+    glShaderSource(shader, source)
+    glCompileShader(shader)
+    if not glGetShaderiv(shader, GL_COMPILE_STATUS):
+        log = glGetShaderInfoLog(shader)
+        glDeleteShader(shader)
+        raise ShaderError("shader compile failed: %s" % (log.decode() if isinstance(log, bytes) else log))
+    return shader
+
+def linkProgram(vertexSource, fragmentSource, attributes=None, geometrySource=None):
+    """Compiles and links a program, attributes maps attribute names to the locations they must be bound to"""
+    stages = [compileShader(vertexSource, GL_VERTEX_SHADER), compileShader(fragmentSource, GL_FRAGMENT_SHADER)]
+    if geometrySource is not None:
+        stages.append(compileShader(geometrySource, GL_GEOMETRY_SHADER))
+
+    program = glCreateProgram()
+    for shader in stages:
+        glAttachShader(program, shader)
+    for name, location in (attributes or {}).items():
+        glBindAttribLocation(program, location, name) # must happen before linking
+    glLinkProgram(program)
+    for shader in stages:
+        glDetachShader(program, shader)
+        glDeleteShader(shader) # the linked program keeps what it needs
+
+    if not glGetProgramiv(program, GL_LINK_STATUS):
+        log = glGetProgramInfoLog(program)
+        glDeleteProgram(program)
+        raise ShaderError("program link failed: %s" % (log.decode() if isinstance(log, bytes) else log))
+    return program
+
+class ShaderProgram:
+    """A linked program plus a cache of its uniform locations"""
+    def __init__(self, program):
+        self.program = program
+        self.uniforms = {} # name -> location
+
+    def uniform(self, name):
+        """Location of a uniform, looked up once"""
+        location = self.uniforms.get(name)
+        if location is None:
+            location = self.uniforms[name] = glGetUniformLocation(self.program, name)
+        return location
+
+    def use(self):
+        glUseProgram(self.program)
+
+def setLightUniforms(program, lit):
+    """Sets the LIGHTING_SOURCE uniforms of a bound program"""
+    glUniform1i(program.uniform("lit"), int(lit))
+    glUniform3f(program.uniform("lightDirection"), *LIGHT_DIRECTION)
+    glUniform1f(program.uniform("ambient"), LIGHT_AMBIENT)
+    glUniform1f(program.uniform("diffuse"), LIGHT_DIFFUSE)
+
+class ShaderCache:
+    """
+    Compiled programs by name, built the first time they are asked for.
+    A program that failed to build is remembered as None so we do not retry (and log) every frame.
+    """
+    def __init__(self):
+        self.programs = {}
+        self.errors = {} # name -> the ShaderError message
+
+    def get(self, name, vertexSource, fragmentSource, attributes=None, geometrySource=None):
+        """Returns the ShaderProgram for name, or None if it cannot be built on this driver"""
+        if name not in self.programs:
+            try:
+                self.programs[name] = ShaderProgram(linkProgram(vertexSource, fragmentSource, attributes, geometrySource))
+            except (ShaderError, GLError, NullFunctionError) as error:
+                self.programs[name] = None
+                self.errors[name] = str(error)
+        return self.programs[name]
+
+    def clear(self):
+        """Deletes every program (needs a current context)"""
+        for program in self.programs.values():
+            if program is not None:
+                glDeleteProgram(program.program)
+        self.programs.clear()
+        self.errors.clear()
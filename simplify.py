@@ -0,0 +1,302 @@
+"""
+Mesh simplification for levels of detail:
+  Decimator  -> quadric error metric edge collapses (Garland & Heckbert 1997). Instead of popping one collapse at a time
+                off a heap, every pass ranks all edges by cost (one argsort) and collapses the cheapest ones whose
+                neighbourhoods do not touch all at once, so the work stays in array ops
+  lodChain   -> reduced copies of a mesh at LOD_RATIOS of its triangles, built in one decimation
+  LodChain   -> a mesh plus its reduced copies, picks the level from the size of the mesh on screen
+Only needs NumPy, so lodChain can run in a worker process (see GLWidget.buildLods).
+"""
+import math
+
+import numpy as np
+
+from geometry import vertexTriangles
+from mesh import Mesh, uniqueEdges
+
+LOD_RATIOS = (0.5, 0.25, 0.1) # triangle fraction of each reduced level, the full mesh is level 0
+LOD_MIN_TRIANGLES = 4096 # smaller meshes draw fast enough as they are, no chain is built for them
+LOD_PIXELS_PER_TRIANGLE = 4.0 # screen area a front facing triangle may cover before a finer level is needed
+
+BOUNDARY_WEIGHT = 100.0 # how strongly open borders are kept in place, relative to the surface quadrics
+FLIP_COSINE = 0.2 # a collapse may turn a neighbouring triangle by at most ~78 degrees
+CANDIDATE_FRACTION = 0.25 # cheapest share of the edges a pass may pick from, lower keeps closer to the one at a time order
+SELECTION_ROUNDS = 12 # independent set rounds per pass at most, see Decimator.collapsePass
+
+QUADRIC_ROWS, QUADRIC_COLUMNS = np.triu_indices(4) # a symmetric 4x4 quadric is packed into its 10 upper entries
+
+def planeQuadrics(planes, weights):
+    """Packed quadrics (P, 10) of planes (P, 4) (unit normal, offset) -> weights * p p^T, the squared distance to each plane"""
+    return planes[:, QUADRIC_ROWS] * planes[:, QUADRIC_COLUMNS] * weights[:, None]
+
+def vertexSums(indices, values, vertexCount):
+    """Sums rows of values (K, C) into the vertices given by indices (K), one bincount per column (much faster than np.add.at)"""
+    return np.stack([np.bincount(indices, weights=column, minlength=vertexCount) for column in values.T], axis=-1)
+
+def quadricCosts(q, x, y, z):
+    """v^T Q v of packed quadrics q (10, K) at the points (x, y, z), one component per row"""
+    return (q[0] * x * x + q[4] * y * y + q[7] * z * z + q[9] +
+            2 * (q[1] * x * y + q[2] * x * z + q[5] * y * z + q[3] * x + q[6] * y + q[8] * z))
+
+def optimalPoints(quadrics, a, b):
+    """
+    (points, costs) where collapsing each edge a -> b (points (K, 3)) should put the merged vertex: the minimum of the
+    summed quadric, or the best of the ends and the midpoint where that minimum is ill-defined (flat or straight areas).
+    """
+    q = np.ascontiguousarray(quadrics.T) # one component per row, ~4x faster arithmetic than the strided columns
+    # solve A x = -b of the symmetric 3x3 part by its cofactors
+    c00, c01, c02 = q[4] * q[7] - q[5] * q[5], q[2] * q[5] - q[1] * q[7], q[1] * q[5] - q[2] * q[4]
+    c11, c12, c22 = q[0] * q[7] - q[2] * q[2], q[1] * q[2] - q[0] * q[5], q[0] * q[4] - q[1] * q[1]
+    det = q[0] * c00 + q[1] * c01 + q[2] * c02
+    scale = np.maximum(np.maximum(q[0], q[4]), q[7]) # the diagonal bounds the rest, the quadrics are positive semi-definite
+    solvable = np.abs(det) > 1e-9 * scale ** 3 # relative, quadrics scale with the mesh size
+    det[~solvable] = 1.0
+    r0, r1, r2 = -q[3] / det, -q[6] / det, -q[8] / det
+    optimum = np.stack((c00 * r0 + c01 * r1 + c02 * r2, c01 * r0 + c11 * r1 + c12 * r2, c02 * r0 + c12 * r1 + c22 * r2))
+
+    a, b = a.T, b.T
+    choices = np.stack((optimum, a, b, (a + b) / 2)) # (4, 3, K)
+    costs = np.stack([quadricCosts(q, *choice) for choice in choices])
+    # a far away minimum is numerical noise of nearly parallel planes, not a real corner
+    far = ((optimum - choices[3]) ** 2).sum(axis=0) > 4 * ((a - b) ** 2).sum(axis=0)
+    costs[0, ~solvable | far] = np.inf
+    best = np.argmin(costs, axis=0)
+    columns = np.arange(len(best))
+    return choices[best, :, columns], np.maximum(costs[best, columns], 0.0)
+
+def independentEdges(edges, candidates, around, vertexCount):
+    """
+    Mask of the candidates (edge indices in priority order) that come first among all candidates touching the
+    neighbourhood of either of their ends -> no two of them have adjacent ends. around -> the edges at a candidate's end
+    """
+    none = len(candidates)
+    ranks = np.arange(len(candidates))
+    vertexBest = np.full(vertexCount, none, dtype=np.int64)
+    np.minimum.at(vertexBest, edges[candidates].ravel(), np.repeat(ranks, 2))
+    edgeBest = np.minimum(vertexBest[edges[around, 0]], vertexBest[edges[around, 1]]) # candidate or not
+    near = edgeBest < none # only edges next to a candidate can hold one back
+    nearBest = np.full(vertexCount, none, dtype=np.int64)
+    np.minimum.at(nearBest, edges[around[near]].ravel(), np.repeat(edgeBest[near], 2))
+    return (nearBest[edges[candidates, 0]] == ranks) & (nearBest[edges[candidates, 1]] == ranks)
+
+def csrGather(offsets, values, keys):
+    """(owner, items) -> every item of the CSR lists of keys, owner is the position in keys each item came from"""
+    starts, counts = offsets[keys], offsets[keys + 1] - offsets[keys]
+    owner = np.repeat(np.arange(len(keys)), counts)
+    return owner, values[np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)]
+
+class Decimator:
+    """
+    Simplifies one mesh step by step, collapseTo() can be called with ever smaller targets to build a chain.
+    Vertex indices stay those of the source mesh while collapsing (a collapse a <- b moves a and drops b) and the
+    quadrics of merged vertices add up, so every level is measured against the full resolution surface.
+    Takes the arrays of a Mesh (vertices, triangles, edges, colors or None), not the Mesh itself.
+    """
+    def __init__(self, vertices, triangles, edges, colors=None, name=""):
+        self.name = name
+        self.vertices = np.array(vertices, dtype=np.float64) # copies -> the collapses never touch the caller's arrays
+        self.colors = None if colors is None else np.array(colors, dtype=np.float32)
+        self.triangles = np.array(triangles, dtype=np.int64)
+        self.edges = np.array(edges, dtype=np.int64) # the drawn edges, renumbered with every collapse, so outlines stay outlines
+        self.quadrics = self.initialQuadrics()
+        self.rejected = np.zeros(0, dtype=np.int64) # keys of edges that failed a check, retried once an end moves
+        self.moved = np.ones(len(self.vertices), dtype=bool) # vertices changed by the last pass, their edges need new costs
+        self.costCache = (np.zeros(0, dtype=np.int64), np.zeros((0, 3)), np.zeros(0)) # (edge keys, points, costs) of the last pass
+        self.passes = 0
+
+    def initialQuadrics(self):
+        """(N, 10) sum of the area weighted planes of the triangles around each vertex, plus border planes on open edges"""
+        n = len(self.vertices)
+        corners = self.vertices[self.triangles]
+        normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        doubleAreas = np.linalg.norm(normals, axis=1)
+        normals /= np.maximum(doubleAreas, 1e-300)[:, None]
+        planes = np.concatenate((normals, -(normals * corners[:, 0]).sum(axis=1, keepdims=True)), axis=1)
+        quadrics = vertexSums(self.triangles.ravel(), np.repeat(planeQuadrics(planes, doubleAreas / 2), 3, axis=0), n)
+
+        # open borders -> a plane through each border side, standing upright on its triangle, keeps the outline from shrinking
+        sides = self.triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+        keys = np.minimum(sides[:, 0], sides[:, 1]) * n + np.maximum(sides[:, 0], sides[:, 1])
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        border = np.flatnonzero(counts[inverse] == 1)
+        if len(border):
+            start = self.vertices[sides[border, 0]]
+            direction = self.vertices[sides[border, 1]] - start
+            upright = np.cross(direction, normals[border // 3])
+            upright /= np.maximum(np.linalg.norm(upright, axis=1), 1e-300)[:, None]
+            planes = np.concatenate((upright, -(upright * start).sum(axis=1, keepdims=True)), axis=1)
+            borderQuadrics = planeQuadrics(planes, BOUNDARY_WEIGHT * (direction ** 2).sum(axis=1))
+            quadrics += vertexSums(sides[border].ravel(), np.repeat(borderQuadrics, 2, axis=0), n)
+        return quadrics
+
+    def collapseTo(self, targetTriangles):
+        """Collapses edges until at most targetTriangles are left, or no collapse passes the checks any more"""
+        while len(self.triangles) > targetTriangles and self.collapsePass(len(self.triangles) - targetTriangles):
+            pass
+
+    def collapsePass(self, excess):
+        """One batch of collapses removing about excess triangles at most, returns False once nothing can change any more"""
+        self.passes += 1
+        n = len(self.vertices)
+        sides = self.triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+        keys = np.minimum(sides[:, 0], sides[:, 1]) * n + np.maximum(sides[:, 0], sides[:, 1])
+        keys, sideCounts = np.unique(keys, return_counts=True) # sideCounts -> triangles on each edge, 1 on a border
+        edges = np.stack((keys // n, keys % n), axis=-1)
+
+        # collapse costs -> only edges at a vertex the last pass moved are new, the rest keep their cost from then
+        cachedKeys, cachedPoints, cachedCosts = self.costCache
+        found = np.minimum(np.searchsorted(cachedKeys, keys), max(len(cachedKeys) - 1, 0))
+        stale = self.moved[edges[:, 0]] | self.moved[edges[:, 1]]
+        if len(cachedKeys):
+            stale |= cachedKeys[found] != keys
+        points = np.empty((len(keys), 3))
+        costs = np.empty(len(keys))
+        fresh = ~stale
+        points[fresh], costs[fresh] = cachedPoints[found[fresh]], cachedCosts[found[fresh]]
+        update = edges[stale]
+        points[stale], costs[stale] = optimalPoints(self.quadrics[update[:, 0]] + self.quadrics[update[:, 1]],
+                                                    self.vertices[update[:, 0]], self.vertices[update[:, 1]])
+        self.costCache = (keys, points, costs.copy())
+        self.moved[:] = False
+
+        # never collapse a non-manifold edge, or an inner edge joining two border vertices (it would pinch the surface)
+        onBorder = np.zeros(n, dtype=bool)
+        onBorder[edges[sideCounts == 1].ravel()] = True
+        blocked = (sideCounts > 2) | ((sideCounts == 2) & onBorder[edges[:, 0]] & onBorder[edges[:, 1]])
+        blocked |= np.isin(keys, self.rejected)
+        costs[blocked] = np.inf
+
+        # the priority queue -> the cheapest edges in cost order, their rank decides conflicts
+        limit = max(1, min(excess, int(len(keys) * CANDIDATE_FRACTION)))
+        candidates = np.argpartition(costs, limit - 1)[:limit] if limit < len(keys) else np.arange(len(keys))
+        candidates = candidates[np.argsort(costs[candidates], kind="stable")]
+        candidates = candidates[np.isfinite(costs[candidates])]
+        if not len(candidates):
+            return False
+
+        # independent set -> an edge is taken when it has the lowest rank of every edge touching the neighbourhoods of
+        # its two ends, so no two collapses share a triangle and each one's checks below stay exact. Repeated a few
+        # rounds on the edges that are still clear of the taken ones, one round alone leaves most of the mesh idle
+        ends = np.zeros(n, dtype=bool)
+        ends[edges[candidates].ravel()] = True
+        around = np.flatnonzero(ends[edges[:, 0]] | ends[edges[:, 1]])
+        chosen = []
+        near = np.zeros(n, dtype=bool) # ends of taken edges and their neighbours
+        for _ in range(SELECTION_ROUNDS):
+            candidates = candidates[~(near[edges[candidates, 0]] | near[edges[candidates, 1]])]
+            if not len(candidates):
+                break
+            taken = candidates[independentEdges(edges, candidates, around, n)]
+            chosen.append(taken)
+            ends = np.zeros(n, dtype=bool)
+            ends[edges[taken].ravel()] = True
+            near |= ends
+            local = edges[around] # every edge of a taken end is in there
+            near[local[ends[local[:, 0]], 1]] = True
+            near[local[ends[local[:, 1]], 0]] = True
+        chosen = np.concatenate(chosen)
+        chosen = chosen[np.argsort(costs[chosen], kind="stable")] # back in rank order
+
+        valid = self.keepsManifold(edges, sideCounts, chosen) & self.keepsOrientation(edges[chosen], points[chosen])
+        self.rejected = np.union1d(self.rejected, keys[chosen[~valid]])
+        chosen = chosen[valid] # still in rank order -> stop once enough triangles are gone
+        chosen = chosen[:np.searchsorted(np.cumsum(sideCounts[chosen]), excess) + 1]
+        if not len(chosen):
+            return True # only rejections this pass, the next one picks from what is left
+
+        keep, drop = edges[chosen, 0], edges[chosen, 1]
+        self.vertices[keep] = points[chosen]
+        self.quadrics[keep] += self.quadrics[drop]
+        if self.colors is not None:
+            self.colors[keep] = (self.colors[keep] + self.colors[drop]) / 2
+        remap = np.arange(n)
+        remap[drop] = keep
+        triangles = remap[self.triangles]
+        self.triangles = triangles[(triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) & (triangles[:, 2] != triangles[:, 0])]
+        edges = remap[self.edges]
+        self.edges = edges[edges[:, 0] != edges[:, 1]]
+        self.moved[keep] = True
+        self.rejected = self.rejected[~(self.moved[self.rejected // n] | self.moved[self.rejected % n])] # their checks changed
+        return True
+
+    def keepsManifold(self, edges, sideCounts, chosen):
+        """
+        Link condition per chosen edge -> its ends share exactly the neighbours opposite the edge (2 inside, 1 on a border),
+        any other shared neighbour would fold two sheets together or close a tunnel.
+        """
+        n = len(self.vertices)
+        ends = np.concatenate((edges, edges[:, ::-1]))
+        ends = ends[np.argsort(ends[:, 0], kind="stable")]
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ends[:, 0], minlength=n), out=offsets[1:])
+        ownerA, aroundA = csrGather(offsets, ends[:, 1], edges[chosen, 0])
+        ownerB, aroundB = csrGather(offsets, ends[:, 1], edges[chosen, 1])
+        keys = np.sort(np.concatenate((ownerA * n + aroundA, ownerB * n + aroundB)))
+        shared = keys[1:][keys[1:] == keys[:-1]] // n # each list has no repeats, so a repeat is a neighbour of both ends
+        return np.bincount(shared, minlength=len(chosen)) == sideCounts[chosen]
+
+    def keepsOrientation(self, edges, points):
+        """False for collapses that would flip (or squash flat) a triangle around them once both ends move to points"""
+        offsets, faces = vertexTriangles(self.triangles, len(self.vertices))
+        ownerA, facesA = csrGather(offsets, faces, edges[:, 0])
+        ownerB, facesB = csrGather(offsets, faces, edges[:, 1])
+        owner, faces = np.concatenate((ownerA, ownerB)), np.concatenate((facesA, facesB))
+        corners = self.triangles[faces]
+        moving = (corners == edges[owner, :1]) | (corners == edges[owner, 1:])
+        stays = moving.sum(axis=1) == 1 # triangles on the edge itself disappear
+        owner, corners, moving = owner[stays], corners[stays], moving[stays]
+        before = self.vertices[corners]
+        after = np.where(moving[:, :, None], points[owner, None, :], before)
+        normalsBefore = np.cross(before[:, 1] - before[:, 0], before[:, 2] - before[:, 0])
+        normalsAfter = np.cross(after[:, 1] - after[:, 0], after[:, 2] - after[:, 0])
+        lengthBefore = np.linalg.norm(normalsBefore, axis=1)
+        dots = (normalsBefore * normalsAfter).sum(axis=1)
+        flips = (lengthBefore > 0) & (dots <= FLIP_COSINE * lengthBefore * np.linalg.norm(normalsAfter, axis=1))
+        return np.bincount(owner[flips], minlength=len(edges)) == 0
+
+    def mesh(self):
+        """The current state as a compact, vertex cache optimized Mesh"""
+        used = np.unique(self.triangles)
+        remap = np.full(len(self.vertices), -1, dtype=np.int64)
+        remap[used] = np.arange(len(used))
+        edges = remap[self.edges]
+        edges = uniqueEdges(edges[(edges >= 0).all(axis=1)]) # collapses leave duplicates behind
+        mesh = Mesh(self.vertices[used], edges, remap[self.triangles], colors=None if self.colors is None else self.colors[used],
+                    name=self.name)
+        return mesh.optimized(report=False)
+
+def lodChain(vertices, triangles, edges, colors=None, name="", ratios=LOD_RATIOS):
+    """
+    The reduced levels of a mesh given by its arrays, one Mesh per ratio (triangle fraction, decreasing).
+    Runs in a worker process (see GLWidget.buildLods) -> arrays, not the Mesh, so only they are pickled across.
+    """
+    decimator = Decimator(vertices, triangles, edges, colors, name)
+    triangleCount = len(decimator.triangles)
+    levels = []
+    for ratio in ratios:
+        decimator.collapseTo(int(triangleCount * ratio))
+        levels.append(decimator.mesh())
+    return levels
+
+class LodChain:
+    """
+    A mesh and its reduced levels (levels[0] is the mesh itself), like ProceduralShape picks a resolution this picks
+    the coarsest level that still has about one triangle per LOD_PIXELS_PER_TRIANGLE pixels of the shape on screen.
+    """
+    def __init__(self, mesh, reduced):
+        self.levels = [mesh] + list(reduced)
+
+    def __len__(self):
+        return len(self.levels)
+
+    def levelFor(self, pixelRadius, pixelsPerTriangle=LOD_PIXELS_PER_TRIANGLE):
+        """The level index to draw a shape covering a disc of pixelRadius with"""
+        needed = 2 * math.pi * pixelRadius ** 2 / pixelsPerTriangle # about half the triangles face the camera
+        level = 0
+        while level + 1 < len(self.levels) and self.levels[level + 1].triangleCount >= needed:
+            level += 1
+        return level
+
+    def mesh(self, level):
+        """The mesh at level (clamped to the levels there are)"""
+        return self.levels[max(0, min(len(self.levels) - 1, level))]
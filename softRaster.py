@@ -0,0 +1,236 @@
+"""
+Software rasterizer in NumPy -> draws a Mesh the way GLWidget does (same camera, colors and model matrix) into an
+RGBA array, for machines without a usable OpenGL and as a reference renderer for pixel comparisons.
+The framebuffer is cut into square tiles. Triangles are set up once for the whole mesh (edge functions, bounds) and
+binned to the tiles they overlap, then every tile is rasterized on its own (the pixels of all its triangles' bounds
+are tested in a few array operations), so tiles run in parallel on a thread pool while NumPy releases the GIL.
+Output is deterministic: the same inputs give the same pixels whatever the tile size or the number of workers.
+Simplifications against GL: triangles with a corner behind the eye are dropped instead of clipped (our shapes
+never get near the camera), and edges win depth ties with the faces they border instead of z-fighting.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from transforms import frustumMatrix, translationMatrix
+
+TILE_SIZE = 64 # pixels per tile side
+FRAGMENT_CHUNK = 1 << 18 # candidate pixels a tile tests at once -> a few (chunk, 3) float64 temporaries, ~30 MB per worker
+SUBPIXEL = 256 # screen positions are snapped to 1/SUBPIXEL of a pixel, so shared edges are exact (no cracks, no double hits)
+EDGE_DEPTH_BIAS = 1e-5 # window depth pulled towards the camera for lines, so an edge shows on top of its own faces
+
+def toRGBA8(color):
+    """(..., 4) float colors -> uint8 the way GL stores them in an RGBA8 framebuffer (clamp, scale, round)"""
+    return np.rint(np.clip(color, 0.0, 1.0) * 255).astype(np.uint8)
+
+def diffPixels(a, b, tolerance=0):
+    """Number of pixels of two RGBA frames with any channel further apart than tolerance"""
+    return int((np.abs(a.astype(np.int16) - b.astype(np.int16)) > tolerance).any(axis=-1).sum())
+
+class SoftwareRasterizer:
+    """
+    Renders meshes into width x height RGBA frames.
+    The camera defaults to GLWidget's (glFrustum + a translation, square viewport centered like resizeGL).
+    """
+    def __init__(self, width, height, tileSize=TILE_SIZE, workers=None, halfSize=1.2, near=6.0, far=70.0, cameraDistance=30.0):
+        self.tileSize = tileSize
+        self.clipMatrix = frustumMatrix(-halfSize, halfSize, -halfSize, halfSize, near, far) @ translationMatrix(0.0, 0.0, -cameraDistance)
+        workers = os.cpu_count() if workers is None else workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="raster") if workers > 1 else None
+        self.resize(width, height)
+
+    def resize(self, width, height):
+        """New framebuffer size, the viewport is the centered square like GLWidget.resizeGL"""
+        self.width, self.height = width, height
+        side = min(width, height)
+        self.viewport = (int((width - side) / 2), int((height - side) / 2), side, side)
+        self.tilesX = -(-width // self.tileSize)
+        self.tilesY = -(-height // self.tileSize)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    """
+    Geometry
+    """
+    def project(self, vertices, model):
+        """Vertices -> (window x, y, depth) snapped to the subpixel grid, and clip w (for perspective correct colors)"""
+        transform = self.clipMatrix @ model
+        clip = vertices.astype(np.float64) @ transform[:3, :3].T + transform[:3, 3]
+        w = vertices.astype(np.float64) @ transform[3, :3] + transform[3, 3]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ndc = clip / w[:, None]
+        x0, y0, width, height = self.viewport
+        screen = np.empty_like(ndc)
+        screen[:, 0] = x0 + (ndc[:, 0] + 1) * width / 2
+        screen[:, 1] = y0 + (ndc[:, 1] + 1) * height / 2
+        screen[:, 2] = (ndc[:, 2] + 1) / 2 # glDepthRange(0, 1)
+        screen[:, :2] = np.rint(screen[:, :2] * SUBPIXEL) / SUBPIXEL
+        return screen, w
+
+    def setupTriangles(self, screen, w, triangles):
+        """
+        Edge functions of every drawable triangle, oriented so the inside is positive whatever the winding
+        (GLWidget does not cull back faces). Returns a dict of per-triangle arrays, in drawing order.
+        """
+        keep = (w[triangles] > 0).all(axis=1) # in front of the eye
+        corners = screen[triangles] # (T, 3, 3)
+        x, y = corners[..., 0], corners[..., 1]
+        area = (x[:, 1] - x[:, 0]) * (y[:, 2] - y[:, 0]) - (x[:, 2] - x[:, 0]) * (y[:, 1] - y[:, 0])
+
+        # pixels whose center (i + 0.5) lies inside the bounds, clamped to the framebuffer
+        with np.errstate(invalid="ignore"):
+            left = np.clip(np.ceil(x.min(axis=1) - 0.5), 0, self.width)
+            right = np.clip(np.floor(x.max(axis=1) - 0.5), -1, self.width - 1)
+            bottom = np.clip(np.ceil(y.min(axis=1) - 0.5), 0, self.height)
+            top = np.clip(np.floor(y.max(axis=1) - 0.5), -1, self.height - 1)
+            keep &= (area != 0) & (left <= right) & (bottom <= top)
+        kept = np.flatnonzero(keep)
+
+        x, y, area = x[kept], y[kept], area[kept]
+        following, opposite = (1, 2, 0), (2, 0, 1)
+        sign = np.sign(area)[:, None]
+        # edge i runs between the two other corners, E_i(x, y) = a x + b y + c equals area at corner i and 0 on the edge
+        a = (y[:, following] - y[:, opposite]) * sign
+        b = (x[:, opposite] - x[:, following]) * sign
+        c = (x[:, following] * y[:, opposite] - x[:, opposite] * y[:, following]) * sign
+        return {"triangles": triangles[kept], "faces": kept, "a": a, "b": b, "c": c,
+                "topLeft": (a > 0) | ((a == 0) & (b > 0)), # a pixel exactly on an edge belongs to one of its two triangles only
+                "area": np.abs(area), "depth": screen[triangles[kept], 2], "inverseW": 1.0 / w[triangles[kept]],
+                "bounds": np.stack((left[kept], right[kept], bottom[kept], top[kept]), axis=1).astype(np.int64)}
+
+    def binTriangles(self, bounds):
+        """(tile id, triangle positions in drawing order) for every tile that any triangle overlaps"""
+        tiles = bounds // self.tileSize # (T, 4) first/last tile column and row
+        columns = tiles[:, 1] - tiles[:, 0] + 1
+        counts = columns * (tiles[:, 3] - tiles[:, 2] + 1)
+        owner = np.repeat(np.arange(len(bounds)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        tileIds = (tiles[owner, 2] + local // columns[owner]) * self.tilesX + tiles[owner, 0] + local % columns[owner]
+        order = np.argsort(tileIds, kind="stable") # stable -> each tile keeps the drawing order
+        tileIds, owner = tileIds[order], owner[order]
+        starts = np.flatnonzero(np.r_[True, tileIds[1:] != tileIds[:-1]])
+        return [(int(tileIds[start]), owner[start:end]) for start, end in zip(starts, np.r_[starts[1:], len(tileIds)])]
+
+    """
+    Rasterization
+    """
+    def rasterTile(self, tileId, chosen, setup, colorBuffer, depthBuffer, surfaceColor, vertexColors):
+        """
+        Draws the triangles chosen (positions into setup, in drawing order) that overlap one tile, writes only that tile.
+        Each triangle tests just the pixels of its bounds inside the tile, a few at a time so memory stays bounded.
+        """
+        x0, y0 = (tileId % self.tilesX) * self.tileSize, (tileId // self.tilesX) * self.tileSize
+        x1, y1 = min(x0 + self.tileSize, self.width), min(y0 + self.tileSize, self.height)
+        tileWidth = x1 - x0
+        tileDepth = depthBuffer[y0:y1, x0:x1].ravel().copy()
+        tileColor = colorBuffer[y0:y1, x0:x1].reshape(-1, 4).copy()
+
+        bounds = setup["bounds"][chosen]
+        left, bottom = np.maximum(bounds[:, 0], x0), np.maximum(bounds[:, 2], y0)
+        widths = np.minimum(bounds[:, 1], x1 - 1) - left + 1
+        counts = widths * (np.minimum(bounds[:, 3], y1 - 1) - bottom + 1)
+        ends = np.cumsum(counts)
+        splits = np.searchsorted(ends, np.arange(FRAGMENT_CHUNK, ends[-1], FRAGMENT_CHUNK), side="right")
+
+        for first, last in zip(np.r_[0, splits], np.r_[splits, len(chosen)]):
+            if first == last:
+                continue
+            # one candidate fragment per pixel of each triangle's bounds
+            n = counts[first:last]
+            owner = np.repeat(np.arange(first, last), n)
+            local = np.arange(len(owner)) - np.repeat(np.cumsum(n) - n, n)
+            x = left[owner] + local % widths[owner]
+            y = bottom[owner] + local // widths[owner]
+            t = chosen[owner]
+
+            edges = setup["a"][t] * (x + 0.5)[:, None] + setup["b"][t] * (y + 0.5)[:, None] + setup["c"][t] # (F, 3)
+            inside = ((edges > 0) | ((edges == 0) & setup["topLeft"][t])).all(axis=1)
+            weights = edges / setup["area"][t, None] # barycentric, depth is linear in screen space
+            depth = (weights * setup["depth"][t]).sum(axis=1)
+            keep = np.flatnonzero(inside & (depth >= 0) & (depth <= 1)) # covered and between near and far
+            if not len(keep):
+                continue
+            pixels = (y[keep] - y0) * tileWidth + (x[keep] - x0)
+            depth, order = depth[keep], owner[keep]
+
+            # per pixel the nearest fragment, the earlier triangle among equal depths -> same as drawing in order with GL_LESS
+            nearest = np.lexsort((order, depth, pixels))
+            nearest = nearest[np.r_[True, pixels[nearest][1:] != pixels[nearest][:-1]]]
+            won = nearest[depth[nearest] < tileDepth[pixels[nearest]]]
+            if not len(won):
+                continue
+            tileDepth[pixels[won]] = depth[won]
+            if vertexColors is None:
+                tileColor[pixels[won]] = surfaceColor if surfaceColor.ndim == 1 else surfaceColor[t[keep[won]]] # one color or one per face
+            else:
+                winner = t[keep[won]]
+                corners = weights[keep[won]] * setup["inverseW"][winner] # perspective correct like GL
+                corners /= corners.sum(axis=1, keepdims=True)
+                tileColor[pixels[won]] = (corners[:, :, None] * vertexColors[setup["triangles"][winner]]).sum(axis=1)
+
+        depthBuffer[y0:y1, x0:x1] = tileDepth.reshape(y1 - y0, tileWidth)
+        colorBuffer[y0:y1, x0:x1] = tileColor.reshape(y1 - y0, tileWidth, 4)
+
+    def drawTriangles(self, colorBuffer, depthBuffer, screen, w, triangles, surfaceColor, vertexColors=None):
+        setup = self.setupTriangles(screen, w, np.asarray(triangles, dtype=np.int64))
+        if not len(setup["triangles"]):
+            return
+        if vertexColors is not None:
+            vertexColors = np.asarray(vertexColors, dtype=np.float64)
+        surfaceColor = np.asarray(surfaceColor, dtype=np.float64)
+        if surfaceColor.ndim == 2:
+            surfaceColor = surfaceColor[setup["faces"]] # per-face colors, in the order of the drawable triangles
+        jobs = [(tileId, chosen, setup, colorBuffer, depthBuffer, surfaceColor, vertexColors)
+                for tileId, chosen in self.binTriangles(setup["bounds"])]
+        if self.executor is None:
+            for job in jobs:
+                self.rasterTile(*job)
+        else:
+            for done in [self.executor.submit(self.rasterTile, *job) for job in jobs]:
+                done.result() # tiles never share pixels, so they can all write the buffers at once
+
+    def drawLines(self, colorBuffer, depthBuffer, screen, w, edges, edgeColor):
+        """One pixel wide lines (DDA, one sample per pixel along the longer axis), depth tested against the faces"""
+        edges = np.asarray(edges, dtype=np.int64)
+        edges = edges[(w[edges] > 0).all(axis=1)]
+        if not len(edges):
+            return
+        start, end = screen[edges[:, 0]], screen[edges[:, 1]]
+        delta = end - start
+        steps = np.ceil(np.abs(delta[:, :2]).max(axis=1)).astype(np.int64)
+        owner = np.repeat(np.arange(len(edges)), steps + 1)
+        local = np.arange(len(owner)) - np.repeat(np.cumsum(steps + 1) - (steps + 1), steps + 1)
+        points = start[owner] + delta[owner] * (local / np.maximum(steps[owner], 1))[:, None]
+
+        x, y = np.floor(points[:, 0]).astype(np.int64), np.floor(points[:, 1]).astype(np.int64)
+        depth = points[:, 2] - EDGE_DEPTH_BIAS
+        valid = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height) & (points[:, 2] >= 0) & (points[:, 2] <= 1)
+        pixels, depth = (y * self.width + x)[valid], depth[valid]
+        order = np.lexsort((depth, pixels)) # per pixel the nearest line sample first
+        pixels, depth = pixels[order], depth[order]
+        first = np.r_[True, pixels[1:] != pixels[:-1]]
+        pixels, depth = pixels[first], depth[first]
+
+        flatDepth = depthBuffer.reshape(-1)
+        passed = depth < flatDepth[pixels]
+        flatDepth[pixels[passed]] = depth[passed]
+        colorBuffer.reshape(-1, 4)[pixels[passed]] = edgeColor
+
+    """
+    Frames
+    """
+    def render(self, mesh, model, surfaceColor, edgeColor, vertexColors=None, background=(0.0, 0.0, 0.0, 1.0)):
+        """
+        Draws mesh with the 4x4 model matrix like GLWidget.drawShape: faces in surfaceColor (one RGBA, or (T, 4) one per
+        face for flat lighting), or interpolated vertexColors ((N, 4), rainbow mode/smooth lighting), edges in edgeColor. Returns a (height, width, 4) uint8 frame, top row first.
+        """
+        colorBuffer = np.empty((self.height, self.width, 4), dtype=np.float64)
+        colorBuffer[:] = background
+        depthBuffer = np.ones((self.height, self.width)) # glClear -> depth 1.0
+        screen, w = self.project(mesh.vertices, np.asarray(model, dtype=np.float64))
+        self.drawTriangles(colorBuffer, depthBuffer, screen, w, mesh.triangles, surfaceColor, vertexColors)
+        self.drawLines(colorBuffer, depthBuffer, screen, w, mesh.edges, np.asarray(edgeColor, dtype=np.float64))
+        return toRGBA8(colorBuffer[::-1]) # GL rows start at the bottom
@@ -0,0 +1,370 @@
+"""
+Fallback for GLWidget on machines without a usable OpenGL (no PyOpenGL, or a driver we cannot use).
+SoftwareWidget has the same slots and signals the main window uses, but draws every frame with the NumPy
+rasterizer of softRaster.py into a QImage. Textures, scenes and the render backends need OpenGL and are not available.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PySide2.QtGui import QPainter, QImage, QColor, QFont
+from PySide2.QtWidgets import QWidget
+from PySide2.QtCore import Qt, Signal, QTimer
+
+from meshCache import loadCachedMesh
+from mesh import SHAPES, ProceduralShape
+from profiling import FrameProfiler
+from renderState import RenderState
+from softRaster import SoftwareRasterizer
+from lighting import SHADING_MODES, litColors
+from transforms import IDENTITY_QUATERNION, quatIntegrate, quatNlerp, modelMatrix
+
+class SoftwareWidget(QWidget):
+    """
+    Draws the selected shape like GLWidget (same camera, colors, rotation and rainbow mode) without OpenGL.
+    Animation runs on the same fixed timestep, so switching renderers does not change how fast anything spins.
+    """
+    xRotationChanged = Signal(int)
+    yRotationChanged = Signal(int)
+    zRotationChanged = Signal(int)
+    meshDecoded = Signal(str, object)
+    meshAdded = Signal(int, str)
+    statusMessage = Signal(str)
+    frameSwapped = Signal() # same as QOpenGLWidget's -> emitted once a frame is painted
+
+    RENDER_BACKENDS = ("software",)
+    SHADING_MODES = SHADING_MODES
+
+    # same camera and timing as GLWidget
+    FRUSTUM_HALF_SIZE = 1.2
+    NEAR_PLANE = 6.0
+    FAR_PLANE = 70.0
+    CAMERA_DISTANCE = 30.0
+    FIXED_TIMESTEP = 0.01
+    MAX_FRAME_TIME = 0.25
+    DEGREES_PER_SPEED = 5.0
+    FRAME_INTERVAL_MS = 16 # the rasterizer is slow enough that following the display refresh rate buys nothing
+    RAINBOW_MS_PER_SPEED = 10
+
+    def __init__(self, parent=None, rainbowSeed=None, workers=None):
+        super().__init__(parent)
+        self.setGeometry(180, 30, 1091, 591) # same area as the GL widget
+
+        self.meshes = list(SHAPES)
+        self.shapeIndex = 0
+        self.lodOverride = None
+        self.rasterizer = SoftwareRasterizer(self.width(), self.height(), workers=workers, halfSize=self.FRUSTUM_HALF_SIZE,
+                                             near=self.NEAR_PLANE, far=self.FAR_PLANE, cameraDistance=self.CAMERA_DISTANCE)
+
+        self.surfaceColor = (1.0, 1.0, 0.0, 1.0)
+        self.edgeColor = (0.0, 0.0, 1.0, 1.0)
+        self.shadingMode = "unlit"
+        self.rng = np.random.default_rng(rainbowSeed)
+        self.rainbowMode = False
+        self.rainbowColors = None # (N, 4) float32, one row per vertex of the active mesh while rainbow mode is on
+        self.rainbowSpeed = 30
+        self.rainbowInterval = (51 - self.rainbowSpeed) * self.RAINBOW_MS_PER_SPEED
+        self.lastRainbowTime = 0.0
+
+        self.animate = True
+        self.x_rot_speed = 0
+        self.y_rot_speed = 0
+        self.z_rot_speed = 0
+        self.orientation = IDENTITY_QUATERNION.copy()
+        self.previousOrientation = IDENTITY_QUATERNION.copy()
+        self.accumulator = 0.0
+        self.lastStepTime = time.perf_counter()
+        self.renderState = RenderState({"surfaceColor": self.surfaceColor, "edgeColor": self.edgeColor,
+                                        "rotationSpeed": (self.x_rot_speed, self.y_rot_speed, self.z_rot_speed)}, self.update)
+
+        self.profiler = FrameProfiler()
+        self.showProfilerOverlay = False
+
+        self.meshLoader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mesh")
+        self.meshDecoded.connect(self.onMeshDecoded)
+
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.step)
+
+    """
+    Helpers -> same slots as GLWidget
+    """
+    def setSurfaceColor(self, color):
+        """Set the color of the current object RGBA, applied on the next frame"""
+        self.renderState.set("surfaceColor", color)
+
+    def setEdgeColor(self, color):
+        """Set the color of the edges RGBA, applied on the next frame"""
+        self.renderState.set("edgeColor", color)
+
+    def setSurfaceChannel(self, channel, value):
+        """Sets one channel (0-3 -> RGBA) of the surface color"""
+        self.renderState.setChannel("surfaceColor", channel, value)
+
+    def setEdgeChannel(self, channel, value):
+        """Sets one channel (0-3 -> RGBA) of the edge color"""
+        self.renderState.setChannel("edgeColor", channel, value)
+
+    def applyRenderState(self):
+        """Applies the UI changes gathered since the last frame (see GLWidget.applyRenderState)"""
+        changes = self.renderState.flush()
+        if "surfaceColor" in changes:
+            self.surfaceColor = changes["surfaceColor"]
+        if "edgeColor" in changes:
+            self.edgeColor = changes["edgeColor"]
+        if "rotationSpeed" in changes:
+            self.x_rot_speed, self.y_rot_speed, self.z_rot_speed = changes["rotationSpeed"]
+            self.scheduleFrames()
+
+    def toggleAnimation(self):
+        """Toggles the animation playback"""
+        self.animate = not self.animate
+        self.scheduleFrames()
+
+    def setCurrentShape(self, index):
+        """Sets the index of the current shape"""
+        self.shapeIndex = index
+        if self.rainbowMode:
+            self.regenerateRainbowColors()
+        self.update()
+
+    def toggleRainbowMode(self):
+        """Toggles rainbow mode"""
+        self.rainbowMode = not self.rainbowMode
+        if self.rainbowMode:
+            self.regenerateRainbowColors()
+        self.update()
+        self.scheduleFrames()
+
+    def setRainbowModeSpeed(self, speed):
+        """Sets the speed of rainbow mode paint updates, range(1-50) expected"""
+        self.rainbowSpeed = speed
+        self.rainbowInterval = (51 - speed) * self.RAINBOW_MS_PER_SPEED
+
+    def setRainbowSeed(self, seed):
+        """Reseeds the rainbow colors so the same seed replays the same frames"""
+        self.rng = np.random.default_rng(seed)
+
+    def regenerateRainbowColors(self):
+        """A new random opaque color for every vertex of the active mesh"""
+        colors = self.rng.random((self.activeMesh()[0].vertexCount, 4), dtype=np.float32)
+        colors[:, 3] = 1.0
+        self.rainbowColors = colors
+
+    def setDetailOverride(self, resolution):
+        """Forces procedural shapes to a fixed resolution, None goes back to automatic LOD"""
+        self.lodOverride = resolution
+        self.update()
+
+    def setRenderBackend(self, backend):
+        """Only "software" exists here"""
+        if backend not in self.RENDER_BACKENDS:
+            raise ValueError("the software renderer only has the %r backend" % self.RENDER_BACKENDS[0])
+
+    def setShadingMode(self, mode):
+        """One of SHADING_MODES, lit like GLWidget (lighting.py) with the colors worked out on the CPU"""
+        if mode not in self.SHADING_MODES:
+            raise ValueError("unknown shading mode %r, expected one of %s" % (mode, ", ".join(self.SHADING_MODES)))
+        self.shadingMode = mode
+        self.update()
+
+    def setTransparencyMode(self, mode):
+        """The rasterizer does not blend, says so in the status bar"""
+        self.statusMessage.emit("Transparency needs OpenGL, the software renderer draws every surface opaque")
+
+    def setWireframeMode(self, mode):
+        """The rasterizer always draws edges as lines, says so if the shader wireframe is asked for"""
+        if mode != "lines":
+            self.statusMessage.emit("The barycentric wireframe needs OpenGL, the software renderer draws edges as lines")
+
+    def toggleProfilerOverlay(self):
+        """Shows/hides the frame timing overlay"""
+        self.showProfilerOverlay = not self.showProfilerOverlay
+        self.update()
+
+    def setGpuTiming(self, enabled):
+        """No GPU here, the request is reported instead"""
+        if enabled:
+            self.statusMessage.emit("GPU timer queries need OpenGL, the software renderer only has CPU phase times")
+
+    def loadTexture(self, path):
+        """Textures are not drawn by the rasterizer, says so in the status bar"""
+        self.statusMessage.emit("Textures need OpenGL, the software renderer draws colors only")
+
+    def clearTexture(self):
+        """Nothing to clear, see loadTexture"""
+        pass
+
+    def isSpinning(self):
+        """True while the animation plays and the shape has a non-zero spin"""
+        return bool(self.animate and (self.x_rot_speed or self.y_rot_speed or self.z_rot_speed))
+
+    def needsFrames(self):
+        """True while something changes on its own and we have to keep stepping"""
+        return self.isSpinning() or self.rainbowMode
+
+    def scheduleFrames(self):
+        """Runs the frame timer only while something animates, like GLWidget"""
+        if self.needsFrames():
+            if not self.timer.isActive():
+                self.lastStepTime = time.perf_counter()
+                self.timer.start(self.FRAME_INTERVAL_MS)
+        elif self.timer.isActive():
+            self.timer.stop()
+
+    def freeResources(self):
+        """Stops the rasterizer and import threads"""
+        self.rasterizer.close()
+        self.meshLoader.shutdown(wait=False, cancel_futures=True)
+
+    """
+    Rotation
+    """
+    def setXRotSpeed(self, speed):
+        """Set the X-axis rotation speed"""
+        self.renderState.setChannel("rotationSpeed", 0, speed)
+
+    def setYRotSpeed(self, speed):
+        """Set the Y-axis rotation speed"""
+        self.renderState.setChannel("rotationSpeed", 1, speed)
+
+    def setZRotSpeed(self, speed):
+        """Set the Z-axis rotation speed"""
+        self.renderState.setChannel("rotationSpeed", 2, speed)
+
+    def advance(self, elapsed):
+        """Consumes elapsed seconds in FIXED_TIMESTEP steps (see GLWidget.advance)"""
+        self.accumulator += min(elapsed, self.MAX_FRAME_TIME)
+        velocity = np.radians(np.array((self.x_rot_speed, self.y_rot_speed, self.z_rot_speed), dtype=np.float64) * self.DEGREES_PER_SPEED)
+        while self.accumulator >= self.FIXED_TIMESTEP:
+            self.previousOrientation = self.orientation
+            self.orientation = quatIntegrate(self.orientation, velocity, self.FIXED_TIMESTEP)
+            self.accumulator -= self.FIXED_TIMESTEP
+
+    def step(self):
+        """Moves the shape forward by the time since the last call and updates rainbow mode (see GLWidget.step)"""
+        with self.profiler.measure("step"):
+            now = time.perf_counter()
+            elapsed, self.lastStepTime = now - self.lastStepTime, now
+            if self.isSpinning():
+                self.advance(elapsed)
+                self.update()
+            if self.rainbowMode and (now - self.lastRainbowTime) * 1000 >= self.rainbowInterval:
+                self.regenerateRainbowColors()
+                self.lastRainbowTime = now
+                self.update()
+        if not self.needsFrames():
+            self.timer.stop()
+
+    """
+    Drawing
+    """
+    def activeMesh(self):
+        """(mesh, resolution) of the selected shape, procedural shapes at the level of detail GLWidget would pick"""
+        shape = self.meshes[self.shapeIndex]
+        if not isinstance(shape, ProceduralShape):
+            return shape, None
+        resolution = self.lodOverride
+        if resolution is None:
+            side = min(self.rasterizer.width, self.rasterizer.height)
+            resolution = shape.resolutionFor(shape.radius * self.NEAR_PLANE / self.CAMERA_DISTANCE / self.FRUSTUM_HALF_SIZE * side / 2)
+        return shape.mesh(resolution), resolution
+
+    def renderFrame(self):
+        """The current state as a (height, width, 4) uint8 RGBA frame, top row first"""
+        self.applyRenderState()
+        mesh = self.activeMesh()[0]
+        colors = None
+        if self.rainbowMode:
+            if self.rainbowColors is None or len(self.rainbowColors) != mesh.vertexCount:
+                self.regenerateRainbowColors() # the level of detail changed
+            colors = self.rainbowColors
+        model = modelMatrix((0, 0, 0.0), quatNlerp(self.previousOrientation, self.orientation, self.accumulator / self.FIXED_TIMESTEP))
+        surfaceColor = self.surfaceColor
+        if self.shadingMode == "smooth" or self.shadingMode == "flat" and colors is not None:
+            # lit per vertex (Gouraud), rainbow colors belong to vertices so flat rainbow is lit this way too
+            colors = litColors(self.surfaceColor if colors is None else colors, mesh.vertexNormals(), model[:3, :3])
+        elif self.shadingMode == "flat":
+            surfaceColor = litColors(self.surfaceColor, mesh.faceNormals(), model[:3, :3]) # one lit color per face
+        return self.rasterizer.render(mesh, model, surfaceColor, self.edgeColor, colors)
+
+    def resizeEvent(self, event):
+        """The frame always covers the whole widget"""
+        self.rasterizer.resize(max(1, self.width()), max(1, self.height()))
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        """Rasterizes the frame and blits it, the overlay goes on top"""
+        with self.profiler.measure("paint"):
+            frame = self.renderFrame()
+            image = QImage(frame.data, frame.shape[1], frame.shape[0], frame.shape[1] * 4, QImage.Format_RGBA8888)
+            painter = QPainter(self)
+            painter.drawImage(0, 0, image) # frame stays referenced until here, QImage does not copy it
+        if self.showProfilerOverlay:
+            lines = self.profiler.overlayLines()
+            painter.setFont(QFont("monospace", 9))
+            lineHeight = painter.fontMetrics().height()
+            width = max(painter.fontMetrics().horizontalAdvance(line) for line in lines)
+            painter.fillRect(4, 4, width + 12, lineHeight * len(lines) + 8, QColor(0, 0, 0, 160))
+            painter.setPen(QColor(255, 255, 255))
+            for row, line in enumerate(lines):
+                painter.drawText(10, 8 + lineHeight * row + painter.fontMetrics().ascent(), line)
+        painter.end()
+        self.profiler.endFrame() # no buffer swap, the frame is done once painted
+        self.frameSwapped.emit()
+
+    """
+    Imported Meshes -> same background import as GLWidget
+    """
+    def addMesh(self, mesh):
+        """Adds a Mesh (or ProceduralShape) after the built-in shapes and returns its shape index"""
+        self.meshes.append(mesh)
+        index = len(self.meshes) - 1
+        self.meshAdded.emit(index, mesh.name)
+        return index
+
+    def importMesh(self, path):
+        """Reads an OBJ/STL/PLY file in the background, added as a new shape once parsed"""
+        self.statusMessage.emit("Importing %s..." % path)
+        future = self.meshLoader.submit(loadCachedMesh, path)
+        future.add_done_callback(lambda done: self.meshDecoded.emit(path, done))
+
+    def onMeshDecoded(self, path, future):
+        """An import finished (GUI thread) -> add the mesh or report why it failed"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self.statusMessage.emit("Could not import %s: %s" % (path, error))
+            return
+        mesh = future.result()
+        self.addMesh(mesh)
+        report = mesh.geometryReport
+        self.statusMessage.emit("Imported %s (%d vertices, %d triangles%s)" % (mesh.name, mesh.vertexCount, mesh.triangleCount,
+                                "" if report is None else ", vertex cache ACMR %.2f -> %.2f" % (report.acmrBefore, report.acmrAfter)))
+
+class SoftwareRenderer:
+    """Stands in for headless.OffscreenRenderer when there is no OpenGL, renders a SoftwareWidget's frames"""
+    def __init__(self, widget, width, height, samples=0):
+        self.widget = widget
+        widget.rasterizer.resize(width, height) # no multisampling, samples is accepted for the same signature
+        self.frames = [None, None]
+
+    def draw(self):
+        """Renders one frame (kept in slot 0)"""
+        self.frames[0] = self.widget.renderFrame()
+        self.widget.profiler.endFrame()
+
+    def render(self, slot):
+        """Renders one frame into slot"""
+        self.frames[slot] = self.widget.renderFrame()
+        self.widget.profiler.endFrame()
+
+    def pixels(self, slot):
+        """The frame in slot, (height, width, 4) RGBA top row first"""
+        return self.frames[slot]
+
+    def close(self):
+        """Frees the widget's resources"""
+        self.widget.freeResources()
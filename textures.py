@@ -0,0 +1,174 @@
+"""
+Texture loading for GLWidget.
+Images are decoded (Pillow) and mipmapped (NumPy) on worker threads so a big file never stalls the Qt event loop,
+only the final glTexImage2D uploads happen on the GUI thread. Uploaded textures live in an LRU cache with a byte budget.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+from OpenGL.GL import *
+
+class TextureImage:
+    """A decoded image ready for upload: every mip level as a (height, width, 4) uint8 RGBA array, largest first"""
+    __slots__ = ("path", "levels")
+
+    def __init__(self, path, levels):
+        self.path = path
+        self.levels = levels
+
+    @property
+    def width(self):
+        return self.levels[0].shape[1]
+
+    @property
+    def height(self):
+        return self.levels[0].shape[0]
+
+    @property
+    def nbytes(self):
+        """Bytes the whole mip chain takes, about 4/3 of the base level"""
+        return sum(level.nbytes for level in self.levels)
+
+def mipLevels(pixels):
+    """
+    The full mip chain of an RGBA image down to 1x1, each level a 2x2 box filter of the one above.
+    Odd sizes drop their last row/column, which is what GL's own size rule (floor(size / 2)) expects.
+    """
+    levels = [pixels]
+    while pixels.shape[0] > 1 or pixels.shape[1] > 1:
+        height, width = pixels.shape[:2]
+        fy, fx = (2 if height > 1 else 1), (2 if width > 1 else 1) # a 1 pixel tall/wide level only shrinks the other way
+        h, w = height // fy, width // fx
+        blocks = pixels[:h * fy, :w * fx].reshape(h, fy, w, fx, 4).astype(np.uint16)
+        pixels = ((blocks.sum(axis=(1, 3)) + fy * fx // 2) // (fy * fx)).astype(np.uint8) # rounded average
+        levels.append(pixels)
+    return levels
+
+def decodeTexture(path, maxSize=4096):
+    """Reads an image file into a TextureImage (runs on a worker thread, no GL calls allowed here)"""
+    with Image.open(path) as image:
+        image = image.convert("RGBA")
+        if max(image.size) > maxSize:
+            image.thumbnail((maxSize, maxSize), Image.LANCZOS) # bigger than most drivers accept, scale it down
+        pixels = np.asarray(image, dtype=np.uint8)
+    pixels = np.ascontiguousarray(pixels[::-1]) # images start at the top row, GL textures at the bottom
+    return TextureImage(path, mipLevels(pixels))
+
+class TextureLoader:
+    """Decodes images on a small thread pool, asking for a path that is already being decoded joins that decode"""
+    def __init__(self, workers=2, maxSize=4096):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="texture")
+        self.maxSize = maxSize
+        self.pending = {} # path -> Future of the decode in flight
+
+    def request(self, path, callback):
+        """
+        Starts decoding path (unless it already is) and calls callback(future) when done.
+        The callback runs on the worker thread, so it should only hand the result over (e.g. emit a Qt signal).
+        """
+        future = self.pending.get(path)
+        if future is None:
+            future = self.pending[path] = self.executor.submit(decodeTexture, path, self.maxSize)
+            future.add_done_callback(lambda done: self.pending.pop(path, None))
+        future.add_done_callback(callback)
+        return future
+
+    def shutdown(self):
+        """Drops decodes that have not started yet and lets the running ones finish in the background"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.pending.clear()
+
+def uploadTexture(image):
+    """Uploads every mip level of a TextureImage into a new GL texture and returns its id (needs a current context)"""
+    texture = int(glGenTextures(1))
+    glBindTexture(GL_TEXTURE_2D, texture)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1) # rows are tightly packed, whatever the width
+    for level, pixels in enumerate(image.levels):
+        glTexImage2D(GL_TEXTURE_2D, level, GL_RGBA8, pixels.shape[1], pixels.shape[0], 0, GL_RGBA, GL_UNSIGNED_BYTE, pixels)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAX_LEVEL, len(image.levels) - 1)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR) # trilinear -> no shimmer when the shape is small
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
+    glBindTexture(GL_TEXTURE_2D, 0)
+    return texture
+
+class TextureCache:
+    """
+    GPU textures by key (the image path), least recently used first out once the total size goes over budget bytes.
+    The texture that was just added is never evicted, so one image larger than the budget still shows.
+    """
+    def __init__(self, budget):
+        self.budget = budget
+        self.entries = OrderedDict() # key -> (texture id, bytes), oldest use first
+        self.bytes = 0 # bytes currently held on the GPU
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0 # textures deleted to stay under budget
+        self.evictedBytes = 0
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        """Returns the texture id for key (marking it as just used), or None if it is not uploaded"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, image):
+        """Uploads a TextureImage under key, evicting the least recently used textures that no longer fit"""
+        if key in self.entries:
+            self.remove(key)
+        texture = uploadTexture(image)
+        self.entries[key] = (texture, image.nbytes)
+        self.bytes += image.nbytes
+        while self.bytes > self.budget and len(self.entries) > 1:
+            oldest = next(iter(self.entries))
+            self.evictedBytes += self.entries[oldest][1]
+            self.evictions += 1
+            self.remove(oldest)
+        return texture
+
+    def remove(self, key):
+        """Deletes the texture under key (needs a current context)"""
+        texture, size = self.entries.pop(key)
+        glDeleteTextures([texture])
+        self.bytes -= size
+
+    def clear(self):
+        """Deletes every texture owned by the cache (needs a current context)"""
+        for key in list(self.entries):
+            self.remove(key)
+
+    def stats(self):
+        """Returns the cache counters as a dict, handy for logging long runs"""
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "evictedBytes": self.evictedBytes,
+                "textures": len(self.entries), "bytes": self.bytes, "budget": self.budget}
+
+@lru_cache(maxsize=64)
+def texturedMesh(mesh):
+    """
+    Unrolls a Mesh for texturing -> (positions, uvs) with one entry per triangle corner, ready for glDrawArrays.
+    UVs come from a box projection: each triangle is projected along the axis its normal points most along and
+    the two remaining coordinates are scaled by the mesh bounds into [0, 1], so every cube face shows the whole image.
+    Corners are not shared because a vertex on a box edge needs different UVs on each side of it.
+    """
+    positions = mesh.vertices[mesh.triangles] # (T, 3, 3)
+    normals = mesh.faceAreaNormals()
+    axis = np.abs(normals).argmax(axis=1) # 0 -> project onto yz, 1 -> xz, 2 -> xy
+    planes = np.array(((1, 2), (0, 2), (0, 1)))[axis] # (T, 2) the two coordinates kept
+
+    lo, hi = mesh.vertices.min(axis=0), mesh.vertices.max(axis=0)
+    extent = np.where(hi > lo, hi - lo, 1.0)
+    kept = np.take_along_axis(positions, planes[:, None, :], axis=2) # (T, 3, 2)
+    uvs = (kept - lo[planes][:, None, :]) / extent[planes][:, None, :]
+    return (np.ascontiguousarray(positions.reshape(-1, 3), dtype=np.float32),
+            np.ascontiguousarray(uvs.reshape(-1, 2), dtype=np.float32))
@@ -0,0 +1,118 @@
+"""
+Quaternion and 4x4 matrix helpers.
+Quaternions are stored as (w, x, y, z) in the last axis of a NumPy array, every function works on a single
+quaternion (4,) or on a whole batch (..., 4) at once so many objects can be updated with one call.
+Matrices are plain row-major NumPy arrays (math convention), use glMatrix() before handing one to OpenGL.
+"""
+import numpy as np
+
+IDENTITY_QUATERNION = np.array((1.0, 0.0, 0.0, 0.0))
+
+def quatNormalize(q):
+    """Scales quaternions back to unit length (integration slowly drifts away from it)"""
+    q = np.asarray(q, dtype=np.float64)
+    return q / np.linalg.norm(q, axis=-1, keepdims=True)
+
+def quatMultiply(a, b):
+    """Hamilton product a * b -> applying the result rotates by b first, then by a"""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    aw, ax, ay, az = np.moveaxis(a, -1, 0)
+    bw, bx, by, bz = np.moveaxis(b, -1, 0)
+    return np.stack((aw * bw - ax * bx - ay * by - az * bz,
+                     aw * bx + ax * bw + ay * bz - az * by,
+                     aw * by - ax * bz + ay * bw + az * bx,
+                     aw * bz + ax * by - ay * bx + az * bw), axis=-1)
+
+def quatFromAxisAngle(axis, angle):
+    """Rotation of angle radians around axis (does not need to be unit length)"""
+    axis = np.asarray(axis, dtype=np.float64)
+    angle = np.asarray(angle, dtype=np.float64)[..., None]
+    axis = axis / np.linalg.norm(axis, axis=-1, keepdims=True)
+    return np.concatenate((np.cos(angle / 2), axis * np.sin(angle / 2)), axis=-1)
+
+def quatFromRotationVector(rotation):
+    """Rotation by |rotation| radians around rotation's direction (the exponential map), zero -> identity"""
+    rotation = np.asarray(rotation, dtype=np.float64)
+    angle = np.linalg.norm(rotation, axis=-1, keepdims=True)
+    half = angle / 2
+    scale = np.where(angle > 1e-12, np.sin(half) / np.where(angle > 1e-12, angle, 1.0), 0.5) # sin(a/2)/a -> 1/2 near 0
+    return np.concatenate((np.cos(half), rotation * scale), axis=-1)
+
+def quatIntegrate(q, angularVelocity, dt):
+    """
+    Advances orientation q by a body-frame angular velocity (radians/second per axis) over dt seconds.
+    The spin is applied on the object's own axes, like the old x/y/z glRotated calls were.
+    """
+    return quatNormalize(quatMultiply(q, quatFromRotationVector(np.asarray(angularVelocity) * dt)))
+
+def quatNlerp(a, b, t):
+    """Normalized linear interpolation between two orientations (takes the short way around)"""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    b = np.where((a * b).sum(axis=-1, keepdims=True) < 0, -b, b) # q and -q are the same rotation
+    return quatNormalize(a + (b - a) * np.asarray(t)[..., None])
+
+def quatToMatrix(q):
+    """Rotation matrices (..., 4, 4) for quaternions (..., 4)"""
+    w, x, y, z = np.moveaxis(quatNormalize(q), -1, 0)
+    m = np.zeros(w.shape + (4, 4))
+    m[..., 0, 0] = 1 - 2 * (y * y + z * z)
+    m[..., 0, 1] = 2 * (x * y - z * w)
+    m[..., 0, 2] = 2 * (x * z + y * w)
+    m[..., 1, 0] = 2 * (x * y + z * w)
+    m[..., 1, 1] = 1 - 2 * (x * x + z * z)
+    m[..., 1, 2] = 2 * (y * z - x * w)
+    m[..., 2, 0] = 2 * (x * z - y * w)
+    m[..., 2, 1] = 2 * (y * z + x * w)
+    m[..., 2, 2] = 1 - 2 * (x * x + y * y)
+    m[..., 3, 3] = 1.0
+    return m
+
+def modelMatrix(position, orientation, scale=1.0):
+    """Translation * rotation * scale in one (..., 4, 4) matrix -> one upload per object instead of 3 glRotated calls"""
+    m = quatToMatrix(orientation)
+    m[..., :3, :3] *= np.asarray(scale, dtype=np.float64)[..., None, None]
+    m[..., :3, 3] = position
+    return m
+
+def translationMatrix(x, y, z):
+    """A 4x4 translation, like glTranslated"""
+    m = np.identity(4)
+    m[:3, 3] = (x, y, z)
+    return m
+
+def frustumMatrix(left, right, bottom, top, near, far):
+    """The perspective matrix glFrustum multiplies onto the projection stack"""
+    return np.array((
+        (2 * near / (right - left), 0, (right + left) / (right - left), 0),
+        (0, 2 * near / (top - bottom), (top + bottom) / (top - bottom), 0),
+        (0, 0, -(far + near) / (far - near), -2 * far * near / (far - near)),
+        (0, 0, -1, 0)))
+
+def frustumPlanes(clip):
+    """
+    The 6 planes (left, right, bottom, top, near, far) of a clip (projection * view) matrix as (6, 4) rows (a, b, c, d),
+    normalized so a*x + b*y + c*z + d is the signed distance of a point, positive on the inside.
+    """
+    clip = np.asarray(clip, dtype=np.float64)
+    planes = np.array((clip[3] + clip[0], clip[3] - clip[0],
+                       clip[3] + clip[1], clip[3] - clip[1],
+                       clip[3] + clip[2], clip[3] - clip[2]))
+    return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+def unprojectRay(x, y, viewport, clip):
+    """
+    The ray under window position (x, y) (pixels, y up like OpenGL window coordinates) as (origin, direction),
+    in the space clip (projection * view * model) maps from -> like gluUnProject at the near and far planes.
+    viewport is (x, y, width, height) as given to glViewport, origin is on the near plane, direction reaches the far one.
+    """
+    vx, vy, width, height = viewport
+    ndcX, ndcY = 2 * (x - vx) / width - 1, 2 * (y - vy) / height - 1
+    points = np.linalg.inv(np.asarray(clip, dtype=np.float64)) @ np.array(((ndcX, ndcY, -1.0, 1.0), (ndcX, ndcY, 1.0, 1.0))).T
+    near, far = (points[:3] / points[3]).T
+    return near, far - near
+
+def glMatrix(m):
+    """Converts a row-major NumPy matrix to the column-major float32 layout glMultMatrixf/glLoadMatrixf expect"""
+    return np.ascontiguousarray(np.swapaxes(m, -1, -2), dtype=np.float32)
@@ -0,0 +1,49 @@
+"""
+Depth sorting for alpha blended surfaces.
+Blending is only correct when the faces behind are drawn before the faces in front of them, and which ones are behind
+changes as the shape turns, so the index buffer is re-ordered back to front once the view has turned far enough.
+The OpenGL widget can also skip sorting and use weighted blended order-independent transparency instead (oit.py).
+"""
+import numpy as np
+
+TRANSPARENCY_MODES = ("sorted", "weighted") # depth sorted index buffer / weighted blended OIT, used while the surface alpha < 1
+
+DEPTH_LEVELS = 65535 # depth keys are 16 bit
+RESORT_DEGREES = 1.0 # the view turns this far before the order is redone -> a spinning shape is not re-sorted every frame
+
+class DepthSorter:
+    """
+    Back-to-front triangle order of one mesh for a view direction.
+    Each triangle is sorted by its centroid's depth, quantized to 16 bits over the mesh's bounding sphere: NumPy's stable
+    argsort sorts 16 bit keys with a radix sort (linear time, several times faster than sorting the floats), and 65536
+    depth slices across the mesh are finer than triangles that can overlap on screen.
+    Until the view turns by more than resortDegrees the last order is kept: it can only misplace faces less than
+    sin(resortDegrees) * 2 * radius apart in depth (1.7% of the diameter at 1 degree), which hardly ever overlap on screen.
+    """
+    def __init__(self, mesh, resortDegrees=RESORT_DEGREES):
+        self.triangles = mesh.triangles
+        self.centroids = np.ascontiguousarray(mesh.vertices[mesh.triangles].mean(axis=1), dtype=np.float32) # (T, 3)
+        self.radius = max(mesh.boundingRadius, 1e-6)
+        self.indices = np.empty_like(self.triangles) # the sorted index buffer, rewritten in place
+        self.axis = None # view axis of the order in self.indices
+        self.resortCosine = np.cos(np.radians(resortDegrees)) # keep the order while the angle to self.axis has a cosine above this
+        self.keys = np.empty(len(self.triangles), dtype=np.float32)
+
+    def sort(self, axis):
+        """
+        Triangles (T, 3) back to front for axis, the camera's z axis in model space (row 2 of the model rotation):
+        depth along it grows towards the camera, so ascending keys put the furthest triangle first.
+        Returns (indices, changed), the same order is handed back without sorting until the axis turns by more than
+        resortDegrees.
+        """
+        axis = np.asarray(axis, dtype=np.float32)
+        if self.axis is not None and (np.array_equal(axis, self.axis) or
+                                      np.dot(axis, self.axis) > self.resortCosine * np.linalg.norm(axis) * np.linalg.norm(self.axis)):
+            return self.indices, False
+        half = DEPTH_LEVELS / 2
+        np.matmul(self.centroids, axis * np.float32(half / self.radius), out=self.keys) # -half..half
+        self.keys += np.float32(half)
+        order = np.argsort(self.keys.astype(np.uint16), kind="stable")
+        np.take(self.triangles, order, axis=0, out=self.indices)
+        self.axis = axis.copy()
+        return self.indices, True
@@ -23,8 +23,42 @@ class Ui_MainWindow(object):
         MainWindow.setBaseSize(QSize(1280, 720))
         self.actionFrom_this_pc = QAction(MainWindow)
         self.actionFrom_this_pc.setObjectName(u"actionFrom_this_pc")
-        self.actionJk_I_ran_out_of_time = QAction(MainWindow)
-        self.actionJk_I_ran_out_of_time.setObjectName(u"actionJk_I_ran_out_of_time")
+        self.actionRemove_texture = QAction(MainWindow)
+        self.actionRemove_texture.setObjectName(u"actionRemove_texture")
+        self.actionImport_mesh = QAction(MainWindow)
+        self.actionImport_mesh.setObjectName(u"actionImport_mesh")
+        self.actionShow_overlay = QAction(MainWindow)
+        self.actionShow_overlay.setObjectName(u"actionShow_overlay")
+        self.actionShow_overlay.setCheckable(True)
+        self.actionGpu_timer_queries = QAction(MainWindow)
+        self.actionGpu_timer_queries.setObjectName(u"actionGpu_timer_queries")
+        self.actionGpu_timer_queries.setCheckable(True)
+        self.actionSave_frame_timings = QAction(MainWindow)
+        self.actionSave_frame_timings.setObjectName(u"actionSave_frame_timings")
+        self.actionUnlit = QAction(MainWindow)
+        self.actionUnlit.setObjectName(u"actionUnlit")
+        self.actionUnlit.setCheckable(True)
+        self.actionUnlit.setChecked(True)
+        self.actionFlat_shading = QAction(MainWindow)
+        self.actionFlat_shading.setObjectName(u"actionFlat_shading")
+        self.actionFlat_shading.setCheckable(True)
+        self.actionSmooth_shading = QAction(MainWindow)
+        self.actionSmooth_shading.setObjectName(u"actionSmooth_shading")
+        self.actionSmooth_shading.setCheckable(True)
+        self.actionSorted_transparency = QAction(MainWindow)
+        self.actionSorted_transparency.setObjectName(u"actionSorted_transparency")
+        self.actionSorted_transparency.setCheckable(True)
+        self.actionSorted_transparency.setChecked(True)
+        self.actionWeighted_transparency = QAction(MainWindow)
+        self.actionWeighted_transparency.setObjectName(u"actionWeighted_transparency")
+        self.actionWeighted_transparency.setCheckable(True)
+        self.actionLine_edges = QAction(MainWindow)
+        self.actionLine_edges.setObjectName(u"actionLine_edges")
+        self.actionLine_edges.setCheckable(True)
+        self.actionLine_edges.setChecked(True)
+        self.actionBarycentric_edges = QAction(MainWindow)
+        self.actionBarycentric_edges.setObjectName(u"actionBarycentric_edges")
+        self.actionBarycentric_edges.setCheckable(True)
         self.centralwidget = QWidget(MainWindow)
         self.centralwidget.setObjectName(u"centralwidget")
         self.xRotSlider = QSlider(self.centralwidget)
@@ -96,6 +130,11 @@ class Ui_MainWindow(object):
         self.shapeComboBox.addItem("")
         self.shapeComboBox.addItem("")
         self.shapeComboBox.addItem("")
+        self.shapeComboBox.addItem("")
+        self.shapeComboBox.addItem("")
+        self.shapeComboBox.addItem("")
+        self.shapeComboBox.addItem("")
+        self.shapeComboBox.addItem("")
         self.shapeComboBox.setObjectName(u"shapeComboBox")
         self.shapeComboBox.setGeometry(QRect(10, 60, 151, 22))
         self.shapeComboBoxLabel = QLabel(self.centralwidget)
@@ -181,13 +220,36 @@ class Ui_MainWindow(object):
         self.menubar.setGeometry(QRect(0, 0, 1280, 20))
         self.menuFile = QMenu(self.menubar)
         self.menuFile.setObjectName(u"menuFile")
+        self.menuImport = QMenu(self.menubar)
+        self.menuImport.setObjectName(u"menuImport")
+        self.menuPerformance = QMenu(self.menubar)
+        self.menuPerformance.setObjectName(u"menuPerformance")
+        self.menuShading = QMenu(self.menubar)
+        self.menuShading.setObjectName(u"menuShading")
         MainWindow.setMenuBar(self.menubar)
         self.statusbar = QStatusBar(MainWindow)
         self.statusbar.setObjectName(u"statusbar")
         MainWindow.setStatusBar(self.statusbar)
 
         self.menubar.addAction(self.menuFile.menuAction())
-        self.menuFile.addAction(self.actionJk_I_ran_out_of_time)
+        self.menubar.addAction(self.menuImport.menuAction())
+        self.menubar.addAction(self.menuShading.menuAction())
+        self.menubar.addAction(self.menuPerformance.menuAction())
+        self.menuFile.addAction(self.actionFrom_this_pc)
+        self.menuFile.addAction(self.actionRemove_texture)
+        self.menuImport.addAction(self.actionImport_mesh)
+        self.menuPerformance.addAction(self.actionShow_overlay)
+        self.menuPerformance.addAction(self.actionGpu_timer_queries)
+        self.menuPerformance.addAction(self.actionSave_frame_timings)
+        self.menuShading.addAction(self.actionUnlit)
+        self.menuShading.addAction(self.actionFlat_shading)
+        self.menuShading.addAction(self.actionSmooth_shading)
+        self.menuShading.addSeparator()
+        self.menuShading.addAction(self.actionSorted_transparency)
+        self.menuShading.addAction(self.actionWeighted_transparency)
+        self.menuShading.addSeparator()
+        self.menuShading.addAction(self.actionLine_edges)
+        self.menuShading.addAction(self.actionBarycentric_edges)
 
         self.retranslateUi(MainWindow)
 
@@ -197,7 +259,24 @@ class Ui_MainWindow(object):
     def retranslateUi(self, MainWindow):
         MainWindow.setWindowTitle(QCoreApplication.translate("MainWindow", u"MainWindow", None))
         self.actionFrom_this_pc.setText(QCoreApplication.translate("MainWindow", u"From this pc...", None))
-        self.actionJk_I_ran_out_of_time.setText(QCoreApplication.translate("MainWindow", u"I ran out of time :(", None))
+        self.actionRemove_texture.setText(QCoreApplication.translate("MainWindow", u"Remove texture", None))
+        self.actionImport_mesh.setText(QCoreApplication.translate("MainWindow", u"From this pc...", None))
+        self.actionShow_overlay.setText(QCoreApplication.translate("MainWindow", u"Show overlay", None))
+#if QT_CONFIG(shortcut)
+        self.actionShow_overlay.setShortcut(QCoreApplication.translate("MainWindow", u"F3", None))
+#endif // QT_CONFIG(shortcut)
+        self.actionGpu_timer_queries.setText(QCoreApplication.translate("MainWindow", u"GPU timer queries", None))
+        self.actionSave_frame_timings.setText(QCoreApplication.translate("MainWindow", u"Save frame timings as CSV...", None))
+#if QT_CONFIG(shortcut)
+        self.actionSave_frame_timings.setShortcut(QCoreApplication.translate("MainWindow", u"F4", None))
+#endif // QT_CONFIG(shortcut)
+        self.actionUnlit.setText(QCoreApplication.translate("MainWindow", u"Unlit", None))
+        self.actionFlat_shading.setText(QCoreApplication.translate("MainWindow", u"Flat (lit)", None))
+        self.actionSmooth_shading.setText(QCoreApplication.translate("MainWindow", u"Smooth (lit)", None))
+        self.actionSorted_transparency.setText(QCoreApplication.translate("MainWindow", u"Depth sorted transparency", None))
+        self.actionWeighted_transparency.setText(QCoreApplication.translate("MainWindow", u"Weighted blended transparency (OIT)", None))
+        self.actionLine_edges.setText(QCoreApplication.translate("MainWindow", u"Edges as lines", None))
+        self.actionBarycentric_edges.setText(QCoreApplication.translate("MainWindow", u"Edges in the face shader (barycentric)", None))
         self.label.setText(QCoreApplication.translate("MainWindow", u"X Rotation Speed", None))
         self.label_2.setText(QCoreApplication.translate("MainWindow", u"Y Rotation Speed", None))
         self.label_3.setText(QCoreApplication.translate("MainWindow", u"Z Rotation Speed", None))
@@ -210,6 +289,11 @@ class Ui_MainWindow(object):
         self.shapeComboBox.setItemText(1, QCoreApplication.translate("MainWindow", u"Pyramid", None))
         self.shapeComboBox.setItemText(2, QCoreApplication.translate("MainWindow", u"Tetrahedron", None))
         self.shapeComboBox.setItemText(3, QCoreApplication.translate("MainWindow", u"Octahedron", None))
+        self.shapeComboBox.setItemText(4, QCoreApplication.translate("MainWindow", u"Sphere", None))
+        self.shapeComboBox.setItemText(5, QCoreApplication.translate("MainWindow", u"Torus", None))
+        self.shapeComboBox.setItemText(6, QCoreApplication.translate("MainWindow", u"Icosahedron", None))
+        self.shapeComboBox.setItemText(7, QCoreApplication.translate("MainWindow", u"Dodecahedron", None))
+        self.shapeComboBox.setItemText(8, QCoreApplication.translate("MainWindow", u"Geodesic Sphere", None))
 
         self.shapeComboBoxLabel.setText(QCoreApplication.translate("MainWindow", u"Select Shape", None))
         self.surfaceSlidersLabel.setText(QCoreApplication.translate("MainWindow", u"Surface Sliders", None))
@@ -222,5 +306,8 @@ class Ui_MainWindow(object):
         self.rainbowModeRadioButton.setText(QCoreApplication.translate("MainWindow", u"Rainbow Mode", None))
         self.rainbowModeSpeedSliderLabel.setText(QCoreApplication.translate("MainWindow", u"Rainbow Mode Speed", None))
         self.menuFile.setTitle(QCoreApplication.translate("MainWindow", u"Upload Texture", None))
+        self.menuImport.setTitle(QCoreApplication.translate("MainWindow", u"Import Mesh", None))
+        self.menuPerformance.setTitle(QCoreApplication.translate("MainWindow", u"Performance", None))
+        self.menuShading.setTitle(QCoreApplication.translate("MainWindow", u"Shading", None))
     # retranslateUi
 